@@ -3,29 +3,46 @@ API endpoint for unified model inference
 Handles predictions from all integrated models
 """
 
-import io
-import json
-import base64
-import numpy as np
-import cv2
-from PIL import Image
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 import sys
 from pathlib import Path
 
 # Add scripts directory to path
-sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "scripts"))
 
-from unified_model_loader import get_model_loader
+import prediction_service
+import response_encoding
+from admission import admission
+from serving_metrics import metrics
+
+def get_model_loader():
+    """Get the shared model loader (models load in the background)"""
+    from unified_model_loader import get_model_loader as get_shared_loader
+    return get_shared_loader(model_files=prediction_service.SERVER_MODEL_FILES)
 
 model_api = Blueprint('model_api', __name__, url_prefix='/api/v1/models')
 
+def respond(payload, status):
+    """Encode a prediction payload in the format negotiated with the client"""
+    fmt = response_encoding.negotiate(request.headers.get('Accept'), request.args.get('format'))
+    body, content_type, elapsed_ms = response_encoding.encode(payload, fmt)
+    headers = response_encoding.response_headers(body, elapsed_ms)
+    if status == 429 and "retry_after" in payload:
+        headers["Retry-After"] = str(payload["retry_after"])
+    return Response(body, status=status, content_type=content_type, headers=headers)
+
 @model_api.route('/health', methods=['GET'])
 def health_check():
     """Check if models are loaded and healthy"""
     loader = get_model_loader()
     return jsonify(loader.health_check()), 200
 
+@model_api.route('/ready', methods=['GET'])
+def readiness_check():
+    """Readiness: model loading finished and at least one model is serving"""
+    payload, status = prediction_service.readiness(get_model_loader())
+    return jsonify(payload), status
+
 @model_api.route('/available', methods=['GET'])
 def get_available_models():
     """Get list of available models"""
@@ -44,38 +61,20 @@ def predict():
     {
         "image": "<base64_encoded_image>",
         "model": "asl_alphabet",  # or "sign_mnist", "hagrid"
-        "confidence_threshold": 0.5
+        "confidence_threshold": 0.5,
+        "top_k": 5,             # optional
+        "compact": false,       # optional
+        "deadline_ms": 500      # optional, or X-Request-Deadline-Ms header
     }
+    
+    Admins can add ?profile=1 (or cprofile,trace) or an X-Profile header
+    to get a stage-timing breakdown in the response.
     """
     try:
-        data = request.get_json()
-        
-        if not data or 'image' not in data:
-            return jsonify({
-                "error": "Missing 'image' in request",
-                "success": False
-            }), 400
-        
-        # Decode image
-        try:
-            image_data = base64.b64decode(data['image'])
-            image = Image.open(io.BytesIO(image_data))
-            image = np.array(image)
-        except Exception as e:
-            return jsonify({
-                "error": f"Invalid image data: {str(e)}",
-                "success": False
-            }), 400
-        
-        # Get parameters
-        model_name = data.get('model', 'asl_alphabet')
-        confidence_threshold = float(data.get('confidence_threshold', 0.5))
-        
-        # Make prediction
-        loader = get_model_loader()
-        result = loader.predict(image, model_name, confidence_threshold)
-        
-        return jsonify(result), 200 if result.get('success', True) else 400
+        payload, status = prediction_service.predict_image(
+            get_model_loader(), request.get_json(silent=True), request.headers, request.args
+        )
+        return respond(payload, status)
     
     except Exception as e:
         return jsonify({
@@ -92,46 +91,211 @@ def predict_from_url():
     {
         "path": "/path/to/image.jpg",
         "model": "asl_alphabet",
-        "confidence_threshold": 0.5
+        "confidence_threshold": 0.5,
+        "top_k": 5,             # optional
+        "compact": false,       # optional
+        "deadline_ms": 500      # optional, or X-Request-Deadline-Ms header
+    }
+    
+    Admins can add ?profile=1 (or cprofile,trace) or an X-Profile header
+    to get a stage-timing breakdown in the response.
+    """
+    try:
+        payload, status = prediction_service.predict_image_path(
+            get_model_loader(), request.get_json(silent=True), request.headers, request.args
+        )
+        return respond(payload, status)
+    
+    except Exception as e:
+        return jsonify({
+            "error": str(e),
+            "success": False
+        }), 500
+
+@model_api.route('/predict/rois', methods=['POST'])
+def predict_rois():
+    """
+    Classify several regions of one frame in a single batched forward pass
+    
+    Expected JSON:
+    {
+        "image": "<base64_encoded_image>",
+        "model": "asl_alphabet",
+        "boxes": [[x, y, width, height], ...],  # or "detect": true (MediaPipe)
+        "normalized": false,    # optional, boxes as fractions of the frame
+        "confidence_threshold": 0.5,
+        "top_k": 5,             # optional
+        "compact": false,       # optional
+        "deadline_ms": 500      # optional, or X-Request-Deadline-Ms header
+    }
+    """
+    try:
+        payload, status = prediction_service.predict_rois(
+            get_model_loader(), request.get_json(silent=True), request.headers, request.args
+        )
+        return respond(payload, status)
+    
+    except Exception as e:
+        return jsonify({
+            "error": str(e),
+            "success": False
+        }), 500
+
+@model_api.route('/wlasl/recognize', methods=['POST'])
+def recognize_clip():
+    """
+    Recognize a WLASL word from a short clip
+    
+    Frames are sampled uniformly to 16, and concurrent clip requests
+    share one batched forward pass.
+    
+    Expected JSON:
+    {
+        "video": "<base64_encoded_video_file>",   # or
+        "frames": ["<base64_image>", ...],       # frames in temporal order
+        "top_k": 5,             # optional
+        "deadline_ms": 2000     # optional, or X-Request-Deadline-Ms header
+    }
+    """
+    try:
+        payload, status = prediction_service.recognize_clip(
+            request.get_json(silent=True), request.headers, request.args
+        )
+        return respond(payload, status)
+    
+    except Exception as e:
+        return jsonify({
+            "error": str(e),
+            "success": False
+        }), 500
+
+@model_api.route('/fingerspell', methods=['POST'])
+def fingerspell():
+    """
+    Feed one frame into the session's streaming fingerspelling decoder
+    
+    Probabilities are smoothed and collapsed server-side; the response only
+    lists committed events (usually none), plus the decoded text when there
+    are some.
+    
+    Expected JSON:
+    {
+        "image": "<base64_encoded_image>",
+        "model": "sign_mnist",  # optional, FINGERSPELL_MODEL (sign_mnist) by default
+        "session_id": "abc123",  # or X-Session-Id header
+        "reset": false,         # optional, start a new transcript
+        "flush": false,         # optional, end the current word
+        "deadline_ms": 500      # optional, or X-Request-Deadline-Ms header
     }
+    
+    Events: {"type": "letter" | "word" | "delete", ...}
+    sign_mnist has no nothing/space/del classes: low-confidence frames are
+    the blanks and a pause ends the word.
     """
     try:
-        data = request.get_json()
-        
-        if not data or 'path' not in data:
-            return jsonify({
-                "error": "Missing 'path' in request",
-                "success": False
-            }), 400
-        
-        # Load image
-        image_path = data['path']
-        if not Path(image_path).exists():
-            return jsonify({
-                "error": f"Image file not found: {image_path}",
-                "success": False
-            }), 404
-        
-        try:
-            image = cv2.imread(image_path)
-            if image is None:
-                raise ValueError("Failed to read image")
-            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        except Exception as e:
-            return jsonify({
-                "error": f"Failed to read image: {str(e)}",
-                "success": False
-            }), 400
-        
-        # Get parameters
-        model_name = data.get('model', 'asl_alphabet')
-        confidence_threshold = float(data.get('confidence_threshold', 0.5))
-        
-        # Make prediction
-        loader = get_model_loader()
-        result = loader.predict(image, model_name, confidence_threshold)
-        
-        return jsonify(result), 200 if result.get('success', True) else 400
+        payload, status = prediction_service.fingerspell(
+            get_model_loader(), request.get_json(silent=True), request.headers, request.args
+        )
+        return respond(payload, status)
+    
+    except Exception as e:
+        return jsonify({
+            "error": str(e),
+            "success": False
+        }), 500
+
+@model_api.route('/gestures/classify', methods=['POST'])
+def classify_gesture():
+    """
+    Classify a frame against the user's custom gestures (few-shot, no retraining)
+    
+    The frame is embedded by the gesture backbone and matched against the
+    user's recorded samples by k-nearest-neighbour vote.
+    
+    Expected JSON:
+    {
+        "image": "<base64_encoded_image>",
+        "user_id": "alice",     # or X-User-Id header
+        "k": 5,                 # optional, neighbours to vote
+        "deadline_ms": 500      # optional, or X-Request-Deadline-Ms header
+    }
+    """
+    try:
+        payload, status = prediction_service.classify_gesture(
+            request.get_json(silent=True), request.headers, request.args
+        )
+        return respond(payload, status)
+    
+    except Exception as e:
+        return jsonify({
+            "error": str(e),
+            "success": False
+        }), 500
+
+@model_api.route('/gestures', methods=['GET', 'POST', 'DELETE'])
+def manage_gestures():
+    """
+    List (GET), add samples to (POST) or remove (DELETE) custom gestures
+    
+    Expected JSON (POST/DELETE; GET takes ?user_id= or X-User-Id):
+    {
+        "user_id": "alice",     # or X-User-Id header
+        "label": "thumbs_up",
+        "images": ["<base64_encoded_image>", ...]  # POST only, or "image"
+    }
+    """
+    try:
+        payload, status = prediction_service.manage_gestures(
+            request.method, request.get_json(silent=True), request.headers, request.args
+        )
+        return respond(payload, status)
+    
+    except Exception as e:
+        return jsonify({
+            "error": str(e),
+            "success": False
+        }), 500
+
+@model_api.route('/heads/predict', methods=['POST'])
+def predict_heads():
+    """
+    Run the multi-head classifiers on one frame (one shared backbone pass)
+    
+    Expected JSON:
+    {
+        "image": "<base64_encoded_image>",
+        "heads": ["alice", "bob"],  # optional, defaults to every loaded head
+        "top_k": 3,                 # optional
+        "deadline_ms": 500          # optional, or X-Request-Deadline-Ms header
+    }
+    """
+    try:
+        payload, status = prediction_service.predict_heads(
+            get_model_loader(), request.get_json(silent=True), request.headers, request.args
+        )
+        return respond(payload, status)
+    
+    except Exception as e:
+        return jsonify({
+            "error": str(e),
+            "success": False
+        }), 500
+
+@model_api.route('/heads', methods=['GET', 'POST', 'DELETE'])
+def manage_heads():
+    """
+    Report memory/latency per head (GET); admin: load (POST) or unload (DELETE) a head
+    
+    Expected JSON (POST/DELETE, X-Admin-Token header required):
+    {
+        "name": "alice"  # head file MULTI_HEAD_DIR/alice.npz (or .keras)
+    }
+    """
+    try:
+        payload, status = prediction_service.manage_heads(
+            request.method, request.get_json(silent=True), request.headers
+        )
+        return respond(payload, status)
     
     except Exception as e:
         return jsonify({
@@ -148,45 +312,56 @@ def compare_predictions():
     {
         "image": "<base64_encoded_image>",
         "models": ["asl_alphabet", "sign_mnist"],
-        "confidence_threshold": 0.5
+        "confidence_threshold": 0.5,
+        "top_k": 5,             # optional
+        "compact": false,       # optional
+        "deadline_ms": 500,     # optional, or X-Request-Deadline-Ms header
+        "priority": "batch",    # optional bulk class (default "compare"), or X-Priority header
+        "ensemble": true,       # optional: fuse into one early-exit prediction
+        "weights": {"asl_alphabet": 2.0},  # optional, ensemble weights
+        "exit_threshold": 0.9   # optional, ensemble early-exit confidence
     }
+    
+    Admins can add ?profile=1 (or cprofile,trace) or an X-Profile header
+    to get a stage-timing breakdown in the response.
     """
     try:
-        data = request.get_json()
-        
-        if not data or 'image' not in data:
-            return jsonify({
-                "error": "Missing 'image' in request",
-                "success": False
-            }), 400
-        
-        # Decode image
-        try:
-            image_data = base64.b64decode(data['image'])
-            image = Image.open(io.BytesIO(image_data))
-            image = np.array(image)
-        except Exception as e:
-            return jsonify({
-                "error": f"Invalid image data: {str(e)}",
-                "success": False
-            }), 400
-        
-        # Get parameters
-        models = data.get('models', ['asl_alphabet', 'sign_mnist'])
-        confidence_threshold = float(data.get('confidence_threshold', 0.5))
-        
-        # Get predictions from all models
-        loader = get_model_loader()
-        results = {}
-        
-        for model_name in models:
-            results[model_name] = loader.predict(image, model_name, confidence_threshold)
-        
+        payload, status = prediction_service.compare_image(
+            get_model_loader(), request.get_json(silent=True), request.headers, request.args
+        )
+        return respond(payload, status)
+    
+    except Exception as e:
         return jsonify({
-            "status": "success",
-            "predictions": results,
-            "compared_models": list(results.keys())
-        }), 200
+            "error": str(e),
+            "success": False
+        }), 500
+
+@model_api.route('/metrics', methods=['GET'])
+def serving_metrics():
+    """Get serving metrics (latency, response size, serialization time, per-class admission)"""
+    return jsonify({
+        "status": "success",
+        "metrics": metrics.snapshot(),
+        "admission": admission.snapshot()
+    }), 200
+
+@model_api.route('/reload', methods=['POST'])
+def reload_models():
+    """
+    Admin: hot-reload models without dropping in-flight requests
+    
+    Requires the X-Admin-Token header. Expected JSON (optional):
+    {
+        "model": "sign_mnist",
+        "force": false
+    }
+    """
+    try:
+        payload, status = prediction_service.reload_models(
+            get_model_loader(), request.get_json(silent=True), request.headers
+        )
+        return jsonify(payload), status
     
     except Exception as e:
         return jsonify({
@@ -11,110 +11,32 @@ import os
 os.environ["TF_CPP_MIN_LOG_LEVEL"] = "2"
 os.environ["TF_ENABLE_ONEDNN_OPTS"] = "0"
 
+import sys
 import cv2
 import numpy as np
-import tensorflow as tf
 import mediapipe as mp
-from collections import deque
-from tensorflow.keras import layers
 from pathlib import Path
 
-# ===============================
-# CUSTOM GRAPH CONV
-# ===============================
-@tf.keras.utils.register_keras_serializable()
-class GraphConv(layers.Layer):
-    def __init__(self, units, **kwargs):
-        super().__init__(**kwargs)
-        self.units = units
-
-    def build(self, input_shape):
-        self.w = self.add_weight(
-            shape=(input_shape[-1], self.units),
-            initializer="glorot_uniform",
-            trainable=True
-        )
-
-    def call(self, x):
-        return tf.matmul(x, self.w)
-
-    def compute_output_shape(self, input_shape):
-        return input_shape[:-1] + (self.units,)
-
-    def get_config(self):
-        cfg = super().get_config()
-        cfg.update({"units": self.units})
-        return cfg
-
+# Model definition (incl. the GraphConv custom layer) is shared with the serving code
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "scripts"))
+from wlasl_model import (
+    IMG_SIZE, IncrementalSignBridge, build_signbridge_layers, build_signbridge_model,
+)
 
 # ===============================
 # CONFIG
 # ===============================
-IMG_SIZE = 160
-MAX_FRAMES = 16
-NUM_CLASSES = 2000
 MODEL_PATH = r"D:\Samvad_Setu_final\notebooks\Saved_models\wlasl-final.keras"
-
-
-# ===============================
-# MODEL DEFINITION (LIGHTWEIGHT FOR TESTING)
-# ===============================
-def build_signbridge_model():
-    """Build test model without MobileNetV2 weight mismatch issues"""
-
-    # -------- VIDEO BRANCH --------
-    video_in = tf.keras.Input(
-        shape=(MAX_FRAMES, IMG_SIZE, IMG_SIZE, 3),
-        name="video_input"
-    )
-
-    # Use simple Conv2D instead of MobileNetV2 to avoid weight loading issues
-    x_vid = layers.TimeDistributed(
-        layers.Conv2D(64, 3, activation='relu', padding='same')
-    )(video_in)
-    x_vid = layers.TimeDistributed(
-        layers.GlobalAveragePooling2D()
-    )(x_vid)  # (None, 16, 64)
-    x_vid = layers.GlobalAveragePooling1D()(x_vid)   # (None, 64)
-
-    # -------- SKELETON BRANCH --------
-    skel_in = tf.keras.Input(
-        shape=(MAX_FRAMES, 42),
-        name="skeleton_input"
-    )
-
-    # (None, 16, 21, 2)
-    x_skel = layers.Reshape((MAX_FRAMES, 21, 2))(skel_in)
-
-    # Dense layer on joints
-    x_skel = layers.TimeDistributed(
-        layers.Dense(64, activation='relu')
-    )(x_skel)
-
-    # Pool joints → (None, 16, 64)
-    x_skel = layers.TimeDistributed(
-        layers.GlobalAveragePooling1D()
-    )(x_skel)
-
-    # Pool time → (None, 64)
-    x_skel = layers.GlobalAveragePooling1D()(x_skel)
-
-    # -------- FUSION --------
-    x = layers.Concatenate()([x_vid, x_skel])
-    x = layers.Dense(256, activation="relu")(x)
-    out = layers.Dense(NUM_CLASSES, activation="softmax")(x)
-
-    return tf.keras.Model(
-        inputs=[video_in, skel_in],
-        outputs=out
-    )
+# Distilled skeleton-only head (scripts/wlasl_two_stage.py distill); enables two-stage mode
+SKELETON_HEAD_PATH = Path(MODEL_PATH).with_name("skeleton_head.weights.h5")
 
 
 # ===============================
 # BUILD MODEL + LOAD WEIGHTS (WITH ERROR HANDLING)
 # ===============================
 print("⏳ Building model...")
-model = build_signbridge_model()
+parts = build_signbridge_layers()
+model = build_signbridge_model(parts)
 
 print("⏳ Loading weights...")
 if Path(MODEL_PATH).exists():
@@ -128,6 +50,18 @@ else:
     print(f"⚠️  Model file not found at {MODEL_PATH}")
     print("📌 Using model with random weights for testing")
 
+# Per-frame encoders + temporal head sharing the loaded weights: each new
+# frame is encoded once instead of re-encoding the whole 16-frame window
+if SKELETON_HEAD_PATH.exists():
+    # Skeleton head first; the video branch only runs when it is unsure
+    from wlasl_two_stage import TwoStageSignBridge, build_skeleton_head
+    skeleton_head = build_skeleton_head(parts)
+    skeleton_head.load_weights(str(SKELETON_HEAD_PATH))
+    signbridge = TwoStageSignBridge(parts, skeleton_head)
+    print("✅ Two-stage mode (skeleton first)")
+else:
+    signbridge = IncrementalSignBridge(parts)
+
 print("✅ Model ready")
 
 
@@ -162,9 +96,6 @@ cap = cv2.VideoCapture(0, cv2.CAP_DSHOW)
 cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
 cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
 
-buf_v = deque(maxlen=MAX_FRAMES)
-buf_s = deque(maxlen=MAX_FRAMES)
-
 print("🔥 SignBridge LIVE — Press Q to quit")
 print("   (Testing mode - using lightweight model)")
 
@@ -183,15 +114,9 @@ while True:
     fr = cv2.resize(frame, (IMG_SIZE, IMG_SIZE))
     fr = fr.astype(np.float32) / 255.0
 
-    buf_v.append(fr)
-    buf_s.append(extract_skeleton(frame))
-
-    if len(buf_v) == MAX_FRAMES:
-        video = np.expand_dims(np.array(buf_v), 0)
-        skel  = np.expand_dims(np.array(buf_s), 0)
-
-        pred = model.predict([video, skel], verbose=0)
+    pred = signbridge.push(fr, extract_skeleton(frame))
 
+    if pred is not None:
         cls = int(np.argmax(pred))
         conf = float(np.max(pred))
 
@@ -212,4 +137,6 @@ while True:
 cap.release()
 cv2.destroyAllWindows()
 hands.close()
+if hasattr(signbridge, "skip_fraction"):
+    print(f"📊 Video branch skipped in {signbridge.skip_fraction():.1%} of windows")
 print("👋 Inference stopped")
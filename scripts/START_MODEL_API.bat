@@ -13,10 +13,10 @@ call conda activate asl310
 
 REM Check if required packages are installed
 echo [INFO] Checking dependencies...
-pip show flask flask-cors tensorflow > nul 2>&1
+pip show flask flask-cors starlette uvicorn tensorflow > nul 2>&1
 if errorlevel 1 (
     echo [INFO] Installing required packages...
-    pip install flask flask-cors tensorflow pillow opencv-python
+    pip install flask flask-cors starlette uvicorn orjson msgpack tensorflow pillow opencv-python
 )
 
 REM Start the API server
@@ -14,10 +14,10 @@ source activate asl310 2>/dev/null || conda activate asl310
 
 # Check if required packages are installed
 echo "[INFO] Checking dependencies..."
-pip show flask flask-cors tensorflow > /dev/null 2>&1
+pip show flask flask-cors starlette uvicorn tensorflow > /dev/null 2>&1
 if [ $? -ne 0 ]; then
     echo "[INFO] Installing required packages..."
-    pip install flask flask-cors tensorflow pillow opencv-python
+    pip install flask flask-cors starlette uvicorn orjson msgpack tensorflow pillow opencv-python
 fi
 
 # Start the API server
@@ -0,0 +1,301 @@
+"""
+Admission Control
+Bounded per-model queues with deadlines in front of inference
+
+Each model gets a fixed number of inference slots and a bounded FIFO of
+waiting requests. When the queue is full new requests are rejected at once
+(HTTP 429 + Retry-After) instead of piling up behind the model, and requests
+whose deadline passes while queued are dropped before inference (HTTP 504).
+
+Waiting requests are split into priority classes, each with its own queue
+limit. Interactive requests (live-camera frames) have strict priority: a
+freed slot always goes to the oldest waiting interactive request, ahead of
+any queued bulk work. Bulk classes share the remaining slots by weighted
+fair queuing (start-time tags in virtual time), so a burst of /compare calls
+can't starve file-path jobs and vice versa. Running requests are never
+interrupted.
+"""
+
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from serving_metrics import metrics
+
+DEFAULT_MAX_CONCURRENT = int(os.environ.get("MODEL_MAX_CONCURRENT", 1))
+DEFAULT_MAX_QUEUE = int(os.environ.get("MODEL_MAX_QUEUE", 8))
+DEFAULT_DEADLINE_MS = float(os.environ.get("REQUEST_DEADLINE_MS", 2000))
+
+INTERACTIVE = "interactive"
+
+
+def _parse_class_map(text, cast):
+    """Parse "name=value,name=value" (as used by the ADMISSION_CLASS_* variables)"""
+    parsed = {}
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        name, _, value = item.partition("=")
+        parsed[name.strip()] = cast(value)
+    return parsed
+
+
+# WFQ weights of the bulk classes (interactive is strict priority, no weight)
+CLASS_WEIGHTS = _parse_class_map(
+    os.environ.get("ADMISSION_CLASS_WEIGHTS", "compare=2,file=1,batch=1"), float
+)
+# Per-class queue limits; unlisted classes use MODEL_MAX_QUEUE
+CLASS_QUEUE_LIMITS = _parse_class_map(os.environ.get("ADMISSION_CLASS_QUEUES", ""), int)
+PRIORITY_CLASSES = (INTERACTIVE,) + tuple(CLASS_WEIGHTS)
+
+# Window for the per-class completions/second estimate
+THROUGHPUT_WINDOW_SECONDS = 10.0
+
+
+class QueueFullError(Exception):
+    """The model's queue is full; retry after `retry_after` seconds"""
+
+    def __init__(self, model_name, retry_after):
+        super().__init__(f"Model '{model_name}' is overloaded, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class DeadlineExceededError(Exception):
+    """The request's deadline passed before inference started"""
+
+
+class InvalidDeadlineError(ValueError):
+    """The client's deadline budget is not a positive number of milliseconds"""
+
+
+class _Ticket:
+    """A waiting request: its class and WFQ start tag"""
+
+    __slots__ = ("priority", "tag")
+
+    def __init__(self, priority, tag=0.0):
+        self.priority = priority
+        self.tag = tag
+
+
+class _ClassState:
+    """Queue, WFQ bookkeeping and counters of one priority class"""
+
+    def __init__(self, weight, max_queue):
+        self.weight = weight
+        self.max_queue = max_queue
+        self.waiters = deque()
+        self.last_tag = 0.0
+        self.active = 0
+        self.admitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.recent = deque()  # Completion times within THROUGHPUT_WINDOW_SECONDS
+
+    def record_completion(self, now):
+        # Pruned here too, so the window stays bounded when nobody polls /metrics
+        self.recent.append(now)
+        self.prune(now)
+
+    def prune(self, now):
+        while self.recent and now - self.recent[0] > THROUGHPUT_WINDOW_SECONDS:
+            self.recent.popleft()
+
+
+def deadline_from(data=None, headers=None, received_at=None):
+    """
+    Absolute (monotonic) deadline for a request
+
+    Clients set a budget in milliseconds via `deadline_ms` in the JSON body or
+    the X-Request-Deadline-Ms header; REQUEST_DEADLINE_MS is the default.
+
+    Raises:
+        InvalidDeadlineError: the budget is not a finite number > 0
+    """
+    received_at = time.monotonic() if received_at is None else received_at
+    budget_ms = None
+    if data and data.get("deadline_ms") is not None:
+        budget_ms = data["deadline_ms"]
+    elif headers is not None and headers.get("X-Request-Deadline-Ms"):
+        budget_ms = headers.get("X-Request-Deadline-Ms")
+    if budget_ms is None:
+        budget_ms = DEFAULT_DEADLINE_MS
+    else:
+        try:
+            budget_ms = float(budget_ms) if not isinstance(budget_ms, bool) else math.nan
+        except (TypeError, ValueError):
+            budget_ms = math.nan
+        if not math.isfinite(budget_ms) or budget_ms <= 0:
+            raise InvalidDeadlineError("'deadline_ms' must be a positive number of milliseconds")
+    return received_at + budget_ms / 1000.0
+
+
+def check_deadline(deadline):
+    if deadline is not None and time.monotonic() >= deadline:
+        raise DeadlineExceededError("Request deadline exceeded before inference")
+
+
+class AdmissionController:
+    """Inference slots plus bounded per-class queues for one model"""
+
+    def __init__(self, name, max_concurrent=DEFAULT_MAX_CONCURRENT, max_queue=DEFAULT_MAX_QUEUE,
+                 weights=None, queue_limits=None):
+        self.name = name
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.active = 0
+        weights = CLASS_WEIGHTS if weights is None else weights
+        if INTERACTIVE in weights or any(weight <= 0 for weight in weights.values()):
+            raise ValueError("Bulk class weights must be positive (interactive has no weight)")
+        queue_limits = CLASS_QUEUE_LIMITS if queue_limits is None else queue_limits
+        self._classes = {
+            priority: _ClassState(weights.get(priority), max(0, queue_limits.get(priority, self.max_queue)))
+            for priority in (INTERACTIVE,) + tuple(weights)
+        }
+        # WFQ virtual time: start tag of the last bulk request admitted
+        self._virtual_time = 0.0
+        self._cond = threading.Condition()
+        # Moving average of slot hold time, used for Retry-After
+        self._service_seconds = 0.05
+
+    def _queued(self):
+        return sum(len(state.waiters) for state in self._classes.values())
+
+    def retry_after(self):
+        """Seconds until the current backlog should have drained"""
+        backlog = self._queued() + self.active
+        return max(1, math.ceil(backlog / self.max_concurrent * self._service_seconds))
+
+    def _next_ticket(self):
+        """Waiter that gets the next free slot (None if nobody waits)"""
+        interactive = self._classes[INTERACTIVE].waiters
+        if interactive:
+            return interactive[0]
+        heads = [state.waiters[0] for state in self._classes.values() if state.waiters]
+        return min(heads, key=lambda ticket: ticket.tag, default=None)
+
+    def _enqueue(self, priority):
+        state = self._classes[priority]
+        if len(state.waiters) >= state.max_queue:
+            state.rejected += 1
+            metrics.increment("admission_rejected", model=self.name, priority=priority, reason="queue_full")
+            raise QueueFullError(self.name, self.retry_after())
+        ticket = _Ticket(priority)
+        if priority != INTERACTIVE:
+            # Start-time fair queuing with unit cost per request
+            ticket.tag = max(self._virtual_time, state.last_tag) + 1.0 / state.weight
+            state.last_tag = ticket.tag
+        state.waiters.append(ticket)
+        return ticket
+
+    @contextmanager
+    def slot(self, deadline=None, priority=INTERACTIVE):
+        """
+        Hold an inference slot for the duration of the block
+
+        Args:
+            deadline: Absolute monotonic deadline (None waits indefinitely)
+            priority: Priority class (one of PRIORITY_CLASSES)
+
+        Raises:
+            QueueFullError: the class's queue is full
+            DeadlineExceededError: the deadline passed while waiting
+        """
+        if priority not in self._classes:
+            raise ValueError(f"Unknown priority class '{priority}'")
+        state = self._classes[priority]
+        enqueued_at = time.monotonic()
+        with self._cond:
+            if self.active >= self.max_concurrent or self._queued():
+                ticket = self._enqueue(priority)
+                try:
+                    while self._next_ticket() is not ticket or self.active >= self.max_concurrent:
+                        timeout = None if deadline is None else deadline - time.monotonic()
+                        if timeout is not None and timeout <= 0:
+                            state.rejected += 1
+                            metrics.increment(
+                                "admission_rejected", model=self.name, priority=priority, reason="deadline"
+                            )
+                            raise DeadlineExceededError("Request deadline exceeded while queued")
+                        self._cond.wait(timeout)
+                    if priority != INTERACTIVE:
+                        self._virtual_time = ticket.tag
+                finally:
+                    state.waiters.remove(ticket)
+                    self._cond.notify_all()
+            self.active += 1
+            state.active += 1
+            state.admitted += 1
+
+        started = time.monotonic()
+        metrics.observe("queue_wait_ms", (started - enqueued_at) * 1000, model=self.name, priority=priority)
+        try:
+            # A request can still expire between admission and here
+            check_deadline(deadline)
+            yield
+        finally:
+            with self._cond:
+                self.active -= 1
+                state.active -= 1
+                finished = time.monotonic()
+                held = finished - started
+                self._service_seconds = 0.8 * self._service_seconds + 0.2 * held
+                state.completed += 1
+                state.record_completion(finished)
+                self._cond.notify_all()
+            metrics.observe("slot_hold_ms", held * 1000, model=self.name, priority=priority)
+
+    def snapshot(self):
+        with self._cond:
+            now = time.monotonic()
+            classes = {}
+            for priority, state in self._classes.items():
+                state.prune(now)
+                classes[priority] = {
+                    "weight": state.weight,
+                    "active": state.active,
+                    "queued": len(state.waiters),
+                    "max_queue": state.max_queue,
+                    "admitted": state.admitted,
+                    "completed": state.completed,
+                    "rejected": state.rejected,
+                    "throughput_rps": len(state.recent) / THROUGHPUT_WINDOW_SECONDS,
+                }
+            return {
+                "active": self.active,
+                "queued": self._queued(),
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "classes": classes,
+            }
+
+
+class AdmissionRegistry:
+    """One AdmissionController per model, created on first use"""
+
+    def __init__(self, max_concurrent=DEFAULT_MAX_CONCURRENT, max_queue=DEFAULT_MAX_QUEUE):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self._controllers = {}
+        self._lock = threading.Lock()
+
+    def for_model(self, model_name):
+        with self._lock:
+            controller = self._controllers.get(model_name)
+            if controller is None:
+                controller = AdmissionController(model_name, self.max_concurrent, self.max_queue)
+                self._controllers[model_name] = controller
+            return controller
+
+    def slot(self, model_name, deadline=None, priority=INTERACTIVE):
+        return self.for_model(model_name).slot(deadline, priority)
+
+    def snapshot(self):
+        with self._lock:
+            controllers = dict(self._controllers)
+        return {name: controller.snapshot() for name, controller in controllers.items()}
+
+
+# Global registry
+admission = AdmissionRegistry()
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Hot-Path Microbenchmarks
+Times each stage of the per-request work behind UnifiedModelLoader.predict
+
+Stages (per model, input resolution and upload format):
+- b64decode:   base64.b64decode of the request payload
+- pil_open:    Image.open + pixel decode to a numpy array
+- cvt_color:   cv2.cvtColor channel conversion (non-RGB input)
+- resize:      uint8 resize to the model's input size
+- gray:        RGB -> grayscale for single-channel models
+- float_cast:  astype(float32) / 255 normalization (float models)
+- raw:         uint8 hand-off (uint8 serving models)
+- prepare:     UnifiedModelLoader.prepare_input end to end
+- forward:     model.predict on the prepared batch
+- format:      UnifiedModelLoader.format_prediction (the all_predictions dict)
+
+uint8 serving models cast and scale in the graph, so that work shows up under
+`forward` instead of `float_cast`. An extra "all" case per resolution compares
+preparing every model's input separately with the shared preprocessing plan,
+and times the shared plan plus every model's forward pass.
+
+Results can be saved as a JSON baseline and later runs compared against it;
+the run exits non-zero if any stage's median regresses beyond the threshold.
+
+Usage:
+    python scripts/benchmark_hot_path.py --stub --save-baseline benchmarks/hot_path.json
+    python scripts/benchmark_hot_path.py --stub --compare benchmarks/hot_path.json --threshold 0.2
+"""
+
+import argparse
+import base64
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from io import BytesIO
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+DEFAULT_RESOLUTIONS = ["320x240", "640x480", "1280x720"]
+DEFAULT_FORMATS = ["jpeg", "png"]
+
+# Preprocessing plan step -> reported stage name
+PLAN_STAGES = {
+    "gray2rgb": "cvt_color",
+    "rgba2rgb": "cvt_color",
+    "resize": "resize",
+    "to_gray": "gray",
+    "to_float": "float_cast",
+}
+
+# Regressions smaller than this many microseconds are treated as noise
+DEFAULT_NOISE_FLOOR_US = 20.0
+
+def parse_resolution(text):
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+def make_payload(width, height, fmt, seed=0):
+    """
+    Encode a synthetic frame the way a client would upload it
+
+    JPEG frames are RGB (what the web app's canvas sends); PNG frames are
+    RGBA so the cvtColor path is exercised.
+    """
+    import numpy as np
+    from PIL import Image
+
+    rng = np.random.default_rng(seed)
+    # Smooth gradient plus noise compresses like a camera frame, not like pure noise
+    ramp = np.linspace(0, 255, width, dtype=np.float32)[None, :, None]
+    pixels = np.clip(ramp + rng.normal(0, 20, size=(height, width, 3)), 0, 255).astype(np.uint8)
+    image = Image.fromarray(pixels)
+    buffer = BytesIO()
+    if fmt == "png":
+        image.convert("RGBA").save(buffer, format="PNG")
+    else:
+        image.save(buffer, format="JPEG", quality=80)
+    return base64.b64encode(buffer.getvalue()).decode()
+
+def time_stage(fn, repeat, warmup):
+    """Run fn repeatedly and summarize wall time in microseconds"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter_ns()
+        fn()
+        samples.append((time.perf_counter_ns() - started) / 1000.0)
+    samples.sort()
+    return {
+        "median_us": statistics.median(samples),
+        "p95_us": samples[min(len(samples) - 1, int(0.95 * len(samples)))],
+        "min_us": samples[0],
+        "runs": len(samples),
+    }
+
+def benchmark_model(loader, model_name, encoded, repeat, warmup):
+    """
+    Time each hot-path stage for one model and one payload
+
+    Returns:
+        dict of stage name -> timing summary
+    """
+    import numpy as np
+    from PIL import Image
+    from preprocess_plan import planner, run_step, target_spec
+
+    handle = loader.acquire_model(model_name)
+    if handle is None:
+        return {}
+    try:
+        model, config = handle.model, handle.config
+        raw = base64.b64decode(encoded)
+        image = np.array(Image.open(BytesIO(raw)))
+
+        stages = {
+            "b64decode": time_stage(lambda: base64.b64decode(encoded), repeat, warmup),
+            "pil_open": time_stage(lambda: np.array(Image.open(BytesIO(raw))), repeat, warmup),
+        }
+
+        plan = planner.plan_for(image.shape, [target_spec(config)])
+        values = {"source": image}
+        for key, (op, parent, arg) in plan.steps.items():
+            source = values[parent]
+            stages[PLAN_STAGES.get(op, op)] = time_stage(
+                lambda: run_step(op, source, arg), repeat, warmup
+            )
+            values[key] = run_step(op, source, arg)
+
+        stages["prepare"] = time_stage(lambda: loader.prepare_input(image, config), repeat, warmup)
+        batch = loader.prepare_input(image, config)[None, ...]
+        stages["forward"] = time_stage(lambda: model.predict(batch, verbose=0), repeat, warmup)
+        probs = model.predict(batch, verbose=0)[0]
+        stages["format"] = time_stage(
+            lambda: loader.format_prediction(probs, config), repeat, warmup
+        )
+        return stages
+    finally:
+        handle.release()
+
+def benchmark_shared_prepare(loader, encoded, repeat, warmup):
+    """Prepare every model's input from one frame, separately vs with a shared plan"""
+    import numpy as np
+    from PIL import Image
+
+    image = np.array(Image.open(BytesIO(base64.b64decode(encoded))))
+    names = list(loader.models)
+    configs = [loader.model_configs[name] for name in names]
+    models = [loader.models[name] for name in names]
+
+    def separate():
+        for config in configs:
+            loader.prepare_input(image, config)
+
+    def shared():
+        frame = loader.plan_inputs(image, names)
+        for config in configs:
+            frame.input_for(config)
+
+    def shared_forward():
+        frame = loader.plan_inputs(image, names)
+        for model, config in zip(models, configs):
+            model.predict(frame.input_for(config)[None, ...], verbose=0)
+
+    return {
+        "prepare_separate": time_stage(separate, repeat, warmup),
+        "prepare_shared": time_stage(shared, repeat, warmup),
+        "forward_shared": time_stage(shared_forward, repeat, warmup),
+    }
+
+def environment():
+    """Describe the machine and library versions a baseline was recorded on"""
+    import numpy as np
+    info = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+    }
+    try:
+        import tensorflow as tf
+        info["tensorflow"] = tf.__version__
+    except ImportError:
+        pass
+    try:
+        import cv2
+        info["opencv"] = cv2.__version__
+    except ImportError:
+        pass
+    return info
+
+def run_suite(loader, resolutions, formats, repeat, warmup):
+    """
+    Benchmark every loaded model at every resolution and format
+
+    Returns:
+        dict of "model/WxH/format" -> stage timings
+    """
+    results = {}
+    for resolution in resolutions:
+        width, height = parse_resolution(resolution)
+        for fmt in formats:
+            encoded = make_payload(width, height, fmt)
+            for model_name in loader.models:
+                key = f"{model_name}/{width}x{height}/{fmt}"
+                print(f"[INFO] Benchmarking {key}...")
+                results[key] = benchmark_model(loader, model_name, encoded, repeat, warmup)
+            if len(loader.models) > 1:
+                key = f"all/{width}x{height}/{fmt}"
+                print(f"[INFO] Benchmarking {key}...")
+                results[key] = benchmark_shared_prepare(loader, encoded, repeat, warmup)
+    return results
+
+def compare(current, baseline, threshold, noise_floor_us):
+    """
+    Compare stage medians against a baseline
+
+    Returns:
+        List of regressions (key, stage, baseline_us, current_us, ratio)
+    """
+    regressions = []
+    for key, stages in current.items():
+        for stage, timing in stages.items():
+            base = baseline.get(key, {}).get(stage)
+            if base is None:
+                continue
+            before, after = base["median_us"], timing["median_us"]
+            ratio = after / before if before else float("inf")
+            if after > before * (1 + threshold) and after - before > noise_floor_us:
+                regressions.append((key, stage, before, after, ratio))
+    return regressions
+
+def print_results(results, baseline=None):
+    print("\n" + "="*88)
+    print(f"  {'case':<34} {'stage':<11} {'median us':>11} {'p95 us':>11} {'baseline':>11} {'ratio':>6}")
+    print("="*88)
+    for key, stages in results.items():
+        for stage, timing in stages.items():
+            base = (baseline or {}).get(key, {}).get(stage)
+            base_text = f"{base['median_us']:>11.1f}" if base else f"{'-':>11}"
+            ratio_text = f"{timing['median_us'] / base['median_us']:>6.2f}" if base and base["median_us"] else f"{'-':>6}"
+            print(f"  {key:<34} {stage:<11} {timing['median_us']:>11.1f} {timing['p95_us']:>11.1f} "
+                  f"{base_text} {ratio_text}")
+    print("="*88 + "\n")
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage microbenchmarks for the prediction hot path")
+    parser.add_argument("--models", nargs="*", help="Models to benchmark (default: all registered)")
+    parser.add_argument("--resolutions", nargs="+", default=DEFAULT_RESOLUTIONS,
+                        help="Upload resolutions as WIDTHxHEIGHT")
+    parser.add_argument("--formats", nargs="+", default=DEFAULT_FORMATS, choices=["jpeg", "png"],
+                        help="Upload encodings (png uploads are RGBA)")
+    parser.add_argument("--repeat", type=int, default=50, help="Timed runs per stage")
+    parser.add_argument("--warmup", type=int, default=5, help="Untimed runs per stage")
+    parser.add_argument("--stub", action="store_true",
+                        help="Benchmark random-weight stub models instead of the real files")
+    parser.add_argument("--save-baseline", help="Write results as a JSON baseline")
+    parser.add_argument("--compare", help="Compare against a JSON baseline; exit 1 on regression")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Allowed slowdown of a stage median (0.2 = 20%%)")
+    parser.add_argument("--noise-floor-us", type=float, default=DEFAULT_NOISE_FLOOR_US,
+                        help="Ignore regressions smaller than this many microseconds")
+    args = parser.parse_args()
+
+    if args.stub:
+        # Set before the loader module is imported; no file watching during a benchmark
+        workdir = tempfile.mkdtemp(prefix="hot_path_bench_")
+        os.environ["MODEL_DIR"] = str(Path(workdir) / "models")
+        os.environ["MODEL_CACHE_DIR"] = str(Path(workdir) / "cache")
+        from stub_models import write_stub_models
+        write_stub_models(os.environ["MODEL_DIR"])
+
+    from unified_model_loader import DEFAULT_MODEL_FILES, UnifiedModelLoader
+
+    model_files = DEFAULT_MODEL_FILES
+    if args.models:
+        model_files = {name: DEFAULT_MODEL_FILES[name] for name in args.models}
+    loader = UnifiedModelLoader(model_files=model_files)
+    if not loader.models:
+        print("[ERROR] No models loaded")
+        return 1
+
+    results = run_suite(loader, args.resolutions, args.formats, args.repeat, args.warmup)
+
+    baseline = None
+    if args.compare:
+        baseline_doc = json.loads(Path(args.compare).read_text())
+        baseline = baseline_doc["results"]
+        if baseline_doc.get("environment") != environment():
+            print("[WARNING] Baseline was recorded on a different machine or library versions")
+    print_results(results, baseline)
+
+    if args.save_baseline:
+        path = Path(args.save_baseline)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({
+            "environment": environment(),
+            "repeat": args.repeat,
+            "results": results,
+        }, indent=2))
+        print(f"[SUCCESS] Baseline written to {path}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold, args.noise_floor_us)
+        if regressions:
+            for key, stage, before, after, ratio in regressions:
+                print(f"[ERROR] {key} {stage}: {before:.1f} -> {after:.1f} us ({ratio:.2f}x)")
+            print(f"[ERROR] {len(regressions)} stage(s) regressed beyond {args.threshold:.0%}")
+            return 1
+        print(f"[SUCCESS] No stage regressed beyond {args.threshold:.0%}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+"""
+Embedding Cache
+Frozen-backbone embeddings stored once, for head-only training in seconds
+
+With a frozen backbone every epoch recomputes the same features. Instead,
+each image goes through the backbone once. Its pooled embedding (the input
+of the classification head) is written to a memory-mapped float32 matrix,
+keyed by a hash of the file contents. Training the head then only reads rows
+of that matrix, and newly collected samples only cost one forward pass each.
+
+Layout of a store directory:
+    embeddings.f32   (capacity, dim) float32 rows, grown by doubling
+    index.json       {"backbone", "dim", "count", "rows": {hash: row}}
+
+The store is tied to its backbone: opening it with a different backbone id
+starts a fresh store, since the embeddings would no longer match.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp"}
+DEFAULT_IMG_SIZE = 160
+DEFAULT_BACKBONE = "efficientnetb0-imagenet"
+INITIAL_CAPACITY = 1024
+
+
+def image_hash(path):
+    """Content hash of an image file (renames and copies share an entry)"""
+    return hashlib.blake2b(Path(path).read_bytes(), digest_size=16).hexdigest()
+
+
+def scan_dataset(data_dir):
+    """
+    List images in class-per-folder layout (as image_dataset_from_directory)
+
+    Returns:
+        (paths, labels, class_names), labels as indices into class_names
+    """
+    data_dir = Path(data_dir)
+    class_names = sorted(p.name for p in data_dir.iterdir() if p.is_dir())
+    paths, labels = [], []
+    for label, name in enumerate(class_names):
+        for path in sorted((data_dir / name).rglob("*")):
+            if path.suffix.lower() in IMAGE_SUFFIXES:
+                paths.append(path)
+                labels.append(label)
+    return paths, np.array(labels, dtype=np.int64), class_names
+
+
+def build_embedding_model(img_size=DEFAULT_IMG_SIZE, model=None):
+    """
+    Backbone that maps images to embeddings
+
+    Args:
+        img_size: Input size of the default EfficientNetB0 backbone
+        model: Optional trained classifier; its embedding is the input of the
+            head, i.e. the output of its global pooling layer
+
+    Returns:
+        Keras model (img_size, img_size, 3) uint8-range RGB -> (dim,)
+    """
+    import tensorflow as tf
+
+    if model is not None:
+        pooling = [l for l in model.layers if isinstance(l, tf.keras.layers.GlobalAveragePooling2D)]
+        if not pooling:
+            raise ValueError("Model has no GlobalAveragePooling2D layer to take embeddings from")
+        return tf.keras.Model(model.inputs, pooling[-1].output, name="embedding_model")
+
+    # EfficientNet normalizes [0, 255] inputs itself
+    return tf.keras.applications.EfficientNetB0(
+        include_top=False, weights="imagenet", pooling="avg", input_shape=(img_size, img_size, 3)
+    )
+
+
+def load_images(paths, img_size=DEFAULT_IMG_SIZE):
+    """Decode and resize images to a (N, img_size, img_size, 3) float32 batch in [0, 255]"""
+    import cv2
+    batch = np.empty((len(paths), img_size, img_size, 3), dtype=np.float32)
+    for i, path in enumerate(paths):
+        image = cv2.imread(str(path))
+        if image is None:
+            raise ValueError(f"Failed to read image: {path}")
+        # Keep as RGB - models were trained on RGB images
+        batch[i] = cv2.resize(cv2.cvtColor(image, cv2.COLOR_BGR2RGB), (img_size, img_size))
+    return batch
+
+
+class EmbeddingStore:
+    """Memory-mapped embedding matrix keyed by image hash"""
+
+    def __init__(self, directory, dim, backbone=DEFAULT_BACKBONE):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.dim = dim
+        self.backbone = backbone
+        self._data_path = self.directory / "embeddings.f32"
+        self._index_path = self.directory / "index.json"
+        self.rows = {}
+        self.count = 0
+
+        if self._index_path.exists():
+            index = json.loads(self._index_path.read_text())
+            if index.get("backbone") == backbone and index.get("dim") == dim:
+                self.rows = index["rows"]
+                self.count = index["count"]
+            else:
+                print(f"[WARNING] Embedding store {self.directory} was built with "
+                      f"{index.get('backbone')} ({index.get('dim')}-d); starting over")
+        capacity = max(INITIAL_CAPACITY, self.count)
+        self._matrix = self._open(capacity)
+
+    def _open(self, capacity):
+        size = capacity * self.dim * 4
+        mode = "r+" if self._data_path.exists() else "w+"
+        if mode == "r+" and self._data_path.stat().st_size < size:
+            with open(self._data_path, "r+b") as f:
+                f.truncate(size)
+        return np.memmap(self._data_path, dtype=np.float32, mode=mode, shape=(capacity, self.dim))
+
+    @property
+    def capacity(self):
+        return self._matrix.shape[0]
+
+    def __contains__(self, key):
+        return key in self.rows
+
+    def __len__(self):
+        return self.count
+
+    def missing(self, keys):
+        return [key for key in keys if key not in self.rows]
+
+    def add(self, keys, vectors):
+        """Append embeddings for new keys (existing keys are overwritten in place)"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        new = sum(1 for key in dict.fromkeys(keys) if key not in self.rows)
+        if self.count + new > self.capacity:
+            capacity = self.capacity
+            while capacity < self.count + new:
+                capacity *= 2
+            self._matrix.flush()
+            del self._matrix
+            self._matrix = self._open(capacity)
+        for key, vector in zip(keys, vectors):
+            row = self.rows.get(key)
+            if row is None:
+                row = self.rows[key] = self.count
+                self.count += 1
+            self._matrix[row] = vector
+
+    def get(self, keys):
+        """(N, dim) embeddings for keys, in order (fancy indexing copies the rows)"""
+        return np.asarray(self._matrix[[self.rows[key] for key in keys]])
+
+    def flush(self):
+        """Persist the matrix and the index (index written last, atomically)"""
+        self._matrix.flush()
+        tmp = self._index_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({
+            "backbone": self.backbone,
+            "dim": self.dim,
+            "count": self.count,
+            "rows": self.rows,
+        }))
+        os.replace(tmp, self._index_path)
+
+
+def cache_embeddings(store, embedding_model, paths, img_size=DEFAULT_IMG_SIZE, batch_size=64):
+    """
+    Embed the images that aren't in the store yet
+
+    Returns:
+        (hashes in path order, number of newly embedded images)
+    """
+    hashes = [image_hash(path) for path in paths]
+    pending = {}
+    for key, path in zip(hashes, paths):
+        if key not in store and key not in pending:
+            pending[key] = path
+
+    keys, todo = list(pending), list(pending.values())
+    for start in range(0, len(todo), batch_size):
+        batch = load_images(todo[start:start + batch_size], img_size)
+        vectors = embedding_model.predict(batch, verbose=0)
+        store.add(keys[start:start + batch_size], vectors)
+        print(f"[INFO] Embedded {min(start + batch_size, len(todo))}/{len(todo)} new images")
+    store.flush()
+    return hashes, len(todo)
+
+
+def build_head(dim, num_classes):
+    """Classification head of the EfficientNetB0 training notebook, on embeddings"""
+    import tensorflow as tf
+    from tensorflow.keras import layers
+
+    inputs = tf.keras.Input(shape=(dim,), name="embedding")
+    x = layers.BatchNormalization()(inputs)
+    x = layers.Dropout(0.4)(x)
+    x = layers.Dense(256, activation="relu")(x)
+    x = layers.BatchNormalization()(x)
+    x = layers.Dropout(0.3)(x)
+    outputs = layers.Dense(num_classes, activation="softmax", dtype="float32")(x)
+    return tf.keras.Model(inputs, outputs, name="head")
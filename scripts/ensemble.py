@@ -0,0 +1,150 @@
+"""
+Early-Exit Ensemble
+Fuses letter predictions from several models in a shared label space
+
+Models run cheapest first (by parameter count). After each one the
+probabilities seen so far are fused; once the fused confidence clears the
+exit threshold the remaining models are skipped, so confident frames cost
+about one small-model forward pass and only ambiguous frames pay for the
+whole ensemble.
+
+Fusion is a plain weighted average in the shared label space: a label a
+model doesn't predict counts as 0 for that model. A label only one model
+knows (e.g. "del" from asl_alphabet) is therefore diluted by the other
+models' weights like any label they put no mass on, and can't outvote a
+label several models agree on.
+"""
+
+import os
+import threading
+
+import numpy as np
+
+DEFAULT_EXIT_THRESHOLD = float(os.environ.get("ENSEMBLE_EXIT_THRESHOLD", 0.9))
+
+
+class LabelSpace:
+    """Union of several models' class lists with per-model index maps"""
+
+    def __init__(self, model_classes):
+        """
+        Args:
+            model_classes: dict of model name -> list of class names
+        """
+        self.labels = sorted(set().union(*model_classes.values()))
+        position = {label: i for i, label in enumerate(self.labels)}
+        self.indices = {
+            name: np.array([position[label] for label in classes], dtype=np.intp)
+            for name, classes in model_classes.items()
+        }
+
+    def project(self, model_name, probs):
+        """Scatter a model's probabilities into the shared label order"""
+        shared = np.zeros(len(self.labels), dtype=np.float32)
+        shared[self.indices[model_name]] = probs
+        return shared
+
+
+def fuse(projected, weights):
+    """
+    Weighted average of projected probabilities
+
+    Args:
+        projected: (models, labels) probabilities in the shared label space
+            (0 for labels a model doesn't predict)
+        weights: (models,) model weights
+
+    Returns:
+        1-D fused probabilities summing to 1
+    """
+    weights = np.asarray(weights, dtype=np.float32)
+    fused = weights @ np.asarray(projected, dtype=np.float32)
+    total = fused.sum()
+    return fused / total if total > 0 else fused
+
+
+class EarlyExitEnsemble:
+    """Confidence-gated ensemble over models with overlapping class lists"""
+
+    def __init__(self, exit_threshold=DEFAULT_EXIT_THRESHOLD):
+        self.exit_threshold = exit_threshold
+        self._label_spaces = {}
+        self._lock = threading.Lock()
+
+    def label_space(self, model_classes):
+        """Cached LabelSpace for a set of models (class lists change on reload)"""
+        key = tuple(sorted((name, tuple(classes)) for name, classes in model_classes.items()))
+        with self._lock:
+            space = self._label_spaces.get(key)
+            if space is None:
+                space = LabelSpace(model_classes)
+                self._label_spaces[key] = space
+            return space
+
+    def run(self, model_names, costs, run_model, weights=None, exit_threshold=None):
+        """
+        Run models cheapest-first until the fused confidence clears the threshold
+
+        Args:
+            model_names: Models in the ensemble
+            costs: dict of model name -> relative cost (models run in ascending order)
+            run_model: callable(name) -> loader.predict_proba result dict
+            weights: Optional dict of model name -> weight (default 1.0)
+            exit_threshold: Fused confidence that stops the ensemble early
+
+        Returns:
+            dict with "probabilities", "labels", "models_run", "models_skipped",
+            "early_exit" and per-model "results"
+
+        Raises:
+            ValueError: a model's classes don't overlap the rest of the ensemble
+        """
+        weights = weights or {}
+        exit_threshold = self.exit_threshold if exit_threshold is None else exit_threshold
+        order = sorted(model_names, key=lambda name: costs.get(name, float("inf")))
+
+        results = {}
+        fused = None
+        space = None
+        for position, name in enumerate(order):
+            result = run_model(name)
+            results[name] = result
+            if not result.get("success"):
+                continue
+
+            served = {n: r["classes"] for n, r in results.items() if r.get("success")}
+            space = self.label_space(served)
+            _check_overlap(served)
+            fused = fuse(
+                [space.project(n, results[n]["probabilities"]) for n in served],
+                [weights.get(n, 1.0) for n in served],
+            )
+            if fused.max() >= exit_threshold and position < len(order) - 1:
+                return _ensemble_result(fused, space, results, order[position + 1:], True)
+
+        return _ensemble_result(fused, space, results, [], False)
+
+
+def _check_overlap(model_classes):
+    """Every model must share at least one label with the others"""
+    if len(model_classes) < 2:
+        return
+    for name, classes in model_classes.items():
+        others = set().union(*(c for n, c in model_classes.items() if n != name))
+        if not others.intersection(classes):
+            raise ValueError(f"Model '{name}' shares no classes with the rest of the ensemble")
+
+
+def _ensemble_result(fused, space, results, skipped, early_exit):
+    return {
+        "probabilities": fused,
+        "labels": space.labels if space is not None else [],
+        "models_run": list(results),
+        "models_skipped": skipped,
+        "early_exit": early_exit,
+        "results": results,
+    }
+
+
+# Global instance
+ensemble = EarlyExitEnsemble()
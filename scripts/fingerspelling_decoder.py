@@ -0,0 +1,186 @@
+"""
+Fingerspelling Decoder
+Turns a per-frame letter probability stream into committed text events
+
+Per-frame predictions flicker between neighbouring letters. Each session
+keeps a small decoder that
+- smooths the probabilities with an exponential moving average,
+- treats "nothing" (and low-confidence frames) as a CTC-style blank,
+- commits a letter once it has led for `min_frames` frames, and collapses
+  repeats: the same letter is committed again only after a blank or a
+  different letter, so "LL" has to be signed as L, pause, L,
+- maps "space" and a long enough blank run to a word boundary and "del" to
+  deleting the last letter.
+
+Models without these labels (sign_mnist, the serving default) still decode:
+low-confidence frames are the only blanks, and words end on a pause of
+`word_gap_frames` frames.
+
+Work per frame is O(classes). Only committed events are returned, so
+clients get a response with an empty event list for most frames instead
+of a full probability dict.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+BLANK_LABELS = ("nothing",)
+SPACE_LABEL = "space"
+DELETE_LABEL = "del"
+
+DEFAULT_ALPHA = float(os.environ.get("FINGERSPELL_ALPHA", 0.4))
+DEFAULT_COMMIT_THRESHOLD = float(os.environ.get("FINGERSPELL_COMMIT_THRESHOLD", 0.6))
+DEFAULT_MIN_FRAMES = int(os.environ.get("FINGERSPELL_MIN_FRAMES", 4))
+DEFAULT_WORD_GAP_FRAMES = int(os.environ.get("FINGERSPELL_WORD_GAP_FRAMES", 15))
+
+MAX_SESSIONS = int(os.environ.get("FINGERSPELL_MAX_SESSIONS", 1024))
+SESSION_TTL_SECONDS = float(os.environ.get("FINGERSPELL_SESSION_TTL", 300))
+
+
+class FingerspellingDecoder:
+    """Streaming decoder for one session and one class list"""
+
+    def __init__(self, classes, alpha=DEFAULT_ALPHA, commit_threshold=DEFAULT_COMMIT_THRESHOLD,
+                 min_frames=DEFAULT_MIN_FRAMES, word_gap_frames=DEFAULT_WORD_GAP_FRAMES):
+        self.classes = list(classes)
+        self.alpha = alpha
+        self.commit_threshold = commit_threshold
+        self.min_frames = min_frames
+        self.word_gap_frames = word_gap_frames
+        self._blank = np.array([c in BLANK_LABELS for c in self.classes])
+        # Frames of one session can arrive on different request threads
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self._smoothed = None
+        self._leader = None        # Label leading the smoothed distribution
+        self._run = 0              # Frames the leader has led
+        self._last_committed = None  # Cleared by a blank, for repeat collapsing
+        self._blank_run = 0
+        self.word = []
+        self.text = []
+        self.frames = 0
+
+    def _label(self, probs):
+        """Leading label of the smoothed distribution (None = blank)"""
+        index = int(np.argmax(probs))
+        if self._blank[index] or probs[index] < self.commit_threshold:
+            return None, float(probs[index])
+        return self.classes[index], float(probs[index])
+
+    def push(self, probs):
+        """
+        Consume one frame's probabilities
+
+        Args:
+            probs: (num_classes,) probabilities in self.classes order
+
+        Returns:
+            List of committed events (usually empty)
+        """
+        with self._lock:
+            return self._push(np.asarray(probs, dtype=np.float32))
+
+    def _push(self, probs):
+        if self._smoothed is None:
+            self._smoothed = probs.copy()
+        else:
+            # In place: s = alpha * p + (1 - alpha) * s
+            self._smoothed *= 1.0 - self.alpha
+            self._smoothed += self.alpha * probs
+        self.frames += 1
+
+        label, confidence = self._label(self._smoothed)
+        if label == self._leader:
+            self._run += 1
+        else:
+            self._leader, self._run = label, 1
+
+        if label is None:
+            self._blank_run += 1
+            if self._run >= self.min_frames:
+                self._last_committed = None
+            if self._blank_run == self.word_gap_frames and self.word:
+                return [self._end_word()]
+            return []
+
+        self._blank_run = 0
+        if self._run != self.min_frames or label == self._last_committed:
+            return []
+        self._last_committed = label
+        return self._commit(label, confidence)
+
+    def _commit(self, label, confidence):
+        if label == SPACE_LABEL:
+            return [self._end_word()] if self.word else []
+        if label == DELETE_LABEL:
+            if not self.word:
+                return []
+            return [{"type": "delete", "letter": self.word.pop(), "frame": self.frames}]
+        self.word.append(label)
+        return [{"type": "letter", "letter": label, "confidence": confidence, "frame": self.frames}]
+
+    def _end_word(self):
+        word = "".join(self.word)
+        self.text.append(word)
+        self.word = []
+        return {"type": "word", "word": word, "frame": self.frames}
+
+    def flush(self):
+        """End the current word (e.g. when the client stops streaming)"""
+        with self._lock:
+            return [self._end_word()] if self.word else []
+
+    def state(self):
+        return {
+            "text": " ".join(self.text + ["".join(self.word)]).strip(),
+            "word": "".join(self.word),
+            "frames": self.frames,
+        }
+
+
+class DecoderSessions:
+    """Per-session decoders, evicted when idle or when there are too many"""
+
+    def __init__(self, max_sessions=MAX_SESSIONS, ttl=SESSION_TTL_SECONDS):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions = OrderedDict()  # session_id -> (decoder, model, last_used)
+        self._lock = threading.Lock()
+
+    def get(self, session_id, model_name, classes):
+        """Decoder for a session (a new one if the model or its classes changed)"""
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            entry = self._sessions.pop(session_id, None)
+            if entry is None or entry[1] != model_name or entry[0].classes != list(classes):
+                entry = (FingerspellingDecoder(classes), model_name, now)
+            self._sessions[session_id] = (entry[0], model_name, now)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            return entry[0]
+
+    def drop(self, session_id):
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+        return entry[0] if entry else None
+
+    def _evict(self, now):
+        while self._sessions:
+            _, _, last_used = next(iter(self._sessions.values()))
+            if now - last_used < self.ttl:
+                break
+            self._sessions.popitem(last=False)
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+# Global session registry
+sessions = DecoderSessions()
@@ -0,0 +1,451 @@
+"""
+Gesture Index
+Few-shot custom gestures: nearest-neighbour search over backbone embeddings
+
+Custom gestures recorded on the collect page are served without retraining:
+each sample's embedding (see embeddings.py) goes into the user's index, and
+a frame is classified by a similarity-weighted vote of its k nearest
+samples. Adding or removing a gesture takes effect on the next frame.
+
+Two index types, both over L2-normalized float32 vectors (dot product =
+cosine similarity):
+- BruteForceIndex: one matrix-vector product; exact, and about half a
+  millisecond at IVF_THRESHOLD 1280-d vectors (cost grows with count x dim)
+- IVFIndex: k-means partitions, searching only the `nprobe` closest lists,
+  used automatically once an index grows past IVF_THRESHOLD vectors;
+  partitions are trained outside the index lock, so classification keeps
+  running while a large add repartitions
+
+Indexes are persisted per user as GESTURE_INDEX_DIR/<user_id>/index.npz.
+"""
+
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+GESTURE_INDEX_DIR = Path(os.environ.get("GESTURE_INDEX_DIR", "data/gesture_index"))
+# Trained classifier to take embeddings from (default: ImageNet EfficientNetB0)
+GESTURE_BACKBONE = os.environ.get("GESTURE_BACKBONE")
+IVF_THRESHOLD = int(os.environ.get("GESTURE_IVF_THRESHOLD", 2048))
+DEFAULT_K = 5
+DEFAULT_MIN_SIMILARITY = float(os.environ.get("GESTURE_MIN_SIMILARITY", 0.5))
+# Indexes kept in memory; evicted ones are reloaded from disk on next use
+MAX_CACHED_USERS = int(os.environ.get("GESTURE_MAX_CACHED_USERS", 256))
+CACHE_TTL_SECONDS = float(os.environ.get("GESTURE_INDEX_TTL", 600))
+INDEX_FILE = "index.npz"
+
+_USER_ID = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+
+class GestureIndexError(ValueError):
+    """Invalid index operation (bad user id, dimension mismatch, ...)"""
+
+
+class BackboneUnavailableError(RuntimeError):
+    """The embedding backbone could not be loaded"""
+
+
+def normalize(vectors):
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class BruteForceIndex:
+    """Exact cosine search over a growable matrix"""
+
+    kind = "brute_force"
+
+    def __init__(self, dim):
+        self.dim = dim
+        self._vectors = np.empty((64, dim), dtype=np.float32)
+        self.labels = []
+        self.count = 0
+
+    def add(self, vectors, labels):
+        vectors = normalize(vectors)
+        if vectors.shape[1] != self.dim:
+            raise GestureIndexError(f"Expected {self.dim}-d embeddings, got {vectors.shape[1]}-d")
+        needed = self.count + len(vectors)
+        if needed > len(self._vectors):
+            grown = np.empty((max(needed, 2 * len(self._vectors)), self.dim), dtype=np.float32)
+            grown[:self.count] = self._vectors[:self.count]
+            self._vectors = grown
+        self._vectors[self.count:needed] = vectors
+        self.labels.extend(labels)
+        self.count = needed
+
+    def remove(self, label):
+        """Drop every sample of a label; returns how many were removed"""
+        keep = [i for i, l in enumerate(self.labels) if l != label]
+        removed = self.count - len(keep)
+        if removed:
+            self._vectors[:len(keep)] = self._vectors[keep]
+            self.labels = [self.labels[i] for i in keep]
+            self.count = len(keep)
+        return removed
+
+    def vectors(self):
+        return self._vectors[:self.count]
+
+    def search(self, query, k=DEFAULT_K):
+        """
+        k nearest samples of one normalized query
+
+        Returns:
+            (similarities, labels), most similar first
+        """
+        if self.count == 0:
+            return np.empty(0, dtype=np.float32), []
+        scores = self._vectors[:self.count] @ query
+        k = min(k, self.count)
+        top = np.argpartition(scores, -k)[-k:]
+        top = top[np.argsort(scores[top])[::-1]]
+        return scores[top], [self.labels[i] for i in top]
+
+
+class IVFIndex:
+    """Inverted-file index: k-means partitions, probe the closest few"""
+
+    kind = "ivf"
+
+    def __init__(self, dim, nlist=None, nprobe=8):
+        self.dim = dim
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.centroids = None
+        self.lists = []  # Per partition: BruteForceIndex
+
+    @property
+    def count(self):
+        return sum(part.count for part in self.lists)
+
+    @property
+    def labels(self):
+        return [label for part in self.lists for label in part.labels]
+
+    def vectors(self):
+        return np.concatenate([part.vectors() for part in self.lists]) if self.lists else np.empty((0, self.dim))
+
+    def train(self, vectors, labels, iterations=10, seed=0):
+        """(Re)partition all vectors with spherical k-means"""
+        vectors = normalize(vectors)
+        nlist = self.nlist or max(1, int(np.sqrt(len(vectors))))
+        rng = np.random.default_rng(seed)
+        centroids = vectors[rng.choice(len(vectors), size=min(nlist, len(vectors)), replace=False)]
+        for _ in range(iterations):
+            assign = np.argmax(vectors @ centroids.T, axis=1)
+            for c in range(len(centroids)):
+                members = vectors[assign == c]
+                if len(members):
+                    centroids[c] = normalize(members.mean(axis=0))[0]
+        self.centroids = centroids
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        self.lists = [BruteForceIndex(self.dim) for _ in range(len(centroids))]
+        for c, part in enumerate(self.lists):
+            members = np.flatnonzero(assign == c)
+            if len(members):
+                part.add(vectors[members], [labels[i] for i in members])
+
+    def add(self, vectors, labels):
+        vectors = normalize(vectors)
+        assign = np.argmax(vectors @ self.centroids.T, axis=1)
+        for c in np.unique(assign):
+            members = np.flatnonzero(assign == c)
+            self.lists[c].add(vectors[members], [labels[i] for i in members])
+
+    def remove(self, label):
+        return sum(part.remove(label) for part in self.lists)
+
+    def search(self, query, k=DEFAULT_K):
+        probe = np.argsort(self.centroids @ query)[::-1][:self.nprobe]
+        scores, labels = [], []
+        for c in probe:
+            s, l = self.lists[c].search(query, k)
+            scores.append(s)
+            labels.extend(l)
+        if not labels:
+            return np.empty(0, dtype=np.float32), []
+        scores = np.concatenate(scores)
+        top = np.argsort(scores)[::-1][:k]
+        return scores[top], [labels[i] for i in top]
+
+
+class GestureIndex:
+    """One user's gestures; switches to IVF once it grows large"""
+
+    def __init__(self, dim, ivf_threshold=IVF_THRESHOLD):
+        self.dim = dim
+        self.ivf_threshold = ivf_threshold
+        self.index = BruteForceIndex(dim)
+        # IVF partitions are retrained when the index doubles past its training size
+        self._trained_at = 0
+        # While partitions train off the lock: adds/removes to replay onto them
+        self._pending = None
+        self._lock = threading.Lock()
+        # Held across snapshot + write so saves land on disk in order
+        self._save_lock = threading.Lock()
+
+    @property
+    def count(self):
+        return self.index.count
+
+    def gestures(self):
+        """Label -> sample count"""
+        counts = {}
+        for label in self.index.labels:
+            counts[label] = counts.get(label, 0) + 1
+        return counts
+
+    def add(self, vectors, label):
+        vectors = normalize(vectors)
+        with self._lock:
+            self.index.add(vectors, [label] * len(vectors))
+            if self._pending is not None:
+                self._pending.append((vectors, label))
+                return
+            if not self._needs_partitioning():
+                return
+            # Copy: removes compact the index's buffer in place
+            vectors, labels = self.index.vectors().copy(), list(self.index.labels)
+            self._pending = []
+
+        # k-means takes seconds on large indexes; searches keep using the old index
+        ivf = IVFIndex(self.dim)
+        try:
+            ivf.train(vectors, labels)
+        except BaseException:
+            with self._lock:
+                self._pending = None
+            raise
+
+        with self._lock:
+            pending, self._pending = self._pending, None
+            for vectors, label in pending:
+                if vectors is None:
+                    ivf.remove(label)
+                else:
+                    ivf.add(vectors, [label] * len(vectors))
+            # Removes while training may have shrunk the index back below IVF size
+            if ivf.count >= self.ivf_threshold // 2:
+                self.index, self._trained_at = ivf, len(labels)
+
+    def _needs_partitioning(self):
+        return self.index.count >= self.ivf_threshold and (
+            self.index.kind == "brute_force" or self.index.count >= 2 * self._trained_at
+        )
+
+    def _repartition(self):
+        vectors, labels = self.index.vectors(), self.index.labels
+        ivf = IVFIndex(self.dim)
+        ivf.train(vectors, labels)
+        self.index = ivf
+        self._trained_at = len(labels)
+
+    def remove(self, label):
+        with self._lock:
+            removed = self.index.remove(label)
+            if self._pending is not None:
+                self._pending.append((None, label))
+            if self.index.kind == "ivf" and self.index.count < self.ivf_threshold // 2:
+                flat = BruteForceIndex(self.dim)
+                flat.add(self.index.vectors(), self.index.labels)
+                self.index, self._trained_at = flat, 0
+            return removed
+
+    def classify(self, embedding, k=DEFAULT_K, min_similarity=DEFAULT_MIN_SIMILARITY):
+        """
+        Similarity-weighted vote of the k nearest samples
+
+        Returns:
+            dict with prediction (None below min_similarity), confidence,
+            similarity of the nearest sample and the neighbours
+        """
+        query = normalize(embedding)[0]
+        with self._lock:
+            scores, labels = self.index.search(query, k)
+        if not labels:
+            return {"prediction": None, "confidence": 0.0, "similarity": 0.0, "neighbors": []}
+
+        votes = {}
+        for score, label in zip(scores.tolist(), labels):
+            votes[label] = votes.get(label, 0.0) + max(score, 0.0)
+        best = max(votes, key=votes.get)
+        total = sum(votes.values())
+        similarity = float(scores[0])
+        return {
+            "prediction": best if similarity >= min_similarity else None,
+            "confidence": votes[best] / total if total else 0.0,
+            "similarity": similarity,
+            "neighbors": [{"label": l, "similarity": float(s)} for s, l in zip(scores, labels)],
+        }
+
+    def save(self, directory):
+        """
+        Write all samples as one file, atomically (the IVF partitioning is
+        rebuilt on load)
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        with self._save_lock:
+            with self._lock:
+                # Copy: removes compact the index's buffer in place
+                vectors, labels = self.index.vectors().copy(), list(self.index.labels)
+            fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp.npz")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    np.savez(f, vectors=vectors, labels=np.array(labels, dtype=str), dim=self.dim)
+                os.replace(tmp, directory / INDEX_FILE)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+
+    @classmethod
+    def load(cls, directory, dim):
+        index = cls(dim)
+        path = Path(directory) / INDEX_FILE
+        if not path.exists():
+            return index
+        with np.load(path) as data:
+            vectors, labels, saved_dim = data["vectors"], data["labels"].tolist(), int(data["dim"])
+        if saved_dim != dim:
+            print(f"[WARNING] Gesture index {directory} doesn't match the {dim}-d backbone; starting over")
+            return index
+        if len(vectors):
+            index.index.add(vectors, labels)
+            if index.count >= index.ivf_threshold:
+                index._repartition()
+        return index
+
+
+class UserIndexes:
+    """
+    Per-user gesture indexes, loaded on first use and saved on change
+
+    Only users with saved gestures are cached, evicted when idle or when
+    there are too many (like DecoderSessions); every change is on disk, so
+    an evicted index is simply reloaded.
+    """
+
+    def __init__(self, root=GESTURE_INDEX_DIR, max_users=MAX_CACHED_USERS, ttl=CACHE_TTL_SECONDS):
+        self.root = Path(root)
+        self.max_users = max_users
+        self.ttl = ttl
+        self._indexes = OrderedDict()  # user_id -> (GestureIndex, last_used)
+        self._lock = threading.Lock()
+
+    def _directory(self, user_id):
+        if not _USER_ID.match(user_id or ""):
+            raise GestureIndexError("'user_id' must be 1-64 letters, digits, '_', '-' or '.'")
+        return self.root / user_id
+
+    def exists(self, user_id):
+        """Whether the user has any saved gestures (without loading them)"""
+        directory = self._directory(user_id)
+        with self._lock:
+            if user_id in self._indexes:
+                return True
+        return (directory / INDEX_FILE).exists()
+
+    def get(self, user_id, dim, create=False):
+        """
+        The user's index, or None for a user without gestures (unless `create`)
+        """
+        directory = self._directory(user_id)
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            entry = self._indexes.pop(user_id, None)
+            index = entry[0] if entry is not None and entry[0].dim == dim else None
+            if index is None:
+                if not create and not (directory / INDEX_FILE).exists():
+                    return None
+                index = GestureIndex.load(directory, dim)
+            self._indexes[user_id] = (index, now)
+            while len(self._indexes) > self.max_users:
+                self._indexes.popitem(last=False)
+            return index
+
+    def _evict(self, now):
+        while self._indexes:
+            _, last_used = next(iter(self._indexes.values()))
+            if now - last_used < self.ttl:
+                break
+            self._indexes.popitem(last=False)
+
+    def add(self, user_id, label, vectors, dim):
+        index = self.get(user_id, dim, create=True)
+        index.add(vectors, label)
+        index.save(self._directory(user_id))
+        return index
+
+    def remove(self, user_id, label, dim):
+        """Returns (index or None, samples removed)"""
+        index = self.get(user_id, dim)
+        if index is None:
+            return None, 0
+        removed = index.remove(label)
+        if removed:
+            index.save(self._directory(user_id))
+        return index, removed
+
+
+class GestureEmbedder:
+    """Lazily loaded embedding backbone for serving"""
+
+    def __init__(self, backbone_path=GESTURE_BACKBONE):
+        self.backbone_path = backbone_path
+        self.model = None
+        self.img_size = None
+        self._lock = threading.Lock()
+
+    def ensure_loaded(self):
+        """
+        Raises:
+            BackboneUnavailableError: TensorFlow or the backbone failed to load
+        """
+        with self._lock:
+            if self.model is None:
+                try:
+                    import tensorflow as tf
+                    from embeddings import DEFAULT_IMG_SIZE, build_embedding_model
+                    base = None
+                    if self.backbone_path:
+                        base = tf.keras.models.load_model(self.backbone_path, compile=False)
+                        self.img_size = base.input_shape[1]
+                    self.img_size = self.img_size or DEFAULT_IMG_SIZE
+                    self.model = build_embedding_model(self.img_size, base)
+                except Exception as e:
+                    print(f"[ERROR] Failed to load gesture embedding backbone: {str(e)[:100]}")
+                    raise BackboneUnavailableError(str(e)[:200]) from e
+                print(f"[SUCCESS] Gesture embedding backbone loaded "
+                      f"({self.model.output_shape[-1]}-d, {self.img_size}px)")
+        return self.model
+
+    @property
+    def dim(self):
+        return self.ensure_loaded().output_shape[-1]
+
+    def embed(self, images):
+        """(N, dim) embeddings of RGB(A) frames (any size)"""
+        import cv2
+        model = self.ensure_loaded()
+        batch = np.empty((len(images), self.img_size, self.img_size, 3), dtype=np.float32)
+        for i, image in enumerate(images):
+            if image.ndim == 2:
+                image = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
+            elif image.shape[2] == 4:
+                image = cv2.cvtColor(image, cv2.COLOR_RGBA2RGB)
+            batch[i] = cv2.resize(image, (self.img_size, self.img_size))
+        return np.asarray(model(batch, training=False))
+
+
+# Globals used by the serving routes
+user_indexes = UserIndexes()
+embedder = GestureEmbedder()
@@ -17,8 +17,43 @@ Usage:
     pipeline.collect_data(gesture_name, count=300)
     pipeline.train_model()
     pipeline.export_to_tfjs()
+
+    # Head-only (re)training on cached frozen-backbone embeddings
+    pipeline.train_head("data/gestures", epochs=30)
+    pipeline.export_head("my_gestures")  # Serve next to other heads
 """
 
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from embeddings import DEFAULT_IMG_SIZE
+from model_optimization import strip_training_layers
+
+# TFJS weight quantization modes -> bytes per weight after quantization
+TFJS_QUANTIZATION = {
+    None: 4,
+    "float16": 2,
+    "uint16": 2,
+    "uint8": 1,
+}
+
+# Link speeds used for the browser load-time estimate (Mbit/s)
+TFJS_LINK_SPEEDS = {
+    "3G": 1.6,
+    "4G": 12.0,
+    "Broadband": 50.0,
+}
+
+# Browsers fetch up to ~6 shards in parallel per origin; shards near 1-4 MB
+# balance request overhead against parallelism and HTTP cache granularity.
+DEFAULT_SHARD_SIZE_BYTES = 2 * 1024 * 1024
+
+DEFAULT_EMBEDDING_DIR = "data/embeddings"
+DEFAULT_HEADS_DIR = "data/heads"
+
+
 class ModelPipeline:
     """
     Unified interface for all model operations.
@@ -27,7 +62,10 @@ class ModelPipeline:
     
     def __init__(self):
         self.model = None
+        self.head = None
         self.labels = {}
+        self.embedding_model = None
+        self.embedding_store = None
     
     def collect_data(self, gesture_name: str, count: int = 300):
         """
@@ -59,6 +97,137 @@ class ModelPipeline:
         """
         raise NotImplementedError("To be implemented in next phase")
     
+    def cache_embeddings(
+        self,
+        data_dir: str,
+        store_dir: str = DEFAULT_EMBEDDING_DIR,
+        img_size: int = DEFAULT_IMG_SIZE,
+        base_model_path: str = None,
+        batch_size: int = 64,
+    ):
+        """
+        Precompute frozen-backbone embeddings for a class-per-folder dataset.
+        
+        Only images whose content hash isn't in the store yet go through the
+        backbone, so re-running after collecting new samples is incremental.
+        
+        Args:
+            data_dir: Dataset directory (one sub-folder per class)
+            store_dir: Memory-mapped embedding store directory
+            img_size: Backbone input size
+            base_model_path: Trained classifier to take embeddings from
+                (defaults to ImageNet EfficientNetB0)
+            batch_size: Images per backbone forward pass
+        
+        Returns:
+            (hashes, labels, class_names) for the dataset
+        """
+        import tensorflow as tf
+        from embeddings import EmbeddingStore, build_embedding_model, cache_embeddings, scan_dataset
+
+        if self.embedding_model is None:
+            base = None
+            if base_model_path is not None:
+                base = tf.keras.models.load_model(base_model_path, compile=False)
+            self.embedding_model = build_embedding_model(img_size, base)
+            if base_model_path:
+                from model_cache import file_sha256
+                # Content hash: a backbone re-exported under the same name starts a fresh store
+                backbone = f"{Path(base_model_path).name}-{file_sha256(base_model_path)[:16]}"
+            else:
+                backbone = "efficientnetb0-imagenet"
+            self.embedding_store = EmbeddingStore(
+                store_dir, self.embedding_model.output_shape[-1], f"{backbone}@{img_size}"
+            )
+
+        paths, labels, class_names = scan_dataset(data_dir)
+        if not paths:
+            raise ValueError(f"No images found in {data_dir}")
+        hashes, added = cache_embeddings(
+            self.embedding_store, self.embedding_model, paths, img_size, batch_size
+        )
+        print(f"[INFO] Embeddings: {added} new, {len(paths) - added} cached "
+              f"({len(self.embedding_store)} in store)")
+        return hashes, labels, class_names
+    
+    def train_head(
+        self,
+        data_dir: str,
+        epochs: int = 30,
+        batch_size: int = 256,
+        validation_split: float = 0.15,
+        **cache_options,
+    ):
+        """
+        Train only the classification head on cached embeddings.
+        
+        The trained head is attached to the backbone as self.model, ready
+        for export_to_tfjs(). Augmentation isn't applied per epoch: every
+        image contributes one fixed embedding.
+        
+        Args:
+            data_dir: Dataset directory (one sub-folder per class)
+            epochs: Number of training epochs
+            batch_size: Embeddings per training step
+            validation_split: Fraction of samples held out for validation
+            **cache_options: Passed to cache_embeddings()
+        
+        Returns:
+            Keras History
+        """
+        import numpy as np
+        import tensorflow as tf
+        from embeddings import build_head
+
+        hashes, labels, class_names = self.cache_embeddings(data_dir, **cache_options)
+        features = self.embedding_store.get(hashes)
+
+        rng = np.random.default_rng(42)
+        order = rng.permutation(len(labels))
+        features, labels = features[order], labels[order]
+        n_val = int(len(labels) * validation_split)
+        onehot = tf.keras.utils.to_categorical(labels, len(class_names))
+
+        head = build_head(features.shape[1], len(class_names))
+        head.compile(optimizer=tf.keras.optimizers.Adam(1e-3),
+                     loss="categorical_crossentropy", metrics=["accuracy"])
+        history = head.fit(
+            features[n_val:], onehot[n_val:],
+            validation_data=(features[:n_val], onehot[:n_val]) if n_val else None,
+            epochs=epochs, batch_size=batch_size, verbose=2,
+        )
+
+        inputs = tf.keras.Input(shape=self.embedding_model.input_shape[1:])
+        self.model = tf.keras.Model(inputs, head(self.embedding_model(inputs)))
+        self.head = head
+        self.labels = {i: name for i, name in enumerate(class_names)}
+        print(f"[SUCCESS] Head trained on {len(labels)} cached embeddings ({len(class_names)} classes)")
+        return history
+    
+    def export_head(self, name: str, heads_dir: str = DEFAULT_HEADS_DIR):
+        """
+        Export the head from train_head() for shared-backbone serving.
+        
+        Writes <heads_dir>/<name>.npz (BatchNorm folded, float32), which the
+        API loads next to other heads with POST /api/models/heads.
+        
+        Args:
+            name: Head name used by the serving API
+            heads_dir: Directory the API loads heads from (MULTI_HEAD_DIR)
+        
+        Returns:
+            Path of the head file
+        """
+        from multi_head import export_head, fold_keras_head
+
+        if self.head is None:
+            raise ValueError("No head to export - run train_head() first")
+        path = Path(heads_dir) / f"{name}.npz"
+        classes = [self.labels[i] for i in range(len(self.labels))]
+        export_head(path, classes, fold_keras_head(self.head))
+        print(f"[SUCCESS] Head exported to {path}")
+        return path
+    
     def evaluate_model(self, test_data_dir: str):
         """
         Evaluate model performance and generate metrics.
@@ -68,14 +237,117 @@ class ModelPipeline:
         """
         raise NotImplementedError("To be implemented in next phase")
     
-    def export_to_tfjs(self, output_dir: str = "public/tfjs"):
+    def export_to_tfjs(
+        self,
+        output_dir: str = "public/tfjs",
+        model_path: str = None,
+        quantization: str = "float16",
+        shard_size_bytes: int = DEFAULT_SHARD_SIZE_BYTES,
+        strip_training: bool = True,
+    ):
         """
         Export trained model to TensorFlow.js format.
         
         Args:
             output_dir: Output directory for TFJS model
+            model_path: Keras model to export (defaults to self.model)
+            quantization: Weight quantization ("float16", "uint8", "uint16" or None)
+            shard_size_bytes: Target size of each weight shard file
+            strip_training: Remove augmentation/dropout layers before export
+        
+        Returns:
+            dict with the export report
         """
-        raise NotImplementedError("To be implemented in next phase")
+        import tensorflow as tf
+        import tensorflowjs as tfjs
+
+        if quantization not in TFJS_QUANTIZATION:
+            raise ValueError(
+                f"Unknown quantization '{quantization}', "
+                f"expected one of {list(TFJS_QUANTIZATION)}"
+            )
+
+        model = self.model
+        if model_path is not None:
+            model = tf.keras.models.load_model(model_path, compile=False)
+        if model is None:
+            raise ValueError("No model to export: train a model or pass model_path")
+
+        removed = None  # None: training-only layers were not stripped
+        if strip_training:
+            model, removed = strip_training_layers(model)
+            if removed is None:
+                print(f"[WARNING] {model.name} is not a layer chain, exporting it with its training-only layers")
+
+        output_path = Path(output_dir)
+        output_path.mkdir(parents=True, exist_ok=True)
+        for stale in list(output_path.glob("group*-shard*of*.bin")) + [output_path / "model.json"]:
+            if stale.exists():
+                stale.unlink()
+
+        quantization_map = {quantization: "*"} if quantization else None
+        tfjs.converters.save_keras_model(
+            model,
+            str(output_path),
+            quantization_dtype_map=quantization_map,
+            weight_shard_size_bytes=shard_size_bytes,
+        )
+
+        report = self._tfjs_export_report(model, output_path, quantization, removed)
+        self._print_tfjs_report(report)
+        return report
+    
+    def _tfjs_export_report(self, model, output_path, quantization, removed):
+        """Measure the exported artifacts and estimate browser load time"""
+        model_json = output_path / "model.json"
+        shards = sorted(output_path.glob("group*-shard*of*.bin"))
+        weights_bytes = sum(shard.stat().st_size for shard in shards)
+        total_bytes = weights_bytes + model_json.stat().st_size
+        float32_bytes = int(model.count_params()) * TFJS_QUANTIZATION[None]
+
+        # Shards download in parallel (~6 per origin) but share one link, so
+        # the estimate is bandwidth-bound plus one round trip per shard wave.
+        waves = -(-len(shards) // 6) + 1
+        load_seconds = {
+            link: total_bytes * 8 / (mbps * 1e6) + waves * 0.1
+            for link, mbps in TFJS_LINK_SPEEDS.items()
+        }
+
+        return {
+            "output_dir": str(output_path),
+            "quantization": quantization or "none",
+            "stripped": removed is not None,
+            "removed_layers": removed,
+            "params": int(model.count_params()),
+            "shards": len(shards),
+            "model_json_bytes": model_json.stat().st_size,
+            "weights_bytes": weights_bytes,
+            "total_bytes": total_bytes,
+            "float32_weights_bytes": float32_bytes,
+            "compression_ratio": float32_bytes / weights_bytes if weights_bytes else 0.0,
+            "estimated_load_seconds": load_seconds,
+        }
+    
+    def _print_tfjs_report(self, report):
+        """Print the TFJS export report"""
+        mb = 1024 * 1024
+        print("=" * 50)
+        print("TFJS EXPORT REPORT")
+        print("=" * 50)
+        print(f"[INFO] Output: {report['output_dir']}")
+        print(f"[INFO] Quantization: {report['quantization']}")
+        if report["removed_layers"] is None:
+            print("[INFO] Stripped layers: not stripped")
+        else:
+            print(f"[INFO] Stripped layers: {', '.join(report['removed_layers']) or 'none'}")
+        print(f"[INFO] Parameters: {report['params']:,}")
+        print(f"[INFO] Shards: {report['shards']}")
+        print(f"[INFO] Download size: {report['total_bytes'] / mb:.2f} MB "
+              f"(float32 weights: {report['float32_weights_bytes'] / mb:.2f} MB, "
+              f"{report['compression_ratio']:.1f}x smaller)")
+        print("[INFO] Estimated browser load time:")
+        for link, seconds in report["estimated_load_seconds"].items():
+            print(f"      - {link}: {seconds:.2f}s")
     
     def export_to_onnx(self, output_path: str):
         """
@@ -91,5 +363,5 @@ if __name__ == "__main__":
     print("SamvadSetu Integrated Model Pipeline")
     print("=" * 50)
     print("This module is ready for implementation in the next phase.")
-    print("Current features: Placeholder structure")
-    print("Pending implementation: All ML operations")
+    print("Current features: TFJS export (quantized, sharded), embedding cache + head-only training")
+    print("Pending implementation: Collection, augmentation, training, evaluation, ONNX")
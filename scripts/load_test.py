@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Model API Load Test
+Replays an image corpus against the prediction endpoints and reports
+throughput, tail latency and error rates
+
+Works against either server (Flask `model_api_server.py` or ASGI
+`model_api_asgi.py`). Two load shapes are supported:
+- closed loop (default): keep `--concurrency` requests in flight
+- open loop (`--rate`): issue requests on a fixed schedule; latency is
+  measured from the scheduled send time so server stalls aren't hidden
+
+`--stub` starts a server in-process on random-weight stub models (and a
+synthetic corpus if none is given), so the test runs offline in CI.
+
+Usage:
+    python scripts/load_test.py --url http://localhost:5000 --corpus frames/ \
+        --endpoints predict compare --concurrency 1 4 16 --duration 10
+    python scripts/load_test.py --stub --server asgi --rate 50 --duration 5
+"""
+
+import argparse
+import base64
+import json
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp"}
+
+def _predict_payload(image_b64, image_path, args):
+    return {"image": image_b64, "model": args.model}
+
+def _compare_payload(image_b64, image_path, args):
+    return {"image": image_b64, "models": args.models}
+
+def _rois_payload(image_b64, image_path, args):
+    # Two side-by-side hand-sized regions, as fractions of the frame
+    boxes = [[0.1, 0.2, 0.35, 0.6], [0.55, 0.2, 0.35, 0.6]]
+    return {"image": image_b64, "model": args.model, "boxes": boxes, "normalized": True}
+
+def _path_payload(image_b64, image_path, args):
+    return {"path": str(Path(image_path).resolve()), "model": args.model}
+
+# endpoint name -> (path, payload builder)
+ENDPOINTS = {
+    "predict": ("/api/models/predict", _predict_payload),
+    "compare": ("/api/models/compare", _compare_payload),
+    "predict_url": ("/api/models/predict/url", _path_payload),
+    "rois": ("/api/models/predict/rois", _rois_payload),
+}
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def post_json(url, body, timeout=30.0):
+    """POST pre-encoded JSON and return the status code (0 on connection errors)"""
+    req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            resp.read()
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, OSError):
+        return 0
+
+def load_corpus(paths):
+    """Expand files/directories into a list of image paths"""
+    images = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            images.extend(sorted(p for p in path.rglob("*") if p.suffix.lower() in IMAGE_SUFFIXES))
+        elif path.exists():
+            images.append(path)
+    return images
+
+def build_requests(base_url, endpoints, corpus, args):
+    """Pre-encode every (endpoint, image) request body so the client isn't the bottleneck"""
+    requests = []
+    for image_path in corpus:
+        image_b64 = base64.b64encode(Path(image_path).read_bytes()).decode()
+        for name in endpoints:
+            path, build = ENDPOINTS[name]
+            body = json.dumps(build(image_b64, image_path, args)).encode()
+            requests.append((name, base_url + path, body))
+    return requests
+
+class Recorder:
+    """Thread-safe per-endpoint latency and status collection"""
+
+    def __init__(self):
+        self.latencies = {}
+        self.statuses = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, status, seconds):
+        with self._lock:
+            self.statuses.setdefault(endpoint, Counter())[status] += 1
+            if status == 200:
+                self.latencies.setdefault(endpoint, []).append(seconds)
+
+    def summary(self, wall):
+        report = {}
+        for endpoint, statuses in self.statuses.items():
+            latencies = self.latencies.get(endpoint, [])
+            total = sum(statuses.values())
+            report[endpoint] = {
+                "requests": total,
+                "ok": len(latencies),
+                "error_rate": 1 - len(latencies) / total if total else 0.0,
+                "status_codes": {str(code): n for code, n in sorted(statuses.items())},
+                "throughput_rps": len(latencies) / wall if wall else 0.0,
+                "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+                "p50_ms": percentile(latencies, 0.50) * 1000,
+                "p95_ms": percentile(latencies, 0.95) * 1000,
+                "p99_ms": percentile(latencies, 0.99) * 1000,
+            }
+        return report
+
+def run_closed_loop(requests, concurrency, duration):
+    """Keep `concurrency` requests in flight for `duration` seconds"""
+    recorder = Recorder()
+    counter = [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def worker():
+        while time.perf_counter() < stop_at:
+            with lock:
+                endpoint, url, body = requests[counter[0] % len(requests)]
+                counter[0] += 1
+            started = time.perf_counter()
+            status = post_json(url, body)
+            recorder.record(endpoint, status, time.perf_counter() - started)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return recorder.summary(time.perf_counter() - started)
+
+def run_open_loop(requests, rate, duration, max_inflight):
+    """Send `rate` requests/second on a fixed schedule for `duration` seconds"""
+    recorder = Recorder()
+    total = int(rate * duration)
+    started = time.perf_counter()
+
+    def send(i, scheduled):
+        endpoint, url, body = requests[i % len(requests)]
+        status = post_json(url, body)
+        # Measure from the scheduled time to avoid coordinated omission
+        recorder.record(endpoint, status, time.perf_counter() - scheduled)
+
+    with ThreadPoolExecutor(max_workers=max_inflight) as pool:
+        for i in range(total):
+            scheduled = started + i / rate
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send, i, scheduled)
+    return recorder.summary(time.perf_counter() - started)
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_stub_server(server, workdir):
+    """
+    Start a model API server in-process on stub models
+
+    Returns:
+        Base URL of the running server
+    """
+    # Set before the loader module is first imported (it reads these at import)
+    os.environ["MODEL_DIR"] = str(Path(workdir) / "models")
+    os.environ["MODEL_CACHE_DIR"] = str(Path(workdir) / "cache")
+    os.environ["MODEL_WATCH_INTERVAL"] = "0"
+
+    from stub_models import write_stub_models
+    write_stub_models(os.environ["MODEL_DIR"])
+    port = _free_port()
+
+    if server == "asgi":
+        import uvicorn
+        from model_api_asgi import app
+        config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+        target = uvicorn.Server(config).run
+    else:
+        from werkzeug.serving import make_server
+        from model_api_server import app
+        target = make_server("127.0.0.1", port, app, threaded=True).serve_forever
+
+    threading.Thread(target=target, name="stub-server", daemon=True).start()
+    base_url = f"http://127.0.0.1:{port}"
+    wait_until_ready(base_url)
+    return base_url
+
+def wait_until_ready(base_url, timeout=300.0):
+    """Poll /ready until the server reports its models are loaded"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(base_url + "/ready", timeout=2) as resp:
+                if resp.status == 200:
+                    return
+        except (urllib.error.URLError, OSError):
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"Server at {base_url} did not become ready")
+
+def print_report(label, report):
+    print(f"\n[{label}]")
+    print(f"{'endpoint':<14} {'reqs':>7} {'err%':>6} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for endpoint, r in report.items():
+        print(f"{endpoint:<14} {r['requests']:>7} {r['error_rate']*100:>5.1f}% {r['throughput_rps']:>8.1f} "
+              f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test for the model API")
+    parser.add_argument("--url", default="http://localhost:5000", help="Server base URL")
+    parser.add_argument("--corpus", nargs="*", default=[], help="Image files or directories to replay")
+    parser.add_argument("--image", help="Single image to send (shorthand for --corpus FILE)")
+    parser.add_argument("--endpoints", nargs="+", default=["predict"], choices=sorted(ENDPOINTS),
+                        help="Endpoints to exercise (requests are interleaved)")
+    parser.add_argument("--model", default="sign_mnist", help="Model for single-model endpoints")
+    parser.add_argument("--models", nargs="+", default=["sign_mnist", "hagrid"],
+                        help="Models for /compare")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32],
+                        help="Closed-loop concurrency levels to sweep (max in-flight for --rate)")
+    parser.add_argument("--rate", type=float, nargs="*", default=[],
+                        help="Open-loop request rates (req/s) to sweep instead of concurrency")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per level")
+    parser.add_argument("--stub", action="store_true", help="Start an in-process server on stub models")
+    parser.add_argument("--server", choices=["flask", "asgi"], default="flask",
+                        help="Server implementation for --stub")
+    parser.add_argument("--output", help="Write the JSON report here")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="load_test_")
+    base_url = start_stub_server(args.server, workdir) if args.stub else args.url.rstrip("/")
+
+    corpus = load_corpus(args.corpus + ([args.image] if args.image else []))
+    if not corpus:
+        if not args.stub:
+            parser.error("provide --corpus or --image (or use --stub for a synthetic corpus)")
+        from stub_models import write_stub_corpus
+        corpus = write_stub_corpus(Path(workdir) / "corpus")
+    requests = build_requests(base_url, args.endpoints, corpus, args)
+
+    print("\n" + "="*72)
+    print(f"  LOAD TEST: {base_url} ({len(corpus)} images, endpoints: {', '.join(args.endpoints)})")
+    print("="*72)
+
+    results = []
+    if args.rate:
+        for rate in args.rate:
+            report = run_open_loop(requests, rate, args.duration, max(args.concurrency))
+            print_report(f"rate {rate:g} req/s", report)
+            results.append({"mode": "open", "rate": rate, "endpoints": report})
+    else:
+        for level in args.concurrency:
+            report = run_closed_loop(requests, level, args.duration)
+            print_report(f"concurrency {level}", report)
+            results.append({"mode": "closed", "concurrency": level, "endpoints": report})
+    print("\n" + "="*72 + "\n")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps({"url": base_url, "results": results}, indent=2))
+        print(f"[INFO] Report written to {args.output}")
+
+    # 429/504 are the admission backpressure being measured, not failures
+    errors = sum(
+        n for r in results for ep in r["endpoints"].values()
+        for code, n in ep["status_codes"].items() if code == "0" or (int(code) >= 500 and code != "504")
+    )
+    return 0 if errors == 0 or not args.stub else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+Local Frame Transport
+Unix domain socket transport for co-located clients (e.g. the Next.js server)
+
+HTTP clients send every frame as JPEG -> base64 -> JSON over TCP, and the
+server reverses all of it. On the same host, raw pixels can be sent over a
+Unix socket instead: the client writes the array's buffer directly
+(sendall on a memoryview, no copy) and the server receives into a reused
+per-connection buffer (recv_into) and wraps it with np.frombuffer. Nothing
+is encoded or decoded; the request is served by the same
+prediction_service.run_predict path as HTTP (admission, deadlines, 429/504).
+
+Protocol (little-endian; one request in flight per connection):
+
+    request  = header | model name (utf-8) | pixels (H*W*C, row-major;
+               float32 pixels use the uint8 0-255 range, not 0-1)
+    header   = magic "SBF1", u16 height, u16 width, u8 channels, u8 dtype
+               (0 = uint8, 1 = float32), u8 flags (1 = compact, 2 = msgpack
+               response), u8 model name length, u16 top_k (0 = all),
+               f32 confidence_threshold, u32 deadline_ms (0 = server default)
+    response = u16 status, u8 format (0 = json, 1 = msgpack), u32 length | body
+
+The body is the same payload the HTTP /predict route returns.
+
+Usage:
+    # Serve on the loader of a standalone process
+    python scripts/local_transport.py serve --socket /tmp/signbridge.sock
+    # Or set MODEL_SOCKET_PATH when starting model_api_server.py / model_api_asgi.py
+
+    # Benchmark against HTTP at 30 and 60 fps per client on stub models
+    python scripts/local_transport.py bench --stub --fps 30 60 --clients 1 4
+"""
+
+import argparse
+import json
+import os
+import socket
+import socketserver
+import statistics
+import struct
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+MAGIC = b"SBF1"
+REQUEST_HEADER = struct.Struct("<4sHHBBBBHfI")
+RESPONSE_HEADER = struct.Struct("<HBI")
+
+DTYPES = {0: np.uint8, 1: np.float32}
+DTYPE_CODES = {np.dtype(np.uint8): 0, np.dtype(np.float32): 1}
+FLAG_COMPACT = 1
+FLAG_MSGPACK = 2
+
+DEFAULT_SOCKET_PATH = os.environ.get("MODEL_SOCKET_PATH", "/tmp/signbridge-model.sock")
+
+
+class ProtocolError(Exception):
+    """Malformed request; the connection is closed"""
+
+
+def recv_exactly(sock, view):
+    """Fill a memoryview from the socket; False if the peer closed first"""
+    received = 0
+    while received < len(view):
+        n = sock.recv_into(view[received:])
+        if n == 0:
+            return False
+        received += n
+    return True
+
+
+class FrameHandler(socketserver.BaseRequestHandler):
+    """Serves prediction requests on one client connection"""
+
+    def setup(self):
+        self._header = bytearray(REQUEST_HEADER.size)
+        # Reused for every frame on this connection; grows to the largest frame
+        self._pixels = bytearray()
+
+    def _read_request(self):
+        import prediction_service
+        if not recv_exactly(self.request, memoryview(self._header)):
+            return None
+        # The deadline starts once the frame arrives, not while the connection idles
+        received_at = time.monotonic()
+        (magic, height, width, channels, dtype_code, flags, name_len,
+         top_k, threshold, deadline_ms) = REQUEST_HEADER.unpack(self._header)
+        if magic != MAGIC:
+            raise ProtocolError("Bad magic")
+        if dtype_code not in DTYPES or channels not in (1, 3, 4):
+            raise ProtocolError("Unsupported pixel format")
+        name = bytearray(name_len)
+        if not recv_exactly(self.request, memoryview(name)):
+            return None
+
+        dtype = np.dtype(DTYPES[dtype_code])
+        if height * width > prediction_service.MAX_IMAGE_PIXELS:
+            raise ProtocolError(f"Frame too large: {width}x{height}")
+        size = height * width * channels * dtype.itemsize
+        if len(self._pixels) < size:
+            self._pixels = bytearray(size)
+        view = memoryview(self._pixels)[:size]
+        if not recv_exactly(self.request, view):
+            return None
+
+        shape = (height, width) if channels == 1 else (height, width, channels)
+        # A view of the connection buffer; valid until the next request
+        image = np.frombuffer(view, dtype=dtype).reshape(shape)
+        request = {
+            "deadline_ms": deadline_ms or None,
+            "top_k": top_k or None,
+            "compact": bool(flags & FLAG_COMPACT),
+        }
+        return image, name.decode(), threshold, request, flags, received_at
+
+    def handle(self):
+        import prediction_service
+        import response_encoding
+
+        while True:
+            try:
+                request = self._read_request()
+            except (ProtocolError, UnicodeDecodeError) as e:
+                print(f"[WARNING] Local transport: {e}; closing connection")
+                return
+            except OSError:
+                return
+            if request is None:
+                return
+            image, model_name, threshold, data, flags, received_at = request
+
+            try:
+                parsed = prediction_service.ParsedRequest(
+                    image, [model_name], threshold, prediction_service.output_options(data),
+                    prediction_service.request_deadline(data, received_at=received_at)
+                )
+                payload, status = prediction_service.run_predict(self.server.loader, parsed)
+            except prediction_service.RequestError as e:
+                payload, status = e.to_response()
+            except Exception as e:
+                payload, status = {"error": str(e), "success": False}, 500
+
+            # Falls back to JSON when msgpack isn't installed
+            fmt = response_encoding.negotiate(requested="msgpack" if flags & FLAG_MSGPACK else "json")
+            body, _, _ = response_encoding.encode(payload, fmt)
+            fmt_code = 1 if fmt == "msgpack" else 0
+            try:
+                self.request.sendall(RESPONSE_HEADER.pack(status, fmt_code, len(body)) + body)
+            except OSError:
+                return
+
+
+class LocalTransportServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """One thread per connected client; all share the loader"""
+
+    daemon_threads = True
+
+    def __init__(self, loader, path=DEFAULT_SOCKET_PATH):
+        self.loader = loader
+        self.path = str(path)
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # Stale socket from a previous run
+        super().__init__(self.path, FrameHandler)
+        # Co-located clients only, but any local user could otherwise connect
+        os.chmod(self.path, 0o660)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+def start_in_background(loader, path=DEFAULT_SOCKET_PATH):
+    """Serve the local transport on a daemon thread; returns the server"""
+    server = LocalTransportServer(loader, path)
+    threading.Thread(target=server.serve_forever, name="local-transport", daemon=True).start()
+    print(f"[INFO] Local frame transport listening on {server.path}")
+    return server
+
+
+class LocalTransportClient:
+    """Blocking client; one request in flight per instance"""
+
+    def __init__(self, path=DEFAULT_SOCKET_PATH, timeout=30.0):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(str(path))
+        self._response_header = bytearray(RESPONSE_HEADER.size)
+
+    def predict(self, image, model_name="sign_mnist", confidence_threshold=0.5,
+                top_k=None, compact=False, deadline_ms=None):
+        """
+        Classify a frame
+
+        Args:
+            image: (H, W), (H, W, 3) or (H, W, 4) uint8 or float32 array;
+                float32 pixels are in the 0-255 range like uint8 (not 0-1)
+
+        Returns:
+            (status, payload dict)
+        """
+        image = np.ascontiguousarray(image)
+        dtype_code = DTYPE_CODES.get(image.dtype)
+        if dtype_code is None:
+            raise ValueError(f"Unsupported dtype {image.dtype}")
+        height, width = image.shape[:2]
+        channels = 1 if image.ndim == 2 else image.shape[2]
+        name = model_name.encode()
+        header = REQUEST_HEADER.pack(
+            MAGIC, height, width, channels, dtype_code, FLAG_COMPACT if compact else 0,
+            len(name), top_k or 0, confidence_threshold, int(deadline_ms or 0)
+        )
+        self.sock.sendall(header + name)
+        # Pixels go straight from the array's buffer
+        self.sock.sendall(memoryview(image).cast("B"))
+
+        if not recv_exactly(self.sock, memoryview(self._response_header)):
+            raise ConnectionError("Server closed the connection")
+        status, _, length = RESPONSE_HEADER.unpack(self._response_header)
+        body = bytearray(length)
+        if not recv_exactly(self.sock, memoryview(body)):
+            raise ConnectionError("Server closed the connection")
+        return status, json.loads(body)
+
+    def close(self):
+        self.sock.close()
+
+
+# ==================== BENCHMARK ====================
+
+def synthetic_frame(width, height, seed=0):
+    """Camera-like RGB frame (gradient plus noise)"""
+    rng = np.random.default_rng(seed)
+    ramp = np.linspace(0, 255, width, dtype=np.float32)[None, :, None]
+    return np.clip(ramp + rng.normal(0, 20, size=(height, width, 3)), 0, 255).astype(np.uint8)
+
+
+def http_sender(base_url, model_name):
+    """Per-frame send over HTTP the way the web client does: JPEG, base64, JSON"""
+    import base64
+    from io import BytesIO
+    from PIL import Image
+    from load_test import post_json
+
+    url = base_url + "/api/models/predict"
+
+    def send(frame):
+        buffer = BytesIO()
+        Image.fromarray(frame).save(buffer, format="JPEG", quality=80)
+        body = json.dumps({
+            "image": base64.b64encode(buffer.getvalue()).decode(),
+            "model": model_name,
+        }).encode()
+        return post_json(url, body)
+
+    return send, lambda: None
+
+
+def socket_sender(path, model_name):
+    client = LocalTransportClient(path)
+
+    def send(frame):
+        try:
+            status, _ = client.predict(frame, model_name)
+            return status
+        except OSError:
+            return 0
+
+    return send, client.close
+
+
+def run_paced(make_sender, frame, fps, clients, duration):
+    """
+    Each client sends one frame every 1/fps seconds
+
+    Latency is measured from the frame's scheduled time, so a client that
+    falls behind shows up as latency instead of a lower send rate.
+    """
+    interval = 1.0 / fps
+    frames_per_client = int(fps * duration)
+    latencies, statuses = [], []
+    lock = threading.Lock()
+
+    def client(index):
+        send, close = make_sender()
+        # Stagger clients across the frame interval like independent cameras
+        started = time.perf_counter() + index * interval / clients
+        local_latencies, local_statuses = [], []
+        try:
+            for i in range(frames_per_client):
+                scheduled = started + i * interval
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                status = send(frame)
+                local_statuses.append(status)
+                if status == 200:
+                    local_latencies.append(time.perf_counter() - scheduled)
+        finally:
+            close()
+        with lock:
+            latencies.extend(local_latencies)
+            statuses.extend(local_statuses)
+
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(clients)]
+    wall_started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - wall_started
+
+    latencies.sort()
+    ms = [value * 1000 for value in latencies]
+
+    def pct(q):
+        return ms[min(len(ms) - 1, int(q * len(ms)))] if ms else 0.0
+
+    return {
+        "frames": len(statuses),
+        "ok": len(latencies),
+        "achieved_fps_per_client": len(latencies) / wall / clients if wall else 0.0,
+        "late_fraction": sum(1 for value in latencies if value > interval) / len(latencies) if latencies else 0.0,
+        "mean_ms": statistics.fmean(ms) if ms else 0.0,
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+    }
+
+
+def bench(args):
+    from load_test import start_stub_server
+
+    if args.stub:
+        workdir = tempfile.mkdtemp(prefix="local_transport_bench_")
+        base_url = start_stub_server(args.server, workdir)
+        import prediction_service
+        from unified_model_loader import get_model_loader
+        loader = get_model_loader(model_files=prediction_service.SERVER_MODEL_FILES)
+        server = start_in_background(loader, Path(workdir) / "model.sock")
+        socket_path = server.path
+    else:
+        base_url, socket_path = args.url.rstrip("/"), args.socket
+
+    width, height = (int(v) for v in args.resolution.lower().split("x"))
+    frame = synthetic_frame(width, height)
+    transports = {
+        "http": lambda: http_sender(base_url, args.model),
+        "unix": lambda: socket_sender(socket_path, args.model),
+    }
+
+    print("\n" + "="*96)
+    print(f"  LOCAL TRANSPORT vs HTTP: {args.model}, {width}x{height} frames, {args.duration:g}s per run")
+    print("="*96)
+    print(f"  {'transport':<10} {'fps':>4} {'clients':>7} {'ok':>6} {'fps/client':>10} "
+          f"{'late%':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    results = []
+    for fps in args.fps:
+        for clients in args.clients:
+            for name, make_sender in transports.items():
+                r = run_paced(make_sender, frame, fps, clients, args.duration)
+                results.append({"transport": name, "fps": fps, "clients": clients, **r})
+                print(f"  {name:<10} {fps:>4g} {clients:>7} {r['ok']:>6} {r['achieved_fps_per_client']:>10.1f} "
+                      f"{r['late_fraction']*100:>5.1f}% {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f}")
+    print("="*96 + "\n")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps({"resolution": args.resolution, "results": results}, indent=2))
+        print(f"[INFO] Report written to {args.output}")
+    return 0
+
+
+def serve(args):
+    import prediction_service
+    from unified_model_loader import get_model_loader
+
+    loader = get_model_loader(model_files=prediction_service.SERVER_MODEL_FILES, background=True)
+    server = LocalTransportServer(loader, args.socket)
+    print(f"[INFO] Local frame transport listening on {server.path} (models load in the background)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Unix socket frame transport for co-located clients")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve_cmd = sub.add_parser("serve", help="Serve the local transport")
+    serve_cmd.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help="Socket path")
+
+    bench_cmd = sub.add_parser("bench", help="Benchmark against the HTTP path")
+    bench_cmd.add_argument("--stub", action="store_true",
+                           help="Start both transports in-process on stub models")
+    bench_cmd.add_argument("--server", choices=["flask", "asgi"], default="flask",
+                           help="HTTP server implementation for --stub")
+    bench_cmd.add_argument("--url", default="http://localhost:5000", help="HTTP server base URL")
+    bench_cmd.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help="Local transport socket")
+    bench_cmd.add_argument("--model", default="sign_mnist")
+    bench_cmd.add_argument("--resolution", default="640x480", help="Frame size as WIDTHxHEIGHT")
+    bench_cmd.add_argument("--fps", type=float, nargs="+", default=[30, 60], help="Frames/second per client")
+    bench_cmd.add_argument("--clients", type=int, nargs="+", default=[1, 4], help="Concurrent clients")
+    bench_cmd.add_argument("--duration", type=float, default=10.0, help="Seconds per run")
+    bench_cmd.add_argument("--output", help="Write the JSON report here")
+
+    args = parser.parse_args()
+    return serve(args) if args.command == "serve" else bench(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
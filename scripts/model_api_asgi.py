@@ -0,0 +1,380 @@
+"""
+Unified Model API Backend - ASGI Server
+Asyncio-native counterpart of model_api_server.py and the /api/v1/models blueprint
+
+The event loop only handles I/O (reading bodies, writing responses). Image
+decoding runs on a decode thread pool and inference on a separate inference
+pool, so slow clients never hold an inference thread and a burst of uploads
+can't starve inference of CPU. Handlers reuse prediction_service, so
+payloads and status codes match the Flask routes exactly.
+
+Run:
+    uvicorn model_api_asgi:app --app-dir scripts --host 0.0.0.0 --port 5000
+    # or
+    python scripts/model_api_asgi.py
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+# Add scripts to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import prediction_service
+import response_encoding
+from admission import admission
+from serving_metrics import metrics
+
+DECODE_WORKERS = int(os.environ.get("ASGI_DECODE_WORKERS", os.cpu_count() or 4))
+INFERENCE_WORKERS = int(os.environ.get("ASGI_INFERENCE_WORKERS", 4))
+# Clip requests block while their micro-batch fills; enough waiters for a full batch
+CLIP_WORKERS = int(os.environ.get("ASGI_CLIP_WORKERS", 8))
+
+# Same body cap as the Flask server's MAX_CONTENT_LENGTH (base64 inflates by 4/3)
+MAX_BODY_BYTES = (
+    max(prediction_service.MAX_IMAGE_BYTES, prediction_service.MAX_CLIP_BYTES) * 4 // 3 + 64 * 1024
+)
+
+decode_pool = ThreadPoolExecutor(max_workers=DECODE_WORKERS, thread_name_prefix="decode")
+inference_pool = ThreadPoolExecutor(max_workers=INFERENCE_WORKERS, thread_name_prefix="inference")
+clip_pool = ThreadPoolExecutor(max_workers=CLIP_WORKERS, thread_name_prefix="clip")
+
+# ==================== MODEL LOADER ====================
+
+def get_model_loader():
+    """Get or create the global model loader instance (loads in the background)"""
+    from unified_model_loader import get_model_loader as get_shared_loader
+    return get_shared_loader(model_files=prediction_service.SERVER_MODEL_FILES, background=True)
+
+
+async def run_in(pool, fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(pool, partial(fn, *args))
+
+
+# ==================== HELPERS ====================
+
+def respond(request, payload, status):
+    """Encode a prediction payload in the format negotiated with the client"""
+    fmt = response_encoding.negotiate(
+        request.headers.get('Accept'), request.query_params.get('format')
+    )
+    body, content_type, elapsed_ms = response_encoding.encode(payload, fmt)
+    headers = response_encoding.response_headers(body, elapsed_ms)
+    if status == 429 and "retry_after" in payload:
+        headers["Retry-After"] = str(payload["retry_after"])
+    return Response(body, status_code=status, media_type=content_type, headers=headers)
+
+
+def error_response(error, status=500):
+    if isinstance(error, prediction_service.RequestError):
+        payload, status = error.to_response()
+        return JSONResponse(payload, status_code=status)
+    return JSONResponse({"error": str(error), "success": False}, status_code=status)
+
+
+async def read_json(request):
+    """
+    Read a JSON body of at most MAX_BODY_BYTES
+    
+    Raises:
+        RequestError: 413 when the body is too large (checked while streaming,
+            so a missing or wrong Content-Length can't get past the cap)
+    """
+    too_large = prediction_service.RequestError(
+        f"Request body too large: exceeds {MAX_BODY_BYTES} bytes", 413
+    )
+    if int(request.headers.get('Content-Length') or 0) > MAX_BODY_BYTES:
+        raise too_large
+    chunks, size = [], 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            raise too_large
+        chunks.append(chunk)
+    try:
+        return json.loads(b"".join(chunks))
+    except ValueError:
+        return None
+
+
+async def handle_prediction(request, source='image', multi=False, rois=False):
+    """Decode on the decode pool, infer on the inference pool"""
+    # Body reads and decode-pool waits count against the request deadline
+    received_at = time.monotonic()
+    try:
+        data = await read_json(request)
+        parsed = await run_in(
+            decode_pool, prediction_service.parse_request,
+            data, request.headers, source, multi, request.query_params, rois, received_at
+        )
+        if not isinstance(parsed, prediction_service.ParsedRequest):
+            return respond(request, *parsed)
+        
+        if rois:
+            run = prediction_service.run_rois
+        elif multi:
+            run = prediction_service.run_compare
+        else:
+            run = prediction_service.run_predict
+        payload, status = await run_in(inference_pool, run, get_model_loader(), parsed)
+        return respond(request, payload, status)
+    
+    except Exception as e:
+        return error_response(e)
+
+
+# ==================== API ROUTES ====================
+
+async def health_check(request):
+    """Check if models are loaded and healthy"""
+    return JSONResponse(get_model_loader().health_check())
+
+
+async def get_available_models(request):
+    """Get list of available models"""
+    return JSONResponse({
+        "status": "success",
+        "timestamp": datetime.now().isoformat(),
+        "models": get_model_loader().get_available_models()
+    })
+
+
+async def predict(request):
+    """Make a prediction using the specified model (same JSON as the Flask route)"""
+    return await handle_prediction(request)
+
+
+async def predict_from_url(request):
+    """Make a prediction from an image file path"""
+    return await handle_prediction(request, source='path')
+
+
+async def predict_rois(request):
+    """Classify several regions of one frame in a single batched forward pass"""
+    return await handle_prediction(request, rois=True)
+
+
+async def recognize_clip(request):
+    """Recognize a WLASL word from a short clip (decode pool, then the clip batcher)"""
+    received_at = time.monotonic()
+    try:
+        data = await read_json(request)
+        parsed = await run_in(
+            decode_pool, prediction_service.parse_clip_request,
+            data, request.headers, request.query_params, received_at
+        )
+        if not isinstance(parsed, prediction_service.ParsedRequest):
+            return respond(request, *parsed)
+        payload, status = await run_in(clip_pool, prediction_service.run_clip, parsed)
+        return respond(request, payload, status)
+    
+    except Exception as e:
+        return error_response(e)
+
+
+async def fingerspell(request):
+    """Feed one frame into the session's streaming fingerspelling decoder"""
+    received_at = time.monotonic()
+    try:
+        data = await read_json(request)
+        parsed = await run_in(
+            decode_pool, prediction_service.parse_fingerspell_request,
+            data, request.headers, request.query_params, received_at
+        )
+        if not isinstance(parsed[0], prediction_service.ParsedRequest):
+            return respond(request, *parsed)
+        parsed, session_id = parsed
+        payload, status = await run_in(
+            inference_pool, prediction_service.run_fingerspell, get_model_loader(), parsed,
+            session_id, bool(data.get('reset')), bool(data.get('flush'))
+        )
+        return respond(request, payload, status)
+    
+    except Exception as e:
+        return error_response(e)
+
+
+async def classify_gesture(request):
+    """Classify a frame against the user's custom gestures"""
+    received_at = time.monotonic()
+    try:
+        data = await read_json(request)
+        parsed = await run_in(
+            decode_pool, prediction_service.parse_gesture_request,
+            data, request.headers, request.query_params, received_at
+        )
+        if not isinstance(parsed[0], prediction_service.ParsedRequest):
+            return respond(request, *parsed)
+        parsed, user_id = parsed
+        payload, status = await run_in(
+            inference_pool, prediction_service.run_gesture_classify, parsed, user_id, data.get('k')
+        )
+        return respond(request, payload, status)
+    
+    except Exception as e:
+        return error_response(e)
+
+
+async def manage_gestures(request):
+    """List, add samples to or remove custom gestures"""
+    try:
+        data = await read_json(request) if request.method != 'GET' else {}
+        payload, status = await run_in(
+            inference_pool, prediction_service.manage_gestures,
+            request.method, data, request.headers, request.query_params
+        )
+        return respond(request, payload, status)
+    
+    except Exception as e:
+        return error_response(e)
+
+
+async def predict_heads(request):
+    """Run the multi-head classifiers on one frame (one shared backbone pass)"""
+    received_at = time.monotonic()
+    try:
+        parsed = await run_in(
+            decode_pool, prediction_service.parse_heads_request,
+            await read_json(request), request.headers, request.query_params, received_at
+        )
+        if not isinstance(parsed[0], prediction_service.ParsedRequest):
+            return respond(request, *parsed)
+        parsed, heads = parsed
+        payload, status = await run_in(
+            inference_pool, prediction_service.run_heads, get_model_loader(), parsed, heads
+        )
+        return respond(request, payload, status)
+    
+    except Exception as e:
+        return error_response(e)
+
+
+async def manage_heads(request):
+    """Report memory/latency per head; admin: load or unload a head"""
+    try:
+        data = await read_json(request) if request.method != 'GET' else {}
+        payload, status = await run_in(
+            inference_pool, prediction_service.manage_heads, request.method, data, request.headers
+        )
+        return respond(request, payload, status)
+    
+    except Exception as e:
+        return error_response(e)
+
+
+async def compare_predictions(request):
+    """Get predictions from multiple models for comparison"""
+    return await handle_prediction(request, multi=True)
+
+
+async def model_status(request):
+    """Get detailed status of all models"""
+    return JSONResponse({
+        "status": "success",
+        "timestamp": datetime.now().isoformat(),
+        "health": get_model_loader().health_check()
+    })
+
+
+async def serving_metrics(request):
+    """Get serving metrics (latency, response size, serialization time, per-class admission)"""
+    return JSONResponse({
+        "status": "success",
+        "timestamp": datetime.now().isoformat(),
+        "metrics": metrics.snapshot(),
+        "admission": admission.snapshot()
+    })
+
+
+async def reload_models(request):
+    """Admin: hot-reload models without dropping in-flight requests"""
+    try:
+        payload, status = prediction_service.reload_models(
+            get_model_loader(), await read_json(request), request.headers
+        )
+        return JSONResponse(payload, status_code=status)
+    except Exception as e:
+        return error_response(e)
+
+
+async def app_health(request):
+    """Liveness: the API process is up (models may still be loading)"""
+    payload, status = prediction_service.liveness(get_model_loader())
+    return JSONResponse(payload, status_code=status)
+
+
+async def app_ready(request):
+    """Readiness: model loading finished and at least one model is serving"""
+    payload, status = prediction_service.readiness(get_model_loader())
+    return JSONResponse(payload, status_code=status)
+
+
+def model_routes(prefix):
+    return [
+        Route(f'{prefix}/health', health_check, methods=['GET']),
+        Route(f'{prefix}/available', get_available_models, methods=['GET']),
+        Route(f'{prefix}/predict', predict, methods=['POST']),
+        Route(f'{prefix}/predict/url', predict_from_url, methods=['POST']),
+        Route(f'{prefix}/predict/rois', predict_rois, methods=['POST']),
+        Route(f'{prefix}/compare', compare_predictions, methods=['POST']),
+        Route(f'{prefix}/wlasl/recognize', recognize_clip, methods=['POST']),
+        Route(f'{prefix}/fingerspell', fingerspell, methods=['POST']),
+        Route(f'{prefix}/gestures/classify', classify_gesture, methods=['POST']),
+        Route(f'{prefix}/gestures', manage_gestures, methods=['GET', 'POST', 'DELETE']),
+        Route(f'{prefix}/heads/predict', predict_heads, methods=['POST']),
+        Route(f'{prefix}/heads', manage_heads, methods=['GET', 'POST', 'DELETE']),
+        Route(f'{prefix}/status', model_status, methods=['GET']),
+        Route(f'{prefix}/metrics', serving_metrics, methods=['GET']),
+        Route(f'{prefix}/reload', reload_models, methods=['POST']),
+        Route(f'{prefix}/ready', app_ready, methods=['GET']),
+    ]
+
+
+@asynccontextmanager
+async def lifespan(app):
+    get_model_loader()  # Start parallel background loading
+    if os.environ.get("MODEL_SOCKET_PATH"):
+        # Raw-pixel transport for co-located clients, sharing this loader
+        from local_transport import start_in_background
+        start_in_background(get_model_loader(), os.environ["MODEL_SOCKET_PATH"])
+    yield
+    decode_pool.shutdown(wait=False)
+    inference_pool.shutdown(wait=False)
+    clip_pool.shutdown(wait=False)
+
+
+app = Starlette(
+    routes=model_routes('/api/models') + model_routes('/api/v1/models') + [
+        Route('/health', app_health, methods=['GET']),
+        Route('/ready', app_ready, methods=['GET']),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+    lifespan=lifespan,
+)
+
+
+if __name__ == '__main__':
+    import argparse
+    import uvicorn
+    parser = argparse.ArgumentParser(description="ASL Model API Server (ASGI)")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 5000)))
+    args = parser.parse_args()
+    
+    print("[INFO] Starting ASL Model API Server (ASGI)...")
+    print(f"[INFO] Decode workers: {DECODE_WORKERS}, inference workers: {INFERENCE_WORKERS}")
+    uvicorn.run(app, host=args.host, port=args.port)
@@ -1,218 +1,55 @@
 """
 Unified Model API Backend - Flask Server
 Integrates all ASL recognition models and serves predictions via REST API
+
+The server binds its port immediately; models load in parallel on a background
+thread. `/health` reports liveness and `/ready` reports readiness, both with
+per-model load state. TensorFlow, OpenCV and PIL are only imported by the loader
+and request handlers, never at module import.
 """
 
 import os
 import sys
-import json
-import base64
-import numpy as np
-import cv2
 from pathlib import Path
-from io import BytesIO
-from PIL import Image
-import tensorflow as tf
-from flask import Flask, request, jsonify, Blueprint
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 from datetime import datetime
 
 # Add scripts to path
-sys.path.insert(0, str(Path(__file__).parent / "scripts"))
+sys.path.insert(0, str(Path(__file__).parent))
+
+import prediction_service
+import response_encoding
+from admission import admission
+from serving_metrics import metrics
 
 app = Flask(__name__)
+# Reject oversized bodies before Flask reads them (base64 inflates by 4/3)
+app.config['MAX_CONTENT_LENGTH'] = (
+    max(prediction_service.MAX_IMAGE_BYTES, prediction_service.MAX_CLIP_BYTES) * 4 // 3 + 64 * 1024
+)
 CORS(app)
 
 # ==================== MODEL LOADER ====================
 
-class UnifiedModelLoader:
-    """Unified loader for all ASL recognition models"""
-    
-    def __init__(self):
-        self.models = {}
-        self.model_configs = {}
-        # Path should go up one level from scripts/ to reach notebooks/
-        self.models_dir = Path(__file__).parent.parent / "notebooks" / "Saved_models"
-        self.load_all_models()
-    
-    def load_all_models(self):
-        """Load all available models"""
-        model_files = {
-            # TEMPORARILY DISABLED: ASL model has batch normalization architecture issue
-            # "asl_alphabet": "final_asl_model-training-optimized.keras",
-            "sign_mnist": "final_sign_mnist_cnn.keras",
-            "hagrid": "HAGRID_best_model.keras",
-        }
-        
-        for model_name, filename in model_files.items():
-            model_path = self.models_dir / filename
-            if model_path.exists():
-                try:
-                    print(f"[INFO] Loading {model_name} from {filename}...")
-                    # Try standard loading first
-                    try:
-                        model = tf.keras.models.load_model(str(model_path), compile=False)
-                    except Exception as e:
-                        # Try with safe_mode=False for compatibility issues
-                        print(f"[WARNING] Standard load failed, trying safe_mode=False...")
-                        try:
-                            model = tf.keras.models.load_model(str(model_path), compile=False, safe_mode=False)
-                        except Exception as e2:
-                            # Skip this model if all loading methods fail
-                            raise Exception(f"Both loading methods failed: {e} | {e2}")
-                    self.models[model_name] = model
-                    self.model_configs[model_name] = self._get_model_info(model, model_name)
-                    print(f"[SUCCESS] {model_name} loaded successfully")
-                except Exception as e:
-                    print(f"[ERROR] Failed to load {model_name}: {str(e)[:100]}")
-                    # Continue with next model instead of crashing
-                    continue
-            else:
-                print(f"[WARNING] Model file not found: {filename}")
-    
-    def _get_model_info(self, model, model_name):
-        """Extract model information"""
-        config = {
-            "name": model_name,
-            "input_shape": model.input_shape,
-            "output_shape": model.output_shape,
-            "params": int(model.count_params()),
-            "timestamp": datetime.now().isoformat(),
-        }
-        
-        # Define class names for each model
-        if model_name == "asl_alphabet":
-            config["classes"] = sorted([
-                "A","B","C","D","E","F","G","H","I","J",
-                "K","L","M","N","O","P","Q","R","S","T",
-                "U","V","W","X","Y","Z","del","nothing","space"
-            ])
-        elif model_name == "sign_mnist":
-            config["classes"] = sorted([
-                "A","B","C","D","E","F","G","H","I","J",
-                "K","L","M","N","O","P","Q","R","S","T",
-                "U","V","W","X","Y","Z"
-            ])
-        elif model_name == "hagrid":
-            config["classes"] = ["hand", "no_hand"]
-        
-        return config
-    
-    def predict(self, image, model_name="asl_alphabet", confidence_threshold=0.5):
-        """
-        Make a prediction using specified model
-        
-        Args:
-            image: Input image (numpy array)
-            model_name: Which model to use
-            confidence_threshold: Minimum confidence for prediction
-        
-        Returns:
-            dict with prediction results
-        """
-        if model_name not in self.models:
-            return {
-                "error": f"Model '{model_name}' not found",
-                "available_models": list(self.models.keys()),
-                "success": False
-            }
-        
-        try:
-            model = self.models[model_name]
-            config = self.model_configs[model_name]
-            
-            # Convert to RGB if grayscale
-            if len(image.shape) == 2:
-                image = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
-            elif image.shape[2] == 4:
-                image = cv2.cvtColor(image, cv2.COLOR_RGBA2RGB)
-            
-            # Normalize image
-            image = image.astype("float32") / 255.0
-            
-            # Ensure correct shape
-            expected_shape = config["input_shape"][1:]
-            if image.shape != expected_shape:
-                image = self._resize_image(image, expected_shape)
-            
-            # Make prediction
-            pred = model.predict(image[None, ...], verbose=0)
-            
-            # Get top prediction
-            idx = np.argmax(pred[0])
-            confidence = float(pred[0][idx])
-            
-            result = {
-                "model": model_name,
-                "prediction": config["classes"][idx],
-                "confidence": confidence,
-                "confidence_percent": f"{confidence*100:.2f}%",
-                "all_predictions": {
-                    config["classes"][i]: float(pred[0][i]) 
-                    for i in range(len(config["classes"]))
-                },
-                "success": True
-            }
-            
-            if confidence < confidence_threshold:
-                result["warning"] = f"Low confidence: {confidence:.2%}"
-            
-            return result
-        
-        except Exception as e:
-            return {
-                "error": str(e),
-                "model": model_name,
-                "success": False
-            }
-    
-    def _resize_image(self, image, target_shape):
-        """Resize image to target shape"""
-        if len(target_shape) == 3:  # (H, W, C)
-            h, w, c = target_shape
-            resized = cv2.resize(image, (w, h))
-            if resized.ndim == 2:
-                resized = np.stack([resized] * c, axis=-1)
-            return resized
-        else:
-            return image
-    
-    def get_available_models(self):
-        """Get list of available models with their info"""
-        return {
-            name: {
-                "input_shape": config["input_shape"],
-                "output_shape": config["output_shape"],
-                "classes": config.get("classes", []),
-                "params": config["params"],
-                "num_classes": len(config.get("classes", []))
-            }
-            for name, config in self.model_configs.items()
-        }
-    
-    def health_check(self):
-        """Check health of all models"""
-        return {
-            "status": "healthy" if self.models else "no_models",
-            "timestamp": datetime.now().isoformat(),
-            "loaded_models": list(self.models.keys()),
-            "models_info": self.get_available_models()
-        }
-
-
-# Global instance
-model_loader = None
-
 def get_model_loader():
-    """Get or create the global model loader instance"""
-    global model_loader
-    if model_loader is None:
-        model_loader = UnifiedModelLoader()
-    return model_loader
+    """Get or create the global model loader instance (loads in the background)"""
+    from unified_model_loader import get_model_loader as get_shared_loader
+    return get_shared_loader(model_files=prediction_service.SERVER_MODEL_FILES, background=True)
 
 
 # ==================== API ROUTES ====================
 
+def respond(payload, status):
+    """Encode a prediction payload in the format negotiated with the client"""
+    fmt = response_encoding.negotiate(request.headers.get('Accept'), request.args.get('format'))
+    body, content_type, elapsed_ms = response_encoding.encode(payload, fmt)
+    headers = response_encoding.response_headers(body, elapsed_ms)
+    if status == 429 and "retry_after" in payload:
+        headers["Retry-After"] = str(payload["retry_after"])
+    return Response(body, status=status, content_type=content_type, headers=headers)
+
+
 @app.route('/api/models/health', methods=['GET'])
 def health_check():
     """Check if models are loaded and healthy"""
@@ -240,39 +77,246 @@ def predict():
     {
         "image": "<base64_encoded_image>",
         "model": "asl_alphabet",
-        "confidence_threshold": 0.5
+        "confidence_threshold": 0.5,
+        "top_k": 5,             # optional
+        "compact": false,       # optional
+        "deadline_ms": 500      # optional, or X-Request-Deadline-Ms header
+    }
+    
+    Admins can add ?profile=1 (or cprofile,trace) or an X-Profile header
+    to get a stage-timing breakdown in the response.
+    """
+    try:
+        payload, status = prediction_service.predict_image(
+            get_model_loader(), request.get_json(silent=True), request.headers, request.args
+        )
+        return respond(payload, status)
+    
+    except Exception as e:
+        return jsonify({
+            "error": str(e),
+            "success": False
+        }), 500
+
+
+@app.route('/api/models/predict/url', methods=['POST'])
+def predict_from_url():
+    """
+    Make a prediction from an image file path
+    
+    Expected JSON:
+    {
+        "path": "/path/to/image.jpg",
+        "model": "sign_mnist",
+        "confidence_threshold": 0.5,
+        "top_k": 5,             # optional
+        "compact": false,       # optional
+        "deadline_ms": 500      # optional, or X-Request-Deadline-Ms header
+    }
+    """
+    try:
+        payload, status = prediction_service.predict_image_path(
+            get_model_loader(), request.get_json(silent=True), request.headers, request.args
+        )
+        return respond(payload, status)
+    
+    except Exception as e:
+        return jsonify({
+            "error": str(e),
+            "success": False
+        }), 500
+
+
+@app.route('/api/models/predict/rois', methods=['POST'])
+def predict_rois():
+    """
+    Classify several regions of one frame in a single batched forward pass
+    
+    Expected JSON:
+    {
+        "image": "<base64_encoded_image>",
+        "model": "asl_alphabet",
+        "boxes": [[x, y, width, height], ...],  # or "detect": true (MediaPipe)
+        "normalized": false,    # optional, boxes as fractions of the frame
+        "confidence_threshold": 0.5,
+        "top_k": 5,             # optional
+        "compact": false,       # optional
+        "deadline_ms": 500      # optional, or X-Request-Deadline-Ms header
+    }
+    """
+    try:
+        payload, status = prediction_service.predict_rois(
+            get_model_loader(), request.get_json(silent=True), request.headers, request.args
+        )
+        return respond(payload, status)
+    
+    except Exception as e:
+        return jsonify({
+            "error": str(e),
+            "success": False
+        }), 500
+
+
+@app.route('/api/models/wlasl/recognize', methods=['POST'])
+def recognize_clip():
+    """
+    Recognize a WLASL word from a short clip
+    
+    Frames are sampled uniformly to 16, and concurrent clip requests
+    share one batched forward pass.
+    
+    Expected JSON:
+    {
+        "video": "<base64_encoded_video_file>",   # or
+        "frames": ["<base64_image>", ...],       # frames in temporal order
+        "top_k": 5,             # optional
+        "deadline_ms": 2000     # optional, or X-Request-Deadline-Ms header
     }
     """
     try:
-        data = request.get_json()
-        
-        if not data or 'image' not in data:
-            return jsonify({
-                "error": "Missing 'image' in request",
-                "success": False
-            }), 400
-        
-        # Decode image
-        try:
-            image_data = base64.b64decode(data['image'])
-            image = Image.open(BytesIO(image_data))
-            image = np.array(image)
-            # Keep as RGB - model was trained on RGB images
-        except Exception as e:
-            return jsonify({
-                "error": f"Invalid image data: {str(e)}",
-                "success": False
-            }), 400
-        
-        # Get parameters
-        model_name = data.get('model', 'asl_alphabet')
-        confidence_threshold = float(data.get('confidence_threshold', 0.5))
-        
-        # Make prediction
-        loader = get_model_loader()
-        result = loader.predict(image, model_name, confidence_threshold)
-        
-        return jsonify(result), 200 if result.get('success', True) else 400
+        payload, status = prediction_service.recognize_clip(
+            request.get_json(silent=True), request.headers, request.args
+        )
+        return respond(payload, status)
+    
+    except Exception as e:
+        return jsonify({
+            "error": str(e),
+            "success": False
+        }), 500
+
+
+@app.route('/api/models/fingerspell', methods=['POST'])
+def fingerspell():
+    """
+    Feed one frame into the session's streaming fingerspelling decoder
+    
+    Probabilities are smoothed and collapsed server-side; the response only
+    lists committed events (usually none), plus the decoded text when there
+    are some.
+    
+    Expected JSON:
+    {
+        "image": "<base64_encoded_image>",
+        "model": "sign_mnist",  # optional, FINGERSPELL_MODEL (sign_mnist) by default
+        "session_id": "abc123",  # or X-Session-Id header
+        "reset": false,         # optional, start a new transcript
+        "flush": false,         # optional, end the current word
+        "deadline_ms": 500      # optional, or X-Request-Deadline-Ms header
+    }
+    
+    Events: {"type": "letter" | "word" | "delete", ...}
+    sign_mnist has no nothing/space/del classes: low-confidence frames are
+    the blanks and a pause ends the word.
+    """
+    try:
+        payload, status = prediction_service.fingerspell(
+            get_model_loader(), request.get_json(silent=True), request.headers, request.args
+        )
+        return respond(payload, status)
+    
+    except Exception as e:
+        return jsonify({
+            "error": str(e),
+            "success": False
+        }), 500
+
+
+@app.route('/api/models/gestures/classify', methods=['POST'])
+def classify_gesture():
+    """
+    Classify a frame against the user's custom gestures (few-shot, no retraining)
+    
+    The frame is embedded by the gesture backbone and matched against the
+    user's recorded samples by k-nearest-neighbour vote.
+    
+    Expected JSON:
+    {
+        "image": "<base64_encoded_image>",
+        "user_id": "alice",     # or X-User-Id header
+        "k": 5,                 # optional, neighbours to vote
+        "deadline_ms": 500      # optional, or X-Request-Deadline-Ms header
+    }
+    """
+    try:
+        payload, status = prediction_service.classify_gesture(
+            request.get_json(silent=True), request.headers, request.args
+        )
+        return respond(payload, status)
+    
+    except Exception as e:
+        return jsonify({
+            "error": str(e),
+            "success": False
+        }), 500
+
+
+@app.route('/api/models/gestures', methods=['GET', 'POST', 'DELETE'])
+def manage_gestures():
+    """
+    List (GET), add samples to (POST) or remove (DELETE) custom gestures
+    
+    Expected JSON (POST/DELETE; GET takes ?user_id= or X-User-Id):
+    {
+        "user_id": "alice",     # or X-User-Id header
+        "label": "thumbs_up",
+        "images": ["<base64_encoded_image>", ...]  # POST only, or "image"
+    }
+    """
+    try:
+        payload, status = prediction_service.manage_gestures(
+            request.method, request.get_json(silent=True), request.headers, request.args
+        )
+        return respond(payload, status)
+    
+    except Exception as e:
+        return jsonify({
+            "error": str(e),
+            "success": False
+        }), 500
+
+
+@app.route('/api/models/heads/predict', methods=['POST'])
+def predict_heads():
+    """
+    Run the multi-head classifiers on one frame (one shared backbone pass)
+    
+    Expected JSON:
+    {
+        "image": "<base64_encoded_image>",
+        "heads": ["alice", "bob"],  # optional, defaults to every loaded head
+        "top_k": 3,                 # optional
+        "deadline_ms": 500          # optional, or X-Request-Deadline-Ms header
+    }
+    """
+    try:
+        payload, status = prediction_service.predict_heads(
+            get_model_loader(), request.get_json(silent=True), request.headers, request.args
+        )
+        return respond(payload, status)
+    
+    except Exception as e:
+        return jsonify({
+            "error": str(e),
+            "success": False
+        }), 500
+
+
+@app.route('/api/models/heads', methods=['GET', 'POST', 'DELETE'])
+def manage_heads():
+    """
+    Report memory/latency per head (GET); admin: load (POST) or unload (DELETE) a head
+    
+    Expected JSON (POST/DELETE, X-Admin-Token header required):
+    {
+        "name": "alice"  # head file MULTI_HEAD_DIR/alice.npz (or .keras)
+    }
+    """
+    try:
+        payload, status = prediction_service.manage_heads(
+            request.method, request.get_json(silent=True), request.headers
+        )
+        return respond(payload, status)
     
     except Exception as e:
         return jsonify({
@@ -290,47 +334,48 @@ def compare_predictions():
     {
         "image": "<base64_encoded_image>",
         "models": ["asl_alphabet", "sign_mnist"],
-        "confidence_threshold": 0.5
+        "confidence_threshold": 0.5,
+        "top_k": 5,             # optional
+        "compact": false,       # optional
+        "deadline_ms": 500,     # optional, or X-Request-Deadline-Ms header
+        "priority": "batch",    # optional bulk class (default "compare"), or X-Priority header
+        "ensemble": true,       # optional: fuse into one early-exit prediction
+        "weights": {"asl_alphabet": 2.0},  # optional, ensemble weights
+        "exit_threshold": 0.9   # optional, ensemble early-exit confidence
     }
+    
+    Admins can add ?profile=1 (or cprofile,trace) or an X-Profile header
+    to get a stage-timing breakdown in the response.
     """
     try:
-        data = request.get_json()
-        
-        if not data or 'image' not in data:
-            return jsonify({
-                "error": "Missing 'image' in request",
-                "success": False
-            }), 400
-        
-        # Decode image
-        try:
-            image_data = base64.b64decode(data['image'])
-            image = Image.open(BytesIO(image_data))
-            image = np.array(image)
-            # Keep as RGB - model was trained on RGB images
-        except Exception as e:
-            return jsonify({
-                "error": f"Invalid image data: {str(e)}",
-                "success": False
-            }), 400
-        
-        # Get parameters
-        models = data.get('models', ['asl_alphabet', 'sign_mnist'])
-        confidence_threshold = float(data.get('confidence_threshold', 0.5))
-        
-        # Get predictions from all models
-        loader = get_model_loader()
-        results = {}
-        
-        for model_name in models:
-            results[model_name] = loader.predict(image, model_name, confidence_threshold)
-        
+        payload, status = prediction_service.compare_image(
+            get_model_loader(), request.get_json(silent=True), request.headers, request.args
+        )
+        return respond(payload, status)
+    
+    except Exception as e:
         return jsonify({
-            "status": "success",
-            "timestamp": datetime.now().isoformat(),
-            "predictions": results,
-            "compared_models": list(results.keys())
-        }), 200
+            "error": str(e),
+            "success": False
+        }), 500
+
+
+@app.route('/api/models/reload', methods=['POST'])
+def reload_models():
+    """
+    Admin: hot-reload models without dropping in-flight requests
+    
+    Requires the X-Admin-Token header. Expected JSON (optional):
+    {
+        "model": "sign_mnist",
+        "force": false
+    }
+    """
+    try:
+        payload, status = prediction_service.reload_models(
+            get_model_loader(), request.get_json(silent=True), request.headers
+        )
+        return jsonify(payload), status
     
     except Exception as e:
         return jsonify({
@@ -350,19 +395,43 @@ def model_status():
     }), 200
 
 
-@app.route('/health', methods=['GET'])
-def app_health():
-    """Check API server health"""
+@app.route('/api/models/metrics', methods=['GET'])
+def serving_metrics():
+    """Get serving metrics (latency, response size, serialization time, per-class admission)"""
     return jsonify({
-        "status": "healthy",
-        "service": "ASL Model API",
-        "timestamp": datetime.now().isoformat()
+        "status": "success",
+        "timestamp": datetime.now().isoformat(),
+        "metrics": metrics.snapshot(),
+        "admission": admission.snapshot()
     }), 200
 
 
+@app.route('/health', methods=['GET'])
+def app_health():
+    """Liveness: the API process is up (models may still be loading)"""
+    payload, status = prediction_service.liveness(get_model_loader())
+    return jsonify(payload), status
+
+
+@app.route('/ready', methods=['GET'])
+def app_ready():
+    """Readiness: model loading finished and at least one model is serving"""
+    payload, status = prediction_service.readiness(get_model_loader())
+    return jsonify(payload), status
+
+
 if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="ASL Model API Server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 5000)))
+    args = parser.parse_args()
+    
     print("[INFO] Starting ASL Model API Server...")
-    print("[INFO] Loading models...")
-    get_model_loader()  # Pre-load models on startup
-    print("[INFO] Server ready. Starting Flask...")
-    app.run(host='0.0.0.0', port=5000, debug=False)
+    print("[INFO] Loading models in the background...")
+    get_model_loader()  # Start parallel background loading
+    if os.environ.get("MODEL_SOCKET_PATH"):
+        from local_transport import start_in_background
+        start_in_background(get_model_loader(), os.environ["MODEL_SOCKET_PATH"])
+    print("[INFO] Starting Flask (poll /ready for model readiness)...")
+    app.run(host=args.host, port=args.port, debug=False, threaded=True)
@@ -0,0 +1,225 @@
+"""
+Serving Artifact Cache
+Converts each Keras model once into an inference-only TFLite flatbuffer
+
+Artifacts are keyed on the source file's content hash plus the TensorFlow
+version, so replacing a `.keras` file or upgrading TensorFlow invalidates the
+cached artifact automatically. Later startups memory-map the flatbuffer instead
+of re-parsing the `.keras` archive (and re-running the safe_mode=False fallback).
+
+An artifact is only cached and served if it runs and matches the Keras model:
+the Keras outputs on a fixed check batch are stored with it, and every load
+re-runs the batch and compares (e.g. Flex ops that fail to prepare).
+"""
+
+import hashlib
+import json
+import os
+import threading
+import numpy as np
+from pathlib import Path
+
+# Bump when the conversion pipeline changes so old artifacts are rebuilt
+CACHE_FORMAT = "4"
+
+HASH_CHUNK_BYTES = 1024 * 1024
+
+# Maximum output difference between an artifact and its Keras model
+CHECK_ATOL = 1e-4
+CHECK_SEED = 0
+CHECK_BATCH_SIZE = 2
+
+
+def file_sha256(path):
+    """Content hash of a file, streamed in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def check_batch(input_shape, dtype, seed=CHECK_SEED, batch_size=CHECK_BATCH_SIZE):
+    """Deterministic input batch used to compare an artifact with its Keras model"""
+    shape = [batch_size] + [dim or 64 for dim in input_shape[1:]]
+    rng = np.random.default_rng(seed)
+    if np.dtype(dtype) == np.uint8:
+        return rng.integers(0, 256, size=shape, dtype=np.uint8)
+    return rng.random(shape, dtype=np.float32)
+
+
+class CacheEntry:
+    """Location of one cached artifact"""
+
+    def __init__(self, cache_dir, model_name, key):
+        self.model_name = model_name
+        self.key = key
+        self.artifact_path = cache_dir / f"{model_name}-{key}.tflite"
+        self.meta_path = cache_dir / f"{model_name}-{key}.json"
+
+    def exists(self):
+        return self.artifact_path.exists() and self.meta_path.exists()
+
+
+class TFLiteServingModel:
+    """
+    Minimal Keras-like wrapper around a TFLite interpreter
+
+    Exposes `predict`, `input_shape`, `output_shape` and `count_params` so the
+    loader can serve it exactly like a Keras model.
+    """
+
+    def __init__(self, artifact_path, meta, num_threads=None):
+        import tensorflow as tf
+        # model_path (rather than model_content) lets TFLite mmap the file
+        self.interpreter = tf.lite.Interpreter(
+            model_path=str(artifact_path), num_threads=num_threads
+        )
+        self.interpreter.allocate_tensors()
+        self._refresh_details()
+        self.input_shape = tuple(meta["input_shape"])
+        self.output_shape = tuple(meta["output_shape"])
+        self.name = meta.get("name", Path(artifact_path).stem)
+        self.meta = meta
+        self._params = meta["params"]
+        # A TFLite interpreter is not thread-safe
+        self._lock = threading.Lock()
+
+    def _refresh_details(self):
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+
+    def count_params(self):
+        return self._params
+
+    def predict(self, batch, verbose=0):
+        batch = np.ascontiguousarray(batch, dtype=self._input["dtype"])
+        with self._lock:
+            if tuple(self._input["shape"]) != batch.shape:
+                self.interpreter.resize_tensor_input(self._input["index"], batch.shape)
+                self.interpreter.allocate_tensors()
+                self._refresh_details()
+            self.interpreter.set_tensor(self._input["index"], batch)
+            self.interpreter.invoke()
+            return self.interpreter.get_tensor(self._output["index"]).copy()
+
+    __call__ = predict
+
+
+class ModelArtifactCache:
+    """On-disk cache of converted serving artifacts"""
+
+    def __init__(self, cache_dir, num_threads=None):
+        self.cache_dir = Path(cache_dir)
+        self.num_threads = num_threads
+
+    def entry_for(self, model_name, source_path):
+        """Cache entry for the current content of a source model file"""
+        import tensorflow as tf
+        digest = file_sha256(source_path)[:16]
+        tf_version = tf.__version__.replace(".", "_")
+        return CacheEntry(self.cache_dir, model_name, f"{digest}-tf{tf_version}-v{CACHE_FORMAT}")
+
+    def load(self, entry):
+        """Load a cached artifact, or None if missing, unreadable or not matching its model"""
+        if not entry.exists():
+            return None
+        try:
+            meta = json.loads(entry.meta_path.read_text())
+            model = TFLiteServingModel(entry.artifact_path, meta, self.num_threads)
+            self._check(model, meta)
+            return model
+        except Exception as e:
+            print(f"[WARNING] Discarding unusable cache artifact {entry.artifact_path.name}: {str(e)[:200]}")
+            self._remove(entry.artifact_path, entry.meta_path)
+            return None
+
+    def _check(self, model, meta):
+        """Run the check batch and compare with the Keras outputs recorded at store time"""
+        check = meta["check"]
+        batch = check_batch(check["input_shape"], check["dtype"], check["seed"], check["batch_size"])
+        expected = np.asarray(check["expected"], dtype=np.float32)
+        actual = np.asarray(model.predict(batch), dtype=np.float32)
+        if actual.shape != expected.shape:
+            raise ValueError(f"artifact output shape {actual.shape} != {expected.shape}")
+        max_diff = float(np.max(np.abs(actual - expected)))
+        if not np.isfinite(max_diff) or max_diff > check["atol"]:
+            raise ValueError(f"artifact output differs from Keras by {max_diff:.2e} (> {check['atol']:.0e})")
+
+    def store(self, entry, model, extra_meta=None):
+        """
+        Convert a Keras model to TFLite and write it to the cache
+
+        Args:
+            entry: Cache entry to write
+            model: Keras model (already optimized for inference)
+            extra_meta: Additional JSON-serializable metadata to keep with the artifact
+
+        Returns:
+            The loaded serving artifact, or None if conversion failed or the
+            artifact doesn't reproduce the Keras outputs (nothing is cached then)
+        """
+        import tensorflow as tf
+        serving = (extra_meta or {}).get("serving") or {}
+        check = {
+            "input_shape": list(serving.get("target_input_shape") or model.input_shape),
+            "dtype": np.dtype(getattr(model.inputs[0].dtype, "as_numpy_dtype", model.inputs[0].dtype)).name,
+            "seed": CHECK_SEED,
+            "batch_size": CHECK_BATCH_SIZE,
+            "atol": CHECK_ATOL,
+        }
+        try:
+            batch = check_batch(check["input_shape"], check["dtype"])
+            check["expected"] = np.asarray(model(batch, training=False), dtype=np.float32).tolist()
+        except Exception as e:
+            print(f"[WARNING] Could not run {entry.model_name} for the artifact check: {str(e)[:100]}")
+            return None
+
+        try:
+            converter = tf.lite.TFLiteConverter.from_keras_model(model)
+            converter.target_spec.supported_ops = [
+                tf.lite.OpsSet.TFLITE_BUILTINS,
+                tf.lite.OpsSet.SELECT_TF_OPS,
+            ]
+            flatbuffer = converter.convert()
+        except Exception as e:
+            print(f"[WARNING] TFLite conversion failed for {entry.model_name}: {str(e)[:100]}")
+            return None
+
+        meta = {
+            "name": entry.model_name,
+            "key": entry.key,
+            "input_shape": list(model.input_shape),
+            "output_shape": list(model.output_shape),
+            "params": int(model.count_params()),
+            **(extra_meta or {}),
+            "check": check,
+        }
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._write_atomic(entry.artifact_path, flatbuffer)
+        self._write_atomic(entry.meta_path, json.dumps(meta, indent=2).encode())
+        artifact = self.load(entry)
+        if artifact is None:
+            print(f"[WARNING] TFLite artifact for {entry.model_name} failed its check, serving the Keras model")
+            return None
+        self.evict_stale(entry)
+        return artifact
+
+    def evict_stale(self, entry):
+        """Remove artifacts of the same model built from older sources"""
+        for path in self.cache_dir.glob(f"{entry.model_name}-*"):
+            if path not in (entry.artifact_path, entry.meta_path):
+                self._remove(path)
+
+    def _write_atomic(self, path, data):
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+    def _remove(self, *paths):
+        for path in paths:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,431 @@
+"""
+Model Optimization Utilities
+Inference-only graph rewrites shared by the model loader and the export pipeline
+
+- strip_training_layers: drop augmentation/dropout/noise layers
+- fold_batch_norm: fold BatchNormalization into the adjacent Dense/Conv kernel
+- optimize_for_inference: both passes plus an output-equivalence check and a
+  latency comparison
+
+Rewrites apply to the top-level layer chain and to nested chain models (e.g.
+a classification head). Nested backbones with branches (e.g. `efficientnetb0`)
+are kept as single layers.
+"""
+
+import time
+import numpy as np
+
+# Layers that only do something while training. At inference they are
+# identity ops, so they can be dropped from the served/exported graph.
+TRAINING_ONLY_LAYERS = {
+    "Dropout",
+    "SpatialDropout1D",
+    "SpatialDropout2D",
+    "SpatialDropout3D",
+    "GaussianDropout",
+    "GaussianNoise",
+    "AlphaDropout",
+    "ActivityRegularization",
+    "RandomFlip",
+    "RandomRotation",
+    "RandomZoom",
+    "RandomContrast",
+    "RandomBrightness",
+    "RandomTranslation",
+}
+
+
+def is_training_only(layer):
+    """Check if a layer is a no-op at inference time"""
+    if type(layer).__name__ in TRAINING_ONLY_LAYERS:
+        return True
+    # Nested augmentation blocks (e.g. the `data_augmentation` Sequential)
+    sublayers = getattr(layer, "layers", None)
+    if type(layer).__name__ == "Sequential" and sublayers:
+        return all(is_training_only(sub) for sub in sublayers)
+    return False
+
+
+def _chain_layers(model):
+    """
+    Layers of a single-input/single-output chain model, or None
+
+    The chain is followed through the graph's nodes from the output back to
+    the input, so reused layers (e.g. after strip_training_layers) and nested
+    functional backbones, whose own `input` is an internal Input, are handled.
+    """
+    import tensorflow as tf
+    if isinstance(model, tf.keras.Sequential):
+        return list(model.layers)
+    if len(model.inputs) != 1 or len(model.outputs) != 1:
+        return None
+
+    chain = []
+    tensor = model.outputs[0]
+    try:
+        while tensor is not model.inputs[0]:
+            if len(chain) > len(model.layers):
+                return None
+            layer, node_index = tensor._keras_history[0], tensor._keras_history[1]
+            inbound = tf.nest.flatten(layer._inbound_nodes[node_index].input_tensors)
+            if len(inbound) != 1:
+                return None
+            chain.append(layer)
+            tensor = inbound[0]
+    except (AttributeError, IndexError, TypeError, ValueError):
+        return None
+    return chain[::-1]
+
+
+def _is_nested_model(layer):
+    import tensorflow as tf
+    return isinstance(layer, tf.keras.Model)
+
+
+def _input_layer(model):
+    """Create a fresh Input matching the model's input signature"""
+    import tensorflow as tf
+    return tf.keras.Input(
+        shape=model.input_shape[1:],
+        dtype=model.inputs[0].dtype,
+        name=model.inputs[0].name.split(":")[0],
+    )
+
+
+def _rebuild(model, ops):
+    """
+    Functional model applying `ops` in order to a fresh input
+
+    Args:
+        model: Model whose input signature and name to keep
+        ops: List of (layer, weights to set after the first call, or None)
+    """
+    import tensorflow as tf
+    inputs = _input_layer(model)
+    x = inputs
+    for layer, weights in ops:
+        x = layer(x)
+        if weights is not None:
+            layer.set_weights(weights)
+    return tf.keras.Model(inputs=inputs, outputs=x, name=model.name)
+
+
+def strip_training_layers(model):
+    """
+    Rebuild a model without training-only layers (augmentation, dropout, noise)
+
+    Layers are reused, not copied, so the stripped model shares weights with
+    the original. Nested chain models (e.g. a classification head) are
+    stripped too; other nested models are kept as they are.
+
+    Args:
+        model: Keras model
+
+    Returns:
+        (stripped_model, list of removed layer names). The list is None when
+        the model is not a layer chain and was returned as-is.
+    """
+    layers = _chain_layers(model)
+    if layers is None:
+        return model, None
+
+    removed = []
+    ops = []
+    for layer in layers:
+        if is_training_only(layer):
+            removed.append(layer.name)
+            continue
+        if _is_nested_model(layer):
+            stripped, inner = strip_training_layers(layer)
+            if inner:
+                removed.extend(f"{layer.name}/{name}" for name in inner)
+                layer = stripped
+        ops.append((layer, None))
+
+    if not removed:
+        return model, []
+    return _rebuild(model, ops), removed
+
+
+# ==================== BATCH NORM FOLDING ====================
+
+FOLDABLE_PRODUCERS = {"Dense", "Conv1D", "Conv2D", "Conv3D"}
+
+
+def _is_batch_norm(layer):
+    """Per-feature BN on the last axis (the only kind that maps onto kernel channels)"""
+    import tensorflow as tf
+    if type(layer).__name__ != "BatchNormalization":
+        return False
+    axes = list(layer.axis) if isinstance(layer.axis, (list, tuple)) else [layer.axis]
+    try:
+        # The first node: reused layers have several, and `layer.output` may refuse them
+        rank = len(tf.nest.flatten(layer._inbound_nodes[0].output_tensors)[0].shape)
+    except (AttributeError, IndexError, ValueError):
+        return False
+    return len(axes) == 1 and axes[0] in (-1, rank - 1)
+
+
+def _bn_scale_shift(bn):
+    """BN at inference is y = s * x + t"""
+    mean = bn.moving_mean.numpy()
+    var = bn.moving_variance.numpy()
+    gamma = bn.gamma.numpy() if bn.scale else np.ones_like(mean)
+    beta = bn.beta.numpy() if bn.center else np.zeros_like(mean)
+    s = gamma / np.sqrt(var + bn.epsilon)
+    return s, beta - mean * s
+
+
+def _is_linear_activation(layer):
+    activation = layer.get_config().get("activation")
+    return activation in (None, "linear")
+
+
+def _clone_with_bias(layer):
+    """Fresh copy of a Dense/Conv layer that always has a bias"""
+    config = layer.get_config()
+    config["use_bias"] = True
+    return type(layer).from_config(config)
+
+
+def _kernel_and_bias(layer):
+    kernel = layer.kernel.numpy()
+    bias = layer.bias.numpy() if layer.use_bias else np.zeros(kernel.shape[-1], dtype=kernel.dtype)
+    return kernel, bias
+
+
+def _fold_into_producer(layer, bn):
+    """Dense/Conv -> BN  =>  Dense/Conv with scaled kernel"""
+    s, t = _bn_scale_shift(bn)
+    kernel, bias = _kernel_and_bias(layer)
+    return _clone_with_bias(layer), [kernel * s, bias * s + t]
+
+
+def _fold_into_consumer(bn, layer):
+    """BN -> Dense  =>  Dense with scaled input rows"""
+    s, t = _bn_scale_shift(bn)
+    kernel, bias = _kernel_and_bias(layer)
+    return _clone_with_bias(layer), [kernel * s[:, None], bias + t @ kernel]
+
+
+def fold_batch_norm(model):
+    """
+    Fold BatchNormalization layers into neighbouring Dense/Conv kernels
+
+    Handles Dense/Conv (linear activation) -> BN and BN -> Dense, also inside
+    nested chain models. A Dropout between the two prevents folding, so strip
+    training layers first.
+
+    Args:
+        model: Keras model
+
+    Returns:
+        (folded_model, list of folded BN layer names)
+    """
+    layers = _chain_layers(model)
+    if layers is None:
+        return model, []
+
+    ops = []  # (layer, weights to set after the first call, or None)
+    folded = []
+    i = 0
+    while i < len(layers):
+        layer = layers[i]
+        nxt = layers[i + 1] if i + 1 < len(layers) else None
+        kind = type(layer).__name__
+        if (kind in FOLDABLE_PRODUCERS and nxt is not None and _is_batch_norm(nxt)
+                and _is_linear_activation(layer)):
+            ops.append(_fold_into_producer(layer, nxt))
+            folded.append(nxt.name)
+            i += 2
+        elif (_is_batch_norm(layer) and nxt is not None and type(nxt).__name__ == "Dense"):
+            ops.append(_fold_into_consumer(layer, nxt))
+            folded.append(layer.name)
+            i += 2
+        else:
+            if _is_nested_model(layer):
+                inner_model, inner = fold_batch_norm(layer)
+                if inner:
+                    folded.extend(f"{layer.name}/{name}" for name in inner)
+                    layer = inner_model
+            ops.append((layer, None))
+            i += 1
+
+    if not folded:
+        return model, []
+    return _rebuild(model, ops), folded
+
+
+# ==================== INFERENCE OPTIMIZATION PASS ====================
+
+def _sample_input(model, batch_size=4, seed=0):
+    """Deterministic random batch in the model's [0, 1] input range"""
+    shape = [batch_size] + [dim or 64 for dim in model.input_shape[1:]]
+    return np.random.default_rng(seed).random(shape, dtype=np.float32)
+
+
+def measure_latency_ms(model, batch, runs=20, warmup=3):
+    """Median latency of a direct (non-`predict`) forward pass"""
+    for _ in range(warmup):
+        model(batch, training=False)
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        model(batch, training=False)
+        timings.append((time.perf_counter() - started) * 1000)
+    return float(np.median(timings))
+
+
+def optimize_for_inference(model, atol=1e-4, benchmark_runs=20):
+    """
+    Strip training-only layers, fold BatchNorm and verify the result
+
+    The optimized model is only returned if its outputs match the original
+    within `atol` on a random batch; otherwise the original is kept.
+
+    Args:
+        model: Keras model
+        atol: Maximum allowed absolute output difference
+        benchmark_runs: Forward passes per latency measurement (0 skips it)
+
+    Returns:
+        (model, report dict)
+    """
+    optimized, removed = strip_training_layers(model)
+    optimized, folded = fold_batch_norm(optimized)
+    report = {"removed_layers": removed or [], "folded_batch_norm": folded, "applied": False}
+    if not removed and not folded:
+        return model, report
+
+    batch = _sample_input(model)
+    reference = np.asarray(model(batch, training=False))
+    candidate = np.asarray(optimized(batch, training=False))
+    max_diff = float(np.max(np.abs(reference - candidate)))
+    report["max_abs_diff"] = max_diff
+    if not np.isfinite(max_diff) or max_diff > atol:
+        print(f"[WARNING] Optimized {model.name} differs by {max_diff:.2e} (> {atol:.0e}), keeping original")
+        return model, report
+
+    report["applied"] = True
+    if benchmark_runs:
+        before = measure_latency_ms(model, batch[:1], benchmark_runs)
+        after = measure_latency_ms(optimized, batch[:1], benchmark_runs)
+        report.update({
+            "latency_ms_before": round(before, 3),
+            "latency_ms_after": round(after, 3),
+            "speedup": round(before / after, 3) if after else None,
+        })
+    return optimized, report
+
+
+# ==================== IN-GRAPH PREPROCESSING ====================
+
+def _make_serving_preprocess_layer():
+    """Define the preprocessing layer lazily so importing this module stays TF-free"""
+    import tensorflow as tf
+
+    class ServingPreprocess(tf.keras.layers.Layer):
+        """
+        uint8 RGB NHWC images of any size -> model-ready floats
+
+        Does resizing, RGB -> gray for single-channel models and
+        `x * scale + offset` inside the graph. Only TFLite builtin ops are
+        used (no tf.cond or shape assertions), so the converted model needs
+        no Flex delegate.
+        """
+
+        def __init__(self, height, width, channels, scale=1.0 / 255.0, offset=0.0, **kwargs):
+            super().__init__(**kwargs)
+            self.height = height
+            self.width = width
+            self.channels = channels
+            self.scale = scale
+            self.offset = offset
+
+        def call(self, images):
+            # Bilinear resize to the same size is an exact no-op
+            x = tf.image.resize(tf.cast(images, tf.float32), (self.height, self.width), method="bilinear")
+            if self.channels == 1:
+                x = tf.image.rgb_to_grayscale(x)
+            return x * self.scale + self.offset
+
+        def get_config(self):
+            config = super().get_config()
+            config.update({
+                "height": self.height,
+                "width": self.width,
+                "channels": self.channels,
+                "scale": self.scale,
+                "offset": self.offset,
+            })
+            return config
+
+    return ServingPreprocess
+
+
+def build_serving_model(model, atol=1e-4):
+    """
+    Wrap a model so it accepts raw uint8 RGB NHWC pixels
+
+    The input signature is a static (None, None, None, 3) uint8 tensor. The
+    host only has to decode to RGB and batch bytes: resizing, the gray
+    conversion of single-channel models and the /255 scaling run in the
+    graph. A leading `Rescaling` layer is folded into the same multiply-add
+    instead of being applied twice.
+
+    Args:
+        model: Keras image model expecting float inputs in [0, 1]
+        atol: Maximum allowed absolute difference from the float path
+
+    Returns:
+        (serving_model, info) or (None, None) if the model can't be wrapped
+    """
+    import tensorflow as tf
+
+    input_shape = model.input_shape
+    if not isinstance(input_shape, tuple) or len(input_shape) != 4 or None in input_shape[1:]:
+        return None, None
+    height, width, channels = input_shape[1:]
+    if channels not in (1, 3):
+        return None, None
+
+    scale, offset = 1.0 / 255.0, 0.0
+    body = None
+    layers = _chain_layers(model)
+    if layers and type(layers[0]).__name__ == "Rescaling":
+        rescaling = layers[0]
+        if np.ndim(rescaling.scale) == 0 and np.ndim(rescaling.offset) == 0:
+            scale = float(rescaling.scale) / 255.0
+            offset = float(rescaling.offset)
+            body = layers[1:]
+
+    ServingPreprocess = _make_serving_preprocess_layer()
+    inputs = tf.keras.Input(shape=(None, None, 3), dtype="uint8", name="image_uint8")
+    x = ServingPreprocess(height, width, channels, scale, offset, name="serving_preprocess")(inputs)
+    if body is None:
+        x = model(x)
+    else:
+        for layer in body:
+            x = layer(x)
+    serving = tf.keras.Model(inputs=inputs, outputs=x, name=f"{model.name}_serving")
+
+    # The wrapper must match the float path it replaces
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 256, size=(2, height, width, 3), dtype=np.uint8)
+    floats = pixels.astype(np.float32)
+    if channels == 1:
+        floats = tf.image.rgb_to_grayscale(floats).numpy()
+    reference = np.asarray(model(floats / 255.0, training=False))
+    candidate = np.asarray(serving(pixels, training=False))
+    max_diff = float(np.max(np.abs(reference - candidate)))
+    if not np.isfinite(max_diff) or max_diff > atol:
+        print(f"[WARNING] uint8 serving wrapper for {model.name} differs by {max_diff:.2e}, not using it")
+        return None, None
+
+    info = {
+        "uint8_input": True,
+        "target_input_shape": [None, height, width, 3],
+        "folded_rescaling": body is not None,
+        "max_abs_diff": max_diff,
+    }
+    return serving, info
@@ -0,0 +1,511 @@
+"""
+Multi-Head Serving
+One shared backbone forward pass per frame, many small registered heads
+
+Every custom gesture classifier trained with ModelPipeline.train_head() is
+the same frozen backbone plus a small head. Serving each one as a full
+Keras model makes memory and compute grow with the number of classifiers.
+Here the backbone (the gesture backbone of gesture_index.py) runs once per
+frame, and every registered head reads the same embedding:
+
+- Heads are converted to NumPy on load: Dropout is dropped and BatchNorm is
+  folded into the neighbouring Dense layer, so the notebook head becomes
+  two matrix products.
+- The first layer of all heads is kept in one fused (dim, sum of widths)
+  matrix, so one matrix-vector product serves every head's widest layer.
+  Only the small remaining layers run per head.
+- Heads are loaded from MULTI_HEAD_DIR and unloaded at runtime. The fused
+  plan is rebuilt on change and swapped in atomically, so in-flight frames
+  keep the plan they started with.
+
+Head files (MULTI_HEAD_DIR/<name>.npz) are written by export_head() or
+ModelPipeline.export_head(); a <name>.keras head plus <name>.classes.json
+is converted on load.
+
+Usage:
+    python multi_head.py bench --counts 1,10,50,100 --hidden 256 --classes 10
+"""
+
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+MULTI_HEAD_DIR = Path(os.environ.get("MULTI_HEAD_DIR", "data/heads"))
+MAX_HEADS = int(os.environ.get("MULTI_HEAD_MAX_HEADS", 256))
+# Latency averages weight the newest frame by this much
+LATENCY_ALPHA = 0.05
+
+_HEAD_NAME = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+
+class HeadError(ValueError):
+    """Invalid head file or head operation"""
+
+
+def _relu(x):
+    return np.maximum(x, 0.0, out=x)
+
+
+def _softmax(x):
+    x = x - x.max(axis=-1, keepdims=True)
+    np.exp(x, out=x)
+    x /= x.sum(axis=-1, keepdims=True)
+    return x
+
+
+ACTIVATIONS = {"linear": lambda x: x, "relu": _relu, "softmax": _softmax}
+
+
+def fold_keras_head(model):
+    """
+    Convert a Dense/BatchNormalization/Dropout head to NumPy layers
+
+    BatchNorm at inference is a per-feature affine map, so it is folded into
+    the previous Dense layer when that layer is linear, otherwise into the
+    next one.
+
+    Returns:
+        List of (kernel, bias, activation)
+    """
+    layers = []
+    scale = shift = None  # BatchNorm waiting to be folded into the next Dense
+    for layer in model.layers:
+        kind = type(layer).__name__
+        if kind in ("InputLayer", "Dropout"):
+            continue
+        if kind == "BatchNormalization":
+            mean, var = np.asarray(layer.moving_mean), np.asarray(layer.moving_variance)
+            gamma = np.asarray(layer.gamma) if layer.scale else np.ones_like(mean)
+            beta = np.asarray(layer.beta) if layer.center else np.zeros_like(mean)
+            bn_scale = gamma / np.sqrt(var + layer.epsilon)
+            bn_shift = beta - mean * bn_scale
+            if scale is None and layers and layers[-1][2] == "linear":
+                kernel, bias, activation = layers[-1]
+                layers[-1] = (kernel * bn_scale, bias * bn_scale + bn_shift, activation)
+            elif scale is None:
+                scale, shift = bn_scale, bn_shift
+            else:
+                scale, shift = scale * bn_scale, shift * bn_scale + bn_shift
+        elif kind == "Dense":
+            kernel = layer.get_weights()[0]
+            bias = layer.get_weights()[1] if layer.use_bias else np.zeros(kernel.shape[1])
+            if scale is not None:
+                # (x * scale + shift) @ W + b == x @ (scale[:, None] * W) + (shift @ W + b)
+                kernel, bias = scale[:, None] * kernel, shift @ kernel + bias
+                scale = shift = None
+            layers.append((kernel, bias, layer.activation.__name__))
+        else:
+            raise HeadError(f"Unsupported head layer: {kind} ({layer.name})")
+    if scale is not None:
+        raise HeadError("Head ends with a BatchNormalization layer")
+    return layers
+
+
+def export_head(path, classes, layers):
+    """Write NumPy head layers and class names to an .npz head file"""
+    arrays = {"classes": np.array(classes)}
+    for i, (kernel, bias, activation) in enumerate(layers):
+        arrays[f"kernel_{i}"] = np.asarray(kernel, dtype=np.float32)
+        arrays[f"bias_{i}"] = np.asarray(bias, dtype=np.float32)
+        arrays[f"activation_{i}"] = np.array(activation)
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    np.savez(path, **arrays)
+
+
+def read_head(path, classes=None):
+    """
+    Read a head file (.npz from export_head, or a Keras head)
+
+    Returns:
+        (classes, layers)
+    """
+    path = Path(path)
+    if path.suffix == ".npz":
+        with np.load(path) as data:
+            layers = []
+            while f"kernel_{len(layers)}" in data:
+                i = len(layers)
+                layers.append((data[f"kernel_{i}"], data[f"bias_{i}"], str(data[f"activation_{i}"])))
+            return [str(c) for c in data["classes"]], layers
+
+    import tensorflow as tf
+    if classes is None:
+        classes_path = path.with_suffix(".classes.json")
+        if not classes_path.exists():
+            raise HeadError(f"Keras head {path.name} needs {classes_path.name}")
+        classes = json.loads(classes_path.read_text())
+    model = tf.keras.models.load_model(str(path), compile=False)
+    return list(classes), fold_keras_head(model)
+
+
+class Head:
+    """A registered head; its first layer lives in the fused plan"""
+
+    def __init__(self, name, classes, layers, source=None):
+        if not layers:
+            raise HeadError(f"Head '{name}' has no layers")
+        for kernel, bias, activation in layers:
+            if activation not in ACTIVATIONS:
+                raise HeadError(f"Head '{name}' uses unsupported activation '{activation}'")
+            if bias.shape != (kernel.shape[1],):
+                raise HeadError(f"Head '{name}' has a bias that doesn't match its kernel")
+        for (k1, _, _), (k2, _, _) in zip(layers, layers[1:]):
+            if k1.shape[1] != k2.shape[0]:
+                raise HeadError(f"Head '{name}' has mismatched layer sizes")
+        if layers[-1][0].shape[1] != len(classes):
+            raise HeadError(f"Head '{name}' has {layers[-1][0].shape[1]} outputs for {len(classes)} classes")
+
+        self.name = name
+        self.classes = list(classes)
+        self.source = source
+        self.dim = layers[0][0].shape[0]
+        self.width = layers[0][0].shape[1]
+        self.first_activation = layers[0][2]
+        self.rest = [(np.ascontiguousarray(k, dtype=np.float32), np.asarray(b, dtype=np.float32), a)
+                     for k, b, a in layers[1:]]
+        self.params = sum(k.size + b.size for k, b, _ in layers)
+        self.nbytes = self.params * 4  # float32
+        self.loaded_at = datetime.now().isoformat()
+        self.requests = 0
+        self.latency_ms = None
+
+    def finish(self, hidden):
+        """Run the layers after the fused first layer on (N, width) activations"""
+        x = ACTIVATIONS[self.first_activation](hidden)
+        for kernel, bias, activation in self.rest:
+            x = ACTIVATIONS[activation](x @ kernel + bias)
+        return x
+
+    def describe(self):
+        return {
+            "classes": self.classes,
+            "num_classes": len(self.classes),
+            "params": self.params,
+            "memory_bytes": self.nbytes,
+            "source": self.source,
+            "loaded_at": self.loaded_at,
+            "requests": self.requests,
+            "latency_ms": round(self.latency_ms, 4) if self.latency_ms is not None else None,
+        }
+
+
+class _Plan:
+    """Immutable snapshot: fused first-layer weights plus the heads that read them"""
+
+    def __init__(self, dim, kernel, bias, heads, slices):
+        self.dim = dim
+        self.kernel = kernel
+        self.bias = bias
+        self.heads = heads      # name -> Head
+        self.slices = slices    # name -> column slice of the fused kernel
+
+    @classmethod
+    def empty(cls, dim):
+        return cls(dim, np.empty((dim, 0), dtype=np.float32), np.empty(0, dtype=np.float32), {}, {})
+
+    def with_head(self, head, kernel, bias):
+        start = self.kernel.shape[1]
+        heads = dict(self.heads, **{head.name: head})
+        slices = dict(self.slices, **{head.name: slice(start, start + head.width)})
+        return _Plan(head.dim,
+                     np.concatenate([self.kernel, np.asarray(kernel, dtype=np.float32)], axis=1),
+                     np.concatenate([self.bias, np.asarray(bias, dtype=np.float32)]),
+                     heads, slices)
+
+    def without_head(self, name):
+        gone = self.slices[name]
+        keep = np.r_[0:gone.start, gone.stop:self.kernel.shape[1]]
+        heads = {n: h for n, h in self.heads.items() if n != name}
+        slices = {}
+        for n, s in self.slices.items():
+            if n == name:
+                continue
+            shift = gone.stop - gone.start if s.start >= gone.stop else 0
+            slices[n] = slice(s.start - shift, s.stop - shift)
+        return _Plan(self.dim, np.ascontiguousarray(self.kernel[:, keep]), self.bias[keep], heads, slices)
+
+    def run(self, embeddings, names):
+        """
+        Probabilities of the named heads for (N, dim) embeddings
+
+        All heads share one fused product unless only a small subset is asked for.
+        """
+        timings = {}
+        if len(names) * 4 >= len(self.heads):
+            hidden = embeddings @ self.kernel + self.bias
+            columns = self.slices
+        else:
+            hidden, columns, offset = [], {}, 0
+            for name in names:
+                s = self.slices[name]
+                hidden.append(embeddings @ self.kernel[:, s] + self.bias[s])
+                columns[name] = slice(offset, offset + s.stop - s.start)
+                offset += s.stop - s.start
+            hidden = np.concatenate(hidden, axis=1)
+        fused_at = time.perf_counter()
+
+        outputs = {}
+        for name in names:
+            started = time.perf_counter()
+            outputs[name] = self.heads[name].finish(hidden[:, columns[name]].copy())
+            timings[name] = (time.perf_counter() - started) * 1000
+        return outputs, fused_at, timings
+
+
+class MultiHeadModel:
+    """Shared-backbone model with heads loadable and unloadable at runtime"""
+
+    def __init__(self, backbone=None, heads_dir=MULTI_HEAD_DIR, max_heads=MAX_HEADS):
+        """
+        Args:
+            backbone: Object with embed(images) -> (N, dim) and `dim`
+                (defaults to the gesture backbone)
+            heads_dir: Directory the heads are loaded from
+            max_heads: Refuse to load more heads than this
+        """
+        self._backbone = backbone
+        self.heads_dir = Path(heads_dir)
+        self.max_heads = max_heads
+        self._plan = None
+        self._lock = threading.Lock()
+        self.backbone_ms = None
+        self.heads_ms = None
+
+    @property
+    def backbone(self):
+        if self._backbone is None:
+            from gesture_index import embedder
+            self._backbone = embedder
+        return self._backbone
+
+    def head_path(self, name):
+        if not _HEAD_NAME.match(name or ""):
+            raise HeadError("Head name must be 1-64 letters, digits, '_', '-' or '.'")
+        for suffix in (".npz", ".keras"):
+            path = self.heads_dir / f"{name}{suffix}"
+            if path.exists():
+                return path
+        raise HeadError(f"No head file for '{name}' in {self.heads_dir}")
+
+    def load_head(self, name, path=None, classes=None, layers=None):
+        """
+        Register (or replace) a head
+
+        Args:
+            name: Head name used in requests
+            path: Head file (defaults to MULTI_HEAD_DIR/<name>.npz or .keras)
+            classes, layers: Register in-memory head layers instead of a file
+
+        Returns:
+            The head's describe() dict
+
+        Raises:
+            HeadError: invalid head, or its input size doesn't match the backbone
+            BackboneUnavailableError: the backbone (loaded to check the size) failed to load
+        """
+        if layers is None:
+            path = Path(path) if path else self.head_path(name)
+            classes, layers = read_head(path, classes)
+        head = Head(name, classes, layers, source=str(path) if path else "memory")
+        kernel, bias, _ = layers[0]
+        # Checked here rather than on the first frame the head would fail on
+        backbone_dim = self.backbone.dim
+        if head.dim != backbone_dim:
+            raise HeadError(f"Head '{name}' expects {head.dim}-d embeddings, backbone gives {backbone_dim}-d")
+
+        with self._lock:
+            plan = self._plan
+            if plan is not None and name in plan.heads:
+                plan = plan.without_head(name)
+            if plan is not None and len(plan.heads) >= self.max_heads:
+                raise HeadError(f"Already serving {self.max_heads} heads (MULTI_HEAD_MAX_HEADS)")
+            if plan is None or not plan.heads:
+                plan = _Plan.empty(head.dim)
+            self._plan = plan.with_head(head, kernel, bias)
+        print(f"[INFO] Loaded head '{name}' ({len(head.classes)} classes, {head.nbytes / 1024:.0f} KiB)")
+        return head.describe()
+
+    def unload_head(self, name):
+        """Remove a head; returns False if it wasn't loaded"""
+        with self._lock:
+            if self._plan is None or name not in self._plan.heads:
+                return False
+            self._plan = self._plan.without_head(name)
+        print(f"[INFO] Unloaded head '{name}'")
+        return True
+
+    def head_names(self):
+        plan = self._plan
+        return list(plan.heads) if plan is not None else []
+
+    def check_heads(self, names=None):
+        """
+        Validate a head selection without running anything
+
+        Call before the backbone forward pass so a request that can't be
+        served never pays for (or lazily loads) the backbone.
+
+        Returns:
+            List of head names (all loaded heads when `names` is None)
+
+        Raises:
+            HeadError: no heads are loaded, or a named head isn't
+        """
+        return self._select(self._plan, names)
+
+    def _select(self, plan, names):
+        if plan is None or not plan.heads:
+            raise HeadError("No heads loaded")
+        names = list(plan.heads) if names is None else list(dict.fromkeys(names))
+        unknown = [name for name in names if name not in plan.heads]
+        if unknown:
+            raise HeadError(f"Unknown head(s): {', '.join(unknown)}")
+        return names
+
+    def predict_embeddings(self, embeddings, names=None):
+        """
+        Run heads on precomputed (N, dim) embeddings
+
+        Returns:
+            (name -> (N, num_classes) probabilities, name -> Head)
+        """
+        plan = self._plan
+        names = self._select(plan, names)
+        embeddings = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+        if embeddings.shape[1] != plan.dim:
+            raise HeadError(f"Heads expect {plan.dim}-d embeddings, got {embeddings.shape[1]}-d")
+
+        started = time.perf_counter()
+        outputs, fused_at, timings = plan.run(embeddings, names)
+        fused_ms = (fused_at - started) * 1000 / len(names)
+        for name, ms in timings.items():
+            head = plan.heads[name]
+            head.requests += 1
+            head.latency_ms = _ewma(head.latency_ms, fused_ms + ms)
+        self.heads_ms = _ewma(self.heads_ms, (time.perf_counter() - started) * 1000)
+        return outputs, plan.heads
+
+    def embed(self, images):
+        """Backbone embeddings of decoded frames (one forward pass for all heads)"""
+        started = time.perf_counter()
+        embeddings = self.backbone.embed(images)
+        self.backbone_ms = _ewma(self.backbone_ms, (time.perf_counter() - started) * 1000)
+        return embeddings
+
+    def report(self):
+        """Memory per head and latency split between the backbone and the heads"""
+        plan = self._plan
+        heads = plan.heads if plan is not None else {}
+        head_bytes = sum(head.nbytes for head in heads.values())
+        backbone = self._backbone
+        model = getattr(backbone, "model", None)
+        backbone_params = int(model.count_params()) if model is not None else None
+        return {
+            "heads": {name: head.describe() for name, head in heads.items()},
+            "head_count": len(heads),
+            "embedding_dim": plan.dim if heads else None,
+            "heads_memory_bytes": head_bytes,
+            "backbone_params": backbone_params,
+            # What separate full models would hold instead of the shared backbone
+            "separate_models_bytes": (backbone_params * 4 * len(heads) + head_bytes)
+                                     if backbone_params is not None else None,
+            "latency_ms": {
+                "backbone": _round(self.backbone_ms),
+                "all_heads": _round(self.heads_ms),
+            },
+        }
+
+
+def _ewma(current, value):
+    return value if current is None else current + LATENCY_ALPHA * (value - current)
+
+
+def _round(value):
+    return round(value, 3) if value is not None else None
+
+
+def synthetic_head(dim, hidden, num_classes, seed):
+    """Random head with the notebook head's shape (for benchmarks)"""
+    rng = np.random.default_rng(seed)
+    return [
+        (rng.standard_normal((dim, hidden), dtype=np.float32) / np.sqrt(dim),
+         np.zeros(hidden, dtype=np.float32), "relu"),
+        (rng.standard_normal((hidden, num_classes), dtype=np.float32) / np.sqrt(hidden),
+         np.zeros(num_classes, dtype=np.float32), "softmax"),
+    ]
+
+
+def bench(counts, dim, hidden, num_classes, iterations, backbone_params):
+    """
+    Latency and memory as the number of heads grows
+
+    Compares the fused plan with running each head separately (what a
+    separate model per classifier costs in head compute alone).
+    """
+    classes = [f"class_{i}" for i in range(num_classes)]
+    embedding = np.random.default_rng(0).standard_normal((1, dim), dtype=np.float32)
+    print(f"{'heads':>6} {'KiB/head':>9} {'heads MiB':>10} {'separate MiB':>13} "
+          f"{'fused ms':>9} {'per-head ms':>12} {'sequential ms':>14}")
+    for count in counts:
+        model = MultiHeadModel(backbone=object(), max_heads=max(counts))
+        layers = [synthetic_head(dim, hidden, num_classes, seed) for seed in range(count)]
+        # Build the plan directly: load_head() logs every head
+        plan = _Plan.empty(dim)
+        for i, head_layers in enumerate(layers):
+            plan = plan.with_head(Head(f"head_{i}", classes, head_layers), *head_layers[0][:2])
+        model._plan = plan
+        model.predict_embeddings(embedding)  # Warm-up
+
+        started = time.perf_counter()
+        for _ in range(iterations):
+            model.predict_embeddings(embedding)
+        fused_ms = (time.perf_counter() - started) * 1000 / iterations
+
+        started = time.perf_counter()
+        for _ in range(iterations):
+            for head_layers in layers:
+                x = embedding
+                for kernel, bias, activation in head_layers:
+                    x = ACTIVATIONS[activation](x @ kernel + bias)
+        sequential_ms = (time.perf_counter() - started) * 1000 / iterations
+
+        report = model.report()
+        head_bytes = report["heads_memory_bytes"]
+        separate = backbone_params * 4 * count + head_bytes
+        print(f"{count:>6} {head_bytes / count / 1024:>9.0f} {head_bytes / 2**20:>10.1f} "
+              f"{separate / 2**20:>13.1f} {fused_ms:>9.3f} {fused_ms / count:>12.4f} {sequential_ms:>14.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared-backbone multi-head serving")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    bench_parser = subparsers.add_parser("bench", help="Head latency and memory vs head count")
+    bench_parser.add_argument("--counts", default="1,10,50,100,200",
+                              help="Comma-separated head counts")
+    bench_parser.add_argument("--dim", type=int, default=1280, help="Embedding size (EfficientNetB0: 1280)")
+    bench_parser.add_argument("--hidden", type=int, default=256, help="Hidden units per head")
+    bench_parser.add_argument("--classes", type=int, default=10, help="Classes per head")
+    bench_parser.add_argument("--iterations", type=int, default=200)
+    bench_parser.add_argument("--backbone-params", type=int, default=4_049_571,
+                              help="Backbone parameters for the separate-models column (EfficientNetB0)")
+
+    args = parser.parse_args()
+    if args.command == "bench":
+        counts = [int(c) for c in args.counts.split(",")]
+        bench(counts, args.dim, args.hidden, args.classes, args.iterations, args.backbone_params)
+
+
+# Global instance used by the serving routes
+multi_head = MultiHeadModel()
+
+
+if __name__ == "__main__":
+    main()
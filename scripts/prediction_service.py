@@ -0,0 +1,1039 @@
+"""
+Prediction Service
+Request handling shared by the Flask model API routes
+
+Heavy dependencies (NumPy, PIL, OpenCV, TensorFlow) are imported lazily inside
+the handlers, so importing a routing module stays cheap and the server can bind
+its port before any model is loaded.
+"""
+
+import base64
+import hmac
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from io import BytesIO
+from pathlib import Path
+
+from admission import (
+    INTERACTIVE, PRIORITY_CLASSES, admission, deadline_from, check_deadline,
+    QueueFullError, DeadlineExceededError, InvalidDeadlineError,
+)
+from request_profiler import NULL_PROFILER, RequestProfiler, requested_modes
+
+# Models served by the API servers (Flask, the /api/v1 blueprint and ASGI)
+SERVER_MODEL_FILES = {
+    # TEMPORARILY DISABLED: ASL model has batch normalization architecture issue
+    # "asl_alphabet": "final_asl_model-training-optimized.keras",
+    "sign_mnist": "final_sign_mnist_cnn.keras",
+    "hagrid": "HAGRID_best_model.keras",
+}
+
+# Fingerspelling default: served by both servers. It has no "nothing",
+# "space" or "del" classes, so only low-confidence frames act as blanks and
+# words end on a pause (asl_alphabet, when served, has all three)
+FINGERSPELL_MODEL = os.environ.get("FINGERSPELL_MODEL", "sign_mnist")
+
+# Reject oversized uploads before decoding them
+MAX_IMAGE_BYTES = int(os.environ.get("MAX_IMAGE_BYTES", 8 * 1024 * 1024))
+MAX_IMAGE_PIXELS = int(os.environ.get("MAX_IMAGE_PIXELS", 4096 * 4096))
+# WLASL clips: a video file, or all frames of a frame-sequence upload
+MAX_CLIP_BYTES = int(os.environ.get("MAX_CLIP_BYTES", 32 * 1024 * 1024))
+# Custom gestures: samples per enrollment request
+MAX_GESTURE_SAMPLES = int(os.environ.get("MAX_GESTURE_SAMPLES", 64))
+
+
+class RequestError(Exception):
+    """Client error that maps to an HTTP error response"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+    def to_response(self):
+        return {"error": str(self), "success": False}, self.status
+
+
+def is_admin(headers):
+    """Check the admin token header against MODEL_ADMIN_TOKEN (unset disables admin routes)"""
+    expected = os.environ.get("MODEL_ADMIN_TOKEN")
+    provided = headers.get("X-Admin-Token")
+    return bool(expected) and provided is not None and hmac.compare_digest(provided, expected)
+
+
+def result_status(result):
+    """HTTP status for a loader prediction result"""
+    if result.get("success", True):
+        return 200
+    if result.get("loading"):
+        return 503
+    return 400
+
+
+def _check_dimensions(image):
+    """Reject images whose header declares too many pixels (no pixel decode yet)"""
+    width, height = image.size
+    if width * height > MAX_IMAGE_PIXELS:
+        raise RequestError(
+            f"Image too large: {width}x{height} exceeds {MAX_IMAGE_PIXELS} pixels", 413
+        )
+
+
+def decode_base64_image(encoded, profiler=NULL_PROFILER):
+    """Decode a base64 image into an RGB(A) numpy array"""
+    import numpy as np
+    from PIL import Image
+    # base64 inflates by 4/3, so this bounds the decoded size without decoding
+    if len(encoded) * 3 // 4 > MAX_IMAGE_BYTES:
+        raise RequestError(f"Image too large: exceeds {MAX_IMAGE_BYTES} bytes", 413)
+    try:
+        with profiler.stage("b64decode"):
+            image_data = base64.b64decode(encoded)
+        # Image.open only parses the header; pixels are decoded by np.array
+        with profiler.stage("image_open"):
+            image = Image.open(BytesIO(image_data))
+    except Exception as e:
+        raise RequestError(f"Invalid image data: {str(e)}")
+    _check_dimensions(image)
+    try:
+        # Keep as RGB - model was trained on RGB images
+        with profiler.stage("pixel_decode"):
+            return np.array(image)
+    except Exception as e:
+        raise RequestError(f"Invalid image data: {str(e)}")
+
+
+def read_image_file(image_path):
+    """Read an image file from disk into an RGB numpy array"""
+    import cv2
+    from PIL import Image
+    if not Path(image_path).exists():
+        raise RequestError(f"Image file not found: {image_path}", 404)
+    try:
+        with Image.open(image_path) as header:
+            _check_dimensions(header)
+    except RequestError:
+        raise
+    except Exception:
+        pass  # Let OpenCV report unreadable files
+    try:
+        image = cv2.imread(image_path)
+        if image is None:
+            raise ValueError("Failed to read image")
+        return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    except Exception as e:
+        raise RequestError(f"Failed to read image: {str(e)}")
+
+
+def _require(data, field):
+    if not data or field not in data:
+        raise RequestError(f"Missing '{field}' in request")
+
+
+def output_options(data):
+    """
+    Parse response-shaping options
+
+    - top_k: only return the k most likely classes
+    - compact: return class indices + float32 probabilities instead of a dict
+    """
+    top_k = data.get('top_k')
+    if top_k is not None:
+        if isinstance(top_k, bool):
+            raise RequestError("'top_k' must be a positive integer")
+        try:
+            top_k = int(top_k)
+        except (TypeError, ValueError):
+            raise RequestError("'top_k' must be a positive integer")
+        if top_k < 1:
+            raise RequestError("'top_k' must be a positive integer")
+    return {"top_k": top_k, "compact": bool(data.get('compact', False))}
+
+
+def request_deadline(data=None, headers=None, received_at=None):
+    """admission.deadline_from, with an invalid budget as a 400"""
+    try:
+        return deadline_from(data, headers, received_at)
+    except InvalidDeadlineError as e:
+        raise RequestError(str(e))
+
+
+def overload_response(error):
+    """Map an admission error to (payload, status)"""
+    if isinstance(error, QueueFullError):
+        return {"error": str(error), "retry_after": error.retry_after, "success": False}, 429
+    return {"error": str(error), "success": False}, 504
+
+
+def resolve_boxes(data, image, profiler=NULL_PROFILER):
+    """
+    Pixel boxes for ROI inference: the request's 'boxes', or detected hands
+
+    Returns:
+        List of (x1, y1, x2, y2) boxes (empty if detection found no hands)
+    """
+    from roi import ROIError, hand_detector, parse_boxes
+    height, width = image.shape[:2]
+    try:
+        if data.get('boxes') is not None:
+            return parse_boxes(data['boxes'], width, height, bool(data.get('normalized')))
+        if not data.get('detect'):
+            raise RequestError("Send 'boxes' or set 'detect': true")
+        with profiler.stage("detect_hands"):
+            return hand_detector.detect(image)
+    except ROIError as e:
+        raise RequestError(str(e))
+
+
+def ensemble_options(data):
+    """
+    Parse ensemble-mode options for /compare (None when ensemble mode is off)
+
+    - weights: per-model fusion weights (default 1.0)
+    - exit_threshold: fused confidence that skips the remaining models
+    """
+    if not data.get('ensemble'):
+        return None
+    weights = data.get('weights') or {}
+    if not isinstance(weights, dict):
+        raise RequestError("'weights' must map model names to numbers")
+    try:
+        weights = {name: float(weight) for name, weight in weights.items()}
+    except (TypeError, ValueError):
+        raise RequestError("'weights' must map model names to numbers")
+    if any(weight < 0 for weight in weights.values()):
+        raise RequestError("'weights' must be non-negative")
+    exit_threshold = data.get('exit_threshold')
+    if exit_threshold is not None:
+        try:
+            exit_threshold = float(exit_threshold)
+        except (TypeError, ValueError):
+            raise RequestError("'exit_threshold' must be in (0, 1]")
+        if not 0 < exit_threshold <= 1:
+            raise RequestError("'exit_threshold' must be in (0, 1]")
+    return {"weights": weights, "exit_threshold": exit_threshold}
+
+
+def route_priority(source='image', multi=False):
+    """Default priority class: file-path jobs and /compare are bulk work"""
+    if source == 'path':
+        default = "file"
+    elif multi:
+        default = "compare"
+    else:
+        return INTERACTIVE
+    # Fall back to the last configured bulk class if ADMISSION_CLASS_WEIGHTS renamed it
+    return default if default in PRIORITY_CLASSES else PRIORITY_CLASSES[-1]
+
+
+def request_priority(data, headers, default):
+    """
+    Priority class for a request: the route's default unless the client asks
+
+    Clients may move a request into any bulk class ('priority' in the JSON
+    body or the X-Priority header); only admins may promote bulk work to
+    interactive.
+    """
+    requested = (data or {}).get('priority') or (headers.get("X-Priority") if headers is not None else None)
+    if not requested:
+        return default
+    if requested not in PRIORITY_CLASSES:
+        raise RequestError(f"Unknown priority '{requested}' (expected one of {', '.join(PRIORITY_CLASSES)})")
+    if requested == INTERACTIVE and default != INTERACTIVE and not is_admin(headers or {}):
+        raise RequestError("Admin token required to promote a request to interactive", 403)
+    return requested
+
+
+def _reject_unknown_models(loader, model_names):
+    """
+    404 response for model names the loader isn't configured with, else None
+
+    Checked before admission: every name reaching admission.slot gets its own
+    controller and metrics entry for the life of the process.
+    """
+    unknown = [name for name in model_names if name not in loader.model_files]
+    if not unknown:
+        return None
+    return {
+        "error": f"Model '{unknown[0]}' not found",
+        "available_models": list(loader.model_files),
+        "success": False
+    }, 404
+
+
+@contextmanager
+def _admitted(model_name, deadline, profiler=NULL_PROFILER, priority=INTERACTIVE):
+    """Hold the model's admission slot for the block"""
+    enqueued_at = time.perf_counter()
+    with admission.slot(model_name, deadline, priority):
+        profiler.record(f"{model_name}.queue_wait", time.perf_counter() - enqueued_at)
+        yield
+
+
+def _admitted_predict(loader, image, model_name, confidence_threshold, options, deadline,
+                      profiler=NULL_PROFILER, priority=INTERACTIVE):
+    """Run one prediction inside the model's admission slot"""
+    with _admitted(model_name, deadline, profiler, priority):
+        return loader.predict(
+            image, model_name, confidence_threshold, profiler=profiler, **options
+        )
+
+
+def request_profiler(params=None, headers=None):
+    """
+    Profiler for a request: NULL_PROFILER unless an admin asked for profiling
+
+    Raises:
+        RequestError: profiling was requested without the admin token
+    """
+    modes = requested_modes(params, headers)
+    if modes is None:
+        return NULL_PROFILER
+    if not is_admin(headers or {}):
+        raise RequestError("Admin token required for profiling", 403)
+    return RequestProfiler(modes)
+
+
+def attach_profile(payload, profiler):
+    """Add the profile section to a response payload (no-op when profiling is off)"""
+    if profiler.enabled:
+        payload["profile"] = profiler.finish()
+    return payload
+
+
+class ParsedRequest:
+    """A validated, decoded prediction request ready for inference"""
+
+    def __init__(self, image, models, confidence_threshold, options, deadline,
+                 profiler=NULL_PROFILER, ensemble=None, boxes=None, priority=INTERACTIVE):
+        self.image = image
+        self.models = models
+        self.confidence_threshold = confidence_threshold
+        self.options = options
+        self.deadline = deadline
+        self.profiler = profiler
+        self.ensemble = ensemble
+        self.boxes = boxes
+        self.priority = priority
+
+
+def parse_request(data, headers=None, source='image', multi=False, params=None, rois=False,
+                  received_at=None):
+    """
+    Validate and decode a prediction request (the CPU-bound decode phase)
+
+    Args:
+        data: Request JSON
+        headers: Request headers (deadline override, admin token, X-Profile, X-Priority)
+        source: 'image' for base64 data, 'path' for an image file path
+        multi: Read a 'models' list instead of a single 'model'
+        params: Query parameters (`profile` flag)
+        rois: Resolve bounding boxes ('boxes' or hand detection) for ROI inference
+        received_at: Monotonic arrival time (defaults to now); servers that
+            decode on a worker pool pass the time the request arrived so
+            body reads and pool waits count against the deadline
+
+    Returns:
+        ParsedRequest, or (payload, status) for a rejected request
+    """
+    received_at = time.monotonic() if received_at is None else received_at
+    try:
+        profiler = request_profiler(params, headers)
+        _require(data, source)
+        options = output_options(data)
+        ensemble = ensemble_options(data) if multi else None
+        priority = request_priority(data, headers, route_priority(source, multi))
+        deadline = request_deadline(data, headers, received_at)
+        with profiler.capture():
+            if source == 'path':
+                with profiler.stage("read_file"):
+                    image = read_image_file(data['path'])
+            else:
+                image = decode_base64_image(data['image'], profiler)
+            boxes = resolve_boxes(data, image, profiler) if rois else None
+        check_deadline(deadline)
+    except RequestError as e:
+        return e.to_response()
+    except DeadlineExceededError as e:
+        return overload_response(e)
+
+    if multi:
+        models = data.get('models', ['asl_alphabet', 'sign_mnist'])
+    else:
+        models = [data.get('model', 'asl_alphabet')]
+    confidence_threshold = float(data.get('confidence_threshold', 0.5))
+    return ParsedRequest(
+        image, models, confidence_threshold, options, deadline, profiler, ensemble, boxes, priority
+    )
+
+
+def run_predict(loader, parsed):
+    """
+    Single-model inference phase
+
+    Returns:
+        (payload, status)
+    """
+    rejected = _reject_unknown_models(loader, parsed.models)
+    if rejected:
+        return rejected
+    try:
+        with parsed.profiler.capture(trace=True):
+            result = _admitted_predict(
+                loader, parsed.image, parsed.models[0], parsed.confidence_threshold,
+                parsed.options, parsed.deadline, parsed.profiler, parsed.priority
+            )
+    except (QueueFullError, DeadlineExceededError) as e:
+        return overload_response(e)
+    return attach_profile(result, parsed.profiler), result_status(result)
+
+
+def run_compare(loader, parsed):
+    """
+    Multi-model inference phase
+
+    Returns:
+        (payload, status)
+    """
+    rejected = _reject_unknown_models(loader, parsed.models)
+    if rejected:
+        return rejected
+    if parsed.ensemble is not None:
+        return run_ensemble(loader, parsed)
+
+    results = {}
+    # Conversion/resizes shared between the models are computed once
+    frame = loader.plan_inputs(parsed.image, parsed.models)
+    try:
+        with parsed.profiler.capture(trace=True):
+            for model_name in parsed.models:
+                results[model_name] = _admitted_predict(
+                    loader, frame, model_name, parsed.confidence_threshold,
+                    parsed.options, parsed.deadline, parsed.profiler, parsed.priority
+                )
+    except (QueueFullError, DeadlineExceededError) as e:
+        return overload_response(e)
+
+    return attach_profile({
+        "status": "success",
+        "timestamp": datetime.now().isoformat(),
+        "predictions": results,
+        "compared_models": list(results.keys())
+    }, parsed.profiler), 200
+
+
+def run_ensemble(loader, parsed):
+    """
+    Early-exit ensemble over the requested models (cheapest first)
+
+    Returns:
+        (payload, status)
+    """
+    from ensemble import ensemble
+
+    profiler = parsed.profiler
+    frame = loader.plan_inputs(parsed.image, parsed.models)
+
+    def run_model(model_name):
+        with _admitted(model_name, parsed.deadline, profiler, parsed.priority):
+            return loader.predict_proba(frame, model_name, profiler=profiler)
+
+    costs = {
+        name: config["params"] for name, config in loader.model_configs.items()
+    }
+    try:
+        with profiler.capture(trace=True):
+            outcome = ensemble.run(
+                parsed.models, costs, run_model,
+                parsed.ensemble["weights"], parsed.ensemble["exit_threshold"]
+            )
+    except (QueueFullError, DeadlineExceededError) as e:
+        return overload_response(e)
+    except ValueError as e:
+        return RequestError(str(e)).to_response()
+
+    predictions = {}
+    for model_name, result in outcome["results"].items():
+        if result.get("success"):
+            config = {"name": model_name, "classes": result["classes"]}
+            predictions[model_name] = loader.format_prediction(
+                result["probabilities"], config, parsed.confidence_threshold, **parsed.options
+            )
+            predictions[model_name]["version"] = result["version"]
+        else:
+            predictions[model_name] = result
+
+    if outcome["probabilities"] is None:
+        status = 503 if any(r.get("loading") for r in predictions.values()) else 400
+        return attach_profile({
+            "error": "No ensemble model could serve the request",
+            "predictions": predictions,
+            "success": False
+        }, profiler), status
+
+    fused = loader.format_prediction(
+        outcome["probabilities"], {"name": "ensemble", "classes": outcome["labels"]},
+        parsed.confidence_threshold, **parsed.options
+    )
+    fused.update({
+        "models_run": outcome["models_run"],
+        "models_skipped": outcome["models_skipped"],
+        "early_exit": outcome["early_exit"],
+    })
+    return attach_profile({
+        "status": "success",
+        "timestamp": datetime.now().isoformat(),
+        "ensemble": fused,
+        "predictions": predictions,
+        "compared_models": outcome["models_run"]
+    }, profiler), 200
+
+
+def run_rois(loader, parsed):
+    """
+    Classify every ROI of one frame in a single batched forward pass
+
+    Returns:
+        (payload, status)
+    """
+    from roi import crop, to_xywh
+
+    model_name = parsed.models[0]
+    rejected = _reject_unknown_models(loader, [model_name])
+    if rejected:
+        return rejected
+    if not parsed.boxes:
+        return attach_profile({
+            "model": model_name,
+            "rois": [],
+            "count": 0,
+            "success": True
+        }, parsed.profiler), 200
+
+    crops = crop(parsed.image, parsed.boxes)
+    try:
+        with parsed.profiler.capture(trace=True):
+            with _admitted(model_name, parsed.deadline, parsed.profiler, parsed.priority):
+                result = loader.predict_batch(
+                    crops, model_name, parsed.confidence_threshold,
+                    profiler=parsed.profiler, **parsed.options
+                )
+    except (QueueFullError, DeadlineExceededError) as e:
+        return overload_response(e)
+    if not result.get("success"):
+        return attach_profile(result, parsed.profiler), result_status(result)
+
+    rois = [
+        {"box": to_xywh(box), **prediction}
+        for box, prediction in zip(parsed.boxes, result["predictions"])
+    ]
+    return attach_profile({
+        "model": model_name,
+        "version": result["version"],
+        "rois": rois,
+        "count": len(rois),
+        "success": True
+    }, parsed.profiler), 200
+
+
+def parse_clip_request(data, headers=None, params=None, received_at=None):
+    """
+    Validate and decode a WLASL clip request into sampled frames + skeletons
+
+    The clip is either a base64 video file ('video') or a list of base64
+    frames in temporal order ('frames').
+
+    Returns:
+        ParsedRequest whose image is a wlasl_service.Clip, or (payload, status)
+    """
+    received_at = time.monotonic() if received_at is None else received_at
+    try:
+        profiler = request_profiler(params, headers)
+        if not data or ('video' not in data and 'frames' not in data):
+            raise RequestError("Missing 'video' or 'frames' in request")
+        options = output_options(data)
+        deadline = request_deadline(data, headers, received_at)
+        from wlasl_service import ClipError, clip_from_frames, clip_from_video, decode_video_field
+        with profiler.capture():
+            try:
+                if 'video' in data:
+                    with profiler.stage("b64decode"):
+                        video = decode_video_field(data['video'])
+                    with profiler.stage("sample_video"):
+                        clip = clip_from_video(video)
+                else:
+                    with profiler.stage("sample_frames"):
+                        clip = clip_from_frames(data['frames'], decode_base64_image)
+            except ClipError as e:
+                raise RequestError(str(e), e.status)
+        check_deadline(deadline)
+    except RequestError as e:
+        return e.to_response()
+    except DeadlineExceededError as e:
+        return overload_response(e)
+    return ParsedRequest(clip, ['wlasl'], 0.0, options, deadline, profiler)
+
+
+def run_clip(parsed):
+    """
+    Clip inference phase: batched with concurrent clip requests
+
+    Returns:
+        (payload, status)
+    """
+    from wlasl_service import recognizer
+
+    if not recognizer.ensure_loaded():
+        return {"error": recognizer.error, "model": "wlasl", "success": False}, 503
+    top_k = parsed.options["top_k"] or 5
+    try:
+        with parsed.profiler.capture(trace=True):
+            with parsed.profiler.stage("batched_forward"):
+                result = recognizer.recognize(parsed.image, top_k, parsed.deadline)
+    except (QueueFullError, DeadlineExceededError) as e:
+        return overload_response(e)
+    return attach_profile(result, parsed.profiler), 200
+
+
+def recognize_clip(data, headers=None, params=None):
+    """
+    Handle a WLASL word recognition request for a short clip
+
+    Returns:
+        (payload, status)
+    """
+    parsed = parse_clip_request(data, headers, params)
+    if not isinstance(parsed, ParsedRequest):
+        return parsed
+    return run_clip(parsed)
+
+
+def run_fingerspell(loader, parsed, session_id, reset=False, flush=False):
+    """
+    Feed one frame into the session's fingerspelling decoder
+
+    Returns:
+        (payload, status); the payload lists only committed events
+    """
+    from fingerspelling_decoder import sessions
+
+    model_name = parsed.models[0]
+    rejected = _reject_unknown_models(loader, [model_name])
+    if rejected:
+        return rejected
+    try:
+        with parsed.profiler.capture(trace=True):
+            with _admitted(model_name, parsed.deadline, parsed.profiler, parsed.priority):
+                result = loader.predict_proba(parsed.image, model_name, profiler=parsed.profiler)
+    except (QueueFullError, DeadlineExceededError) as e:
+        return overload_response(e)
+    if not result.get("success"):
+        return attach_profile(result, parsed.profiler), result_status(result)
+
+    decoder = sessions.get(session_id, model_name, result["classes"])
+    if reset:
+        decoder.reset()
+    with parsed.profiler.stage("decode"):
+        events = decoder.push(result["probabilities"])
+        if flush:
+            events += decoder.flush()
+    payload = {"session_id": session_id, "events": events, "success": True}
+    if events:
+        payload.update(decoder.state())
+    return attach_profile(payload, parsed.profiler), 200
+
+
+def fingerspell_session(data, headers=None):
+    """
+    Session ID of a fingerspelling request (X-Session-Id or 'session_id'), or None
+
+    The header wins, in the same order session_router.py routes by.
+    """
+    session_id = headers.get("X-Session-Id") if headers is not None else None
+    if not session_id:
+        session_id = (data or {}).get('session_id')
+    return str(session_id) if session_id else None
+
+
+def parse_fingerspell_request(data, headers=None, params=None, received_at=None):
+    """
+    Validate and decode one fingerspelling frame
+
+    Returns:
+        (ParsedRequest, session_id), or (payload, status) for a rejected request
+    """
+    session_id = fingerspell_session(data, headers)
+    if session_id is None:
+        return RequestError("Missing 'session_id' (or X-Session-Id header)").to_response()
+    if isinstance(data, dict) and not data.get('model'):
+        data = dict(data, model=FINGERSPELL_MODEL)
+    parsed = parse_request(data, headers, params=params, received_at=received_at)
+    if not isinstance(parsed, ParsedRequest):
+        return parsed
+    return parsed, session_id
+
+
+def fingerspell(loader, data, headers=None, params=None):
+    """
+    Handle one frame of a fingerspelling stream
+
+    Returns:
+        (payload, status)
+    """
+    parsed = parse_fingerspell_request(data, headers, params)
+    if not isinstance(parsed[0], ParsedRequest):
+        return parsed
+    parsed, session_id = parsed
+    return run_fingerspell(loader, parsed, session_id, bool(data.get('reset')), bool(data.get('flush')))
+
+
+def gesture_user(data, headers=None, params=None):
+    """User whose custom gestures to use ('user_id', ?user_id= or X-User-Id), or None"""
+    user_id = (data or {}).get('user_id') or (params or {}).get('user_id')
+    if not user_id and headers is not None:
+        user_id = headers.get("X-User-Id")
+    return str(user_id) if user_id else None
+
+
+def parse_gesture_request(data, headers=None, params=None, received_at=None):
+    """
+    Validate and decode a custom-gesture classification frame
+
+    Returns:
+        (ParsedRequest, user_id), or (payload, status) for a rejected request
+    """
+    user_id = gesture_user(data, headers, params)
+    if user_id is None:
+        return RequestError("Missing 'user_id' (or X-User-Id header)").to_response()
+    parsed = parse_request(data, headers, params=params, received_at=received_at)
+    if not isinstance(parsed, ParsedRequest):
+        return parsed
+    return parsed, user_id
+
+
+def _embed(images, deadline, profiler=NULL_PROFILER, priority=INTERACTIVE, embed=None):
+    """Backbone embeddings of decoded frames, inside the backbone's admission slot"""
+    if embed is None:
+        from gesture_index import embedder
+        embed = embedder.embed
+    with _admitted("gesture_backbone", deadline, profiler, priority):
+        with profiler.stage("embed"):
+            return embed(images)
+
+
+def _backbone_unavailable(error):
+    """503 for an embedding backbone that isn't loaded (the request itself was fine)"""
+    return {"error": f"Embedding backbone unavailable: {str(error)[:100]}", "success": False}, 503
+
+
+def _gesture_k(k):
+    from gesture_index import DEFAULT_K
+    if k is None:
+        return DEFAULT_K
+    if isinstance(k, bool) or not isinstance(k, int) or k < 1:
+        raise RequestError("'k' must be a positive integer")
+    return k
+
+
+def run_gesture_classify(parsed, user_id, k=None):
+    """
+    Classify one frame against the user's custom gestures
+
+    Returns:
+        (payload, status)
+    """
+    from gesture_index import BackboneUnavailableError, GestureIndexError, user_indexes
+
+    try:
+        k = _gesture_k(k)
+        if not user_indexes.exists(user_id):
+            # Nothing to match against: skip the backbone, cache nothing
+            return attach_profile({
+                "user_id": user_id, "samples": 0, "prediction": None, "confidence": 0.0,
+                "similarity": 0.0, "neighbors": [], "success": True
+            }, parsed.profiler), 200
+        with parsed.profiler.capture(trace=True):
+            embedding = _embed([parsed.image], parsed.deadline, parsed.profiler, parsed.priority)[0]
+            index = user_indexes.get(user_id, len(embedding), create=True)
+            with parsed.profiler.stage("search"):
+                result = index.classify(embedding, k)
+    except RequestError as e:
+        return e.to_response()
+    except (QueueFullError, DeadlineExceededError) as e:
+        return overload_response(e)
+    except GestureIndexError as e:
+        return RequestError(str(e)).to_response()
+    except BackboneUnavailableError as e:
+        return _backbone_unavailable(e)
+    return attach_profile({
+        "user_id": user_id,
+        "samples": index.count,
+        **result,
+        "success": True
+    }, parsed.profiler), 200
+
+
+def classify_gesture(data, headers=None, params=None):
+    """
+    Handle a custom-gesture classification for a base64 image
+
+    Returns:
+        (payload, status)
+    """
+    parsed = parse_gesture_request(data, headers, params)
+    if not isinstance(parsed[0], ParsedRequest):
+        return parsed
+    parsed, user_id = parsed
+    return run_gesture_classify(parsed, user_id, data.get('k'))
+
+
+def manage_gestures(method, data=None, headers=None, params=None):
+    """
+    List (GET), add samples to (POST) or remove (DELETE) a user's custom gestures
+
+    Returns:
+        (payload, status)
+    """
+    from gesture_index import BackboneUnavailableError, GestureIndexError, embedder, user_indexes
+
+    data = data or {}
+    user_id = gesture_user(data, headers, params)
+    try:
+        if user_id is None:
+            raise RequestError("Missing 'user_id' (or X-User-Id header)")
+        if method == "GET":
+            index = user_indexes.get(user_id, embedder.dim) if user_indexes.exists(user_id) else None
+            gestures = index.gestures() if index is not None else {}
+            return {"user_id": user_id, "gestures": gestures, "success": True}, 200
+
+        label = data.get('label')
+        if not isinstance(label, str) or not 0 < len(label) <= 64:
+            raise RequestError("'label' must be a non-empty string of at most 64 characters")
+        if method == "DELETE":
+            removed = 0
+            gestures = {}
+            if user_indexes.exists(user_id):
+                index, removed = user_indexes.remove(user_id, label, embedder.dim)
+                gestures = index.gestures() if index is not None else {}
+            return {"user_id": user_id, "removed": removed, "gestures": gestures,
+                    "success": bool(removed)}, 200 if removed else 404
+
+        encoded = data.get('images') or ([data['image']] if data.get('image') else [])
+        if not encoded or not isinstance(encoded, list) or not all(isinstance(item, str) for item in encoded):
+            raise RequestError("Send 'image' or a list of 'images' (base64 strings) for the gesture")
+        if len(encoded) > MAX_GESTURE_SAMPLES:
+            raise RequestError(f"At most {MAX_GESTURE_SAMPLES} samples per request", 413)
+        # Enrollment is bulk work: it must not delay live frames
+        priority = request_priority(data, headers, route_priority(multi=True))
+        deadline = request_deadline(data, headers)
+        images = [decode_base64_image(item) for item in encoded]
+        vectors = _embed(images, deadline, priority=priority)
+        index = user_indexes.add(user_id, label, vectors, vectors.shape[1])
+        return {"user_id": user_id, "added": len(images), "gestures": index.gestures(),
+                "success": True}, 201
+    except RequestError as e:
+        return e.to_response()
+    except GestureIndexError as e:
+        return RequestError(str(e)).to_response()
+    except (QueueFullError, DeadlineExceededError) as e:
+        return overload_response(e)
+    except BackboneUnavailableError as e:
+        return _backbone_unavailable(e)
+
+
+def run_heads(loader, parsed, heads=None):
+    """
+    One backbone pass for the frame, then every requested multi-head classifier
+
+    Returns:
+        (payload, status)
+    """
+    from gesture_index import BackboneUnavailableError
+    from multi_head import HeadError, multi_head
+
+    try:
+        multi_head.check_heads(heads)
+        with parsed.profiler.capture(trace=True):
+            embeddings = _embed([parsed.image], parsed.deadline, parsed.profiler,
+                                parsed.priority, embed=multi_head.embed)
+            with parsed.profiler.stage("heads"):
+                outputs, registered = multi_head.predict_embeddings(embeddings, heads)
+            with parsed.profiler.stage("format"):
+                predictions = {
+                    name: loader.format_prediction(
+                        probs[0], {"name": name, "classes": registered[name].classes},
+                        parsed.confidence_threshold, **parsed.options
+                    )
+                    for name, probs in outputs.items()
+                }
+    except (QueueFullError, DeadlineExceededError) as e:
+        return overload_response(e)
+    except HeadError as e:
+        return RequestError(str(e)).to_response()
+    except BackboneUnavailableError as e:
+        return _backbone_unavailable(e)
+    return attach_profile({"predictions": predictions, "success": True}, parsed.profiler), 200
+
+
+def parse_heads_request(data, headers=None, params=None, received_at=None):
+    """
+    Validate and decode a multi-head frame ('heads' selects a subset)
+
+    Returns:
+        (ParsedRequest, heads), or (payload, status) for a rejected request
+    """
+    heads = (data or {}).get('heads')
+    if heads is not None and (not isinstance(heads, list) or not all(isinstance(h, str) for h in heads)):
+        return RequestError("'heads' must be a list of head names").to_response()
+    parsed = parse_request(data, headers, params=params, received_at=received_at)
+    if not isinstance(parsed, ParsedRequest):
+        return parsed
+    return parsed, heads
+
+
+def predict_heads(loader, data, headers=None, params=None):
+    """
+    Handle a multi-head prediction for a base64 image
+
+    Returns:
+        (payload, status)
+    """
+    parsed = parse_heads_request(data, headers, params)
+    if not isinstance(parsed[0], ParsedRequest):
+        return parsed
+    parsed, heads = parsed
+    return run_heads(loader, parsed, heads)
+
+
+def manage_heads(method, data=None, headers=None):
+    """
+    Report (GET), load (POST) or unload (DELETE) multi-head classifiers
+
+    Loading and unloading are admin operations; heads are read from
+    MULTI_HEAD_DIR by name.
+
+    Returns:
+        (payload, status)
+    """
+    from gesture_index import BackboneUnavailableError
+    from multi_head import HeadError, multi_head
+
+    if method == "GET":
+        return {"timestamp": datetime.now().isoformat(), **multi_head.report(), "success": True}, 200
+    if not is_admin(headers or {}):
+        return {"error": "Admin token required", "success": False}, 403
+
+    name = (data or {}).get('name')
+    if not isinstance(name, str) or not name:
+        return RequestError("Missing 'name'").to_response()
+    if method == "DELETE":
+        if not multi_head.unload_head(name):
+            return {"error": f"Head '{name}' is not loaded", "success": False}, 404
+        return {"unloaded": name, "heads": multi_head.head_names(), "success": True}, 200
+    try:
+        head = multi_head.load_head(name)
+    except HeadError as e:
+        return RequestError(str(e)).to_response()
+    except BackboneUnavailableError as e:
+        return _backbone_unavailable(e)
+    return {"loaded": name, "head": head, "heads": multi_head.head_names(), "success": True}, 201
+
+
+def predict_image(loader, data, headers=None, params=None):
+    """
+    Handle a single-model prediction for a base64 image
+
+    Returns:
+        (payload, status)
+    """
+    parsed = parse_request(data, headers, params=params)
+    if not isinstance(parsed, ParsedRequest):
+        return parsed
+    return run_predict(loader, parsed)
+
+
+def predict_image_path(loader, data, headers=None, params=None):
+    """
+    Handle a single-model prediction for an image file path
+
+    Returns:
+        (payload, status)
+    """
+    parsed = parse_request(data, headers, source='path', params=params)
+    if not isinstance(parsed, ParsedRequest):
+        return parsed
+    return run_predict(loader, parsed)
+
+
+def predict_rois(loader, data, headers=None, params=None):
+    """
+    Handle a multi-ROI prediction for one base64 frame
+
+    Returns:
+        (payload, status)
+    """
+    parsed = parse_request(data, headers, params=params, rois=True)
+    if not isinstance(parsed, ParsedRequest):
+        return parsed
+    return run_rois(loader, parsed)
+
+
+def compare_image(loader, data, headers=None, params=None):
+    """
+    Handle a multi-model comparison for a base64 image
+
+    Returns:
+        (payload, status)
+    """
+    parsed = parse_request(data, headers, multi=True, params=params)
+    if not isinstance(parsed, ParsedRequest):
+        return parsed
+    return run_compare(loader, parsed)
+
+
+def liveness(loader):
+    """Process is up; includes per-model load state"""
+    return {
+        "status": "healthy",
+        "service": "ASL Model API",
+        "timestamp": datetime.now().isoformat(),
+        "ready": loader.is_ready(),
+        "models": loader.get_load_status(),
+    }, 200
+
+
+def readiness(loader):
+    """Ready once model loading has finished and at least one model serves"""
+    ready = loader.is_ready()
+    return {
+        "status": "ready" if ready else "not_ready",
+        "timestamp": datetime.now().isoformat(),
+        "loaded_models": list(loader.models.keys()),
+        "models": loader.get_load_status(),
+    }, 200 if ready else 503
+
+
+def reload_models(loader, data, headers):
+    """
+    Admin: hot-reload one or all models in the background
+
+    Returns:
+        (payload, status)
+    """
+    if not is_admin(headers):
+        return {"error": "Admin token required", "success": False}, 403
+
+    data = data or {}
+    model_name = data.get('model')
+    if model_name is not None and model_name not in loader.model_files:
+        return {"error": f"Unknown model '{model_name}'", "success": False}, 404
+
+    loader.reload_in_background([model_name] if model_name else None, bool(data.get('force')))
+    return {
+        "status": "reloading",
+        "timestamp": datetime.now().isoformat(),
+        "models": [model_name] if model_name else list(loader.model_files),
+        "versions": loader.get_model_versions(),
+        "success": True
+    }, 202
@@ -0,0 +1,175 @@
+"""
+Preprocessing Planner
+Computes each model's input from one frame with shared intermediate steps
+
+The models take different inputs (asl_alphabet/hagrid 160x160x3, sign_mnist
+28x28x1, or 28x28 RGB as a uint8 serving model). Instead of every model
+converting and resizing the full-resolution frame on its own, a plan is
+built per (frame shape, model set):
+
+    source -> rgb -> resize 160x160 -> uint8 / float     (asl_alphabet, hagrid)
+                          `-> resize 28x28 -> uint8 / gray -> float  (sign_mnist)
+
+Steps are shared between models (same-size targets reuse everything, smaller
+targets are resized from the smallest larger intermediate) and resizing
+happens on uint8 pixels, so the expensive full-frame work runs once. uint8
+serving models get the resized pixels, so their graph only casts and scales;
+float models get them divided by 255. Plans are cached in a small LRU;
+execution is lazy, so an early-exit ensemble never computes inputs for
+models it skips.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+PLAN_CACHE_SIZE = 64
+
+
+def target_spec(config):
+    """What a model needs from the host: (uint8_input, (H, W, C))"""
+    return bool(config.get("uint8_input")), tuple(config["input_shape"][1:])
+
+
+class PreprocessPlan:
+    """
+    DAG of preprocessing steps for one frame shape and set of targets
+
+    Attributes:
+        steps: dict of step key -> (op, parent key, argument), in build order
+        outputs: dict of target spec -> step key holding that target's input
+    """
+
+    def __init__(self, source_shape, specs):
+        self.source_shape = tuple(source_shape)
+        self.steps = OrderedDict()
+        self.outputs = {}
+
+        specs = sorted(specs, key=lambda spec: spec[1][0] * spec[1][1], reverse=True)
+        if not specs:
+            return
+
+        rgb = self._rgb_step()
+        # (height, width, key) of resized intermediates, for reuse by smaller targets
+        sizes = [(self.source_shape[0], self.source_shape[1], rgb)]
+        for uint8, shape in specs:
+            height, width = shape[0], shape[1]
+            resized = next((key for h, w, key in sizes if (h, w) == (height, width)), None)
+            if resized is None:
+                parent = min(
+                    (entry for entry in sizes if entry[0] >= height and entry[1] >= width),
+                    key=lambda entry: entry[0] * entry[1], default=sizes[0]
+                )[2]
+                resized = self._add(f"resize:{height}x{width}", "resize", parent, (height, width))
+                sizes.append((height, width, resized))
+
+            channels = shape[2] if len(shape) == 3 else 3
+            pixels = resized
+            if channels == 1:
+                pixels = self._add(f"gray:{height}x{width}", "to_gray", resized)
+            if uint8:
+                self.outputs[(True, shape)] = self._add(f"uint8:{pixels}", "raw", pixels)
+            else:
+                self.outputs[(False, shape)] = self._add(f"float:{pixels}", "to_float", pixels)
+
+    def _rgb_step(self):
+        if len(self.source_shape) == 2 or self.source_shape[2] == 1:
+            return self._add("rgb", "gray2rgb", "source")
+        if self.source_shape[2] == 4:
+            return self._add("rgb", "rgba2rgb", "source")
+        return "source"
+
+    def _add(self, key, op, parent, arg=None):
+        self.steps.setdefault(key, (op, parent, arg))
+        return key
+
+    def describe(self):
+        """Human-readable step list (for logs and debugging)"""
+        return [f"{key} = {op}({parent})" for key, (op, parent, _) in self.steps.items()]
+
+
+def run_step(op, image, arg):
+    """Execute one plan step"""
+    import cv2
+    if op == "raw":
+        if image.ndim == 2:
+            image = image[..., None]
+        if image.dtype != np.uint8:
+            image = np.clip(image, 0, 255).astype(np.uint8)
+        return image
+    if op == "gray2rgb":
+        return cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
+    if op == "rgba2rgb":
+        return cv2.cvtColor(image, cv2.COLOR_RGBA2RGB)
+    if op == "resize":
+        height, width = arg
+        return cv2.resize(image, (width, height))
+    if op == "to_gray":
+        return cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)[..., None]
+    if op == "to_float":
+        return image.astype("float32") / 255.0
+    raise ValueError(f"Unknown preprocessing step '{op}'")
+
+
+class PlannedFrame:
+    """One frame plus a plan; computes (and memoizes) step outputs on demand"""
+
+    def __init__(self, image, plan, planner):
+        self.image = image
+        self.plan = plan
+        self._planner = planner
+        self._values = {"source": image}
+
+    @property
+    def shape(self):
+        return self.image.shape
+
+    def input_for(self, config):
+        """Preprocessed input for a model config"""
+        key = self.plan.outputs.get(target_spec(config))
+        if key is None:
+            # Config changed (e.g. hot reload) since the plan was built
+            return self._planner.frame(self.image, [config]).input_for(config)
+        return self._compute(key)
+
+    def _compute(self, key):
+        value = self._values.get(key)
+        if value is None:
+            op, parent, arg = self.plan.steps[key]
+            value = run_step(op, self._compute(parent), arg)
+            self._values[key] = value
+        return value
+
+
+class PreprocessPlanner:
+    """LRU cache of plans keyed by (frame shape, target specs)"""
+
+    def __init__(self, max_plans=PLAN_CACHE_SIZE):
+        self.max_plans = max_plans
+        self._plans = OrderedDict()
+        self._lock = threading.Lock()
+
+    def plan_for(self, source_shape, specs):
+        specs = tuple(sorted(set(specs)))
+        key = (tuple(source_shape), specs)
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is not None:
+                self._plans.move_to_end(key)
+                return plan
+        plan = PreprocessPlan(source_shape, specs)
+        with self._lock:
+            self._plans[key] = plan
+            while len(self._plans) > self.max_plans:
+                self._plans.popitem(last=False)
+        return plan
+
+    def frame(self, image, configs):
+        """PlannedFrame for an image and the configs of the models that will use it"""
+        plan = self.plan_for(image.shape, [target_spec(config) for config in configs])
+        return PlannedFrame(image, plan, self)
+
+
+# Global planner
+planner = PreprocessPlanner()
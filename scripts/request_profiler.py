@@ -0,0 +1,166 @@
+"""
+Request Profiler
+Opt-in per-request stage timings, cProfile dumps and TensorFlow traces
+
+Admins enable profiling per request with `?profile=1` or an `X-Profile: 1`
+header; the response then carries a `profile` section with a stage-timing
+breakdown. Extra capture modes can be listed instead of `1`:
+
+- cprofile: write a cProfile dump of the request to REQUEST_PROFILE_DIR
+- trace:    write a TensorFlow profiler trace of the inference phase
+
+e.g. `?profile=cprofile,trace`. Requests without the flag get NULL_PROFILER,
+whose hooks are no-ops, so normal traffic pays nothing for this.
+"""
+
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from pathlib import Path
+
+PROFILE_DIR = Path(os.environ.get("REQUEST_PROFILE_DIR", "request_profiles"))
+
+CAPTURE_MODES = ("cprofile", "trace")
+
+# The TensorFlow profiler is process-global: only one trace at a time
+_trace_lock = threading.Lock()
+
+_NO_STAGE = nullcontext()
+
+
+class NullProfiler:
+    """Profiler used when profiling is off; every hook is a no-op"""
+
+    enabled = False
+
+    def stage(self, name):
+        return _NO_STAGE
+
+    def record(self, name, seconds):
+        pass
+
+    def capture(self, trace=False):
+        return _NO_STAGE
+
+    def finish(self):
+        return None
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class RequestProfiler:
+    """Collects stage timings (and optional captures) for one request"""
+
+    enabled = True
+
+    def __init__(self, modes=(), output_dir=None):
+        self.request_id = f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}"
+        self.modes = set(modes)
+        self.output_dir = Path(output_dir or PROFILE_DIR)
+        self.stages = {}
+        self.artifacts = {}
+        self.notes = []
+        self._started = time.perf_counter()
+        self._cprofile = None
+        if "cprofile" in self.modes:
+            import cProfile
+            self._cprofile = cProfile.Profile()
+
+    @contextmanager
+    def stage(self, name):
+        """Time a block as one named stage"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def record(self, name, seconds):
+        """Add a duration (seconds) to a stage"""
+        self.stages[name] = self.stages.get(name, 0.0) + seconds * 1000
+
+    @contextmanager
+    def capture(self, trace=False):
+        """
+        Run a request phase under the requested capture modes
+
+        cProfile only sees the thread it is enabled on, so each phase (decode,
+        inference) is wrapped separately; they may run on different threads.
+        """
+        tracing = trace and "trace" in self.modes and self._start_trace()
+        if self._cprofile is not None:
+            self._cprofile.enable()
+        try:
+            yield
+        finally:
+            if self._cprofile is not None:
+                self._cprofile.disable()
+            if tracing:
+                self._stop_trace()
+
+    def _start_trace(self):
+        if not _trace_lock.acquire(blocking=False):
+            self.notes.append("trace skipped: another trace is in progress")
+            return False
+        import tensorflow as tf
+        logdir = self.output_dir / f"{self.request_id}-trace"
+        try:
+            tf.profiler.experimental.start(str(logdir))
+        except Exception as e:
+            _trace_lock.release()
+            self.notes.append(f"trace failed: {str(e)[:100]}")
+            return False
+        self.artifacts["trace"] = str(logdir)
+        return True
+
+    def _stop_trace(self):
+        import tensorflow as tf
+        try:
+            tf.profiler.experimental.stop()
+        finally:
+            _trace_lock.release()
+
+    def finish(self):
+        """
+        Write capture artifacts and build the response section
+
+        Returns:
+            dict with stage timings (ms), total time and artifact paths
+        """
+        if self._cprofile is not None:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            path = self.output_dir / f"{self.request_id}.prof"
+            self._cprofile.dump_stats(str(path))
+            self.artifacts["cprofile"] = str(path)
+        report = {
+            "request_id": self.request_id,
+            "stages_ms": {name: round(ms, 3) for name, ms in self.stages.items()},
+            "total_ms": round((time.perf_counter() - self._started) * 1000, 3),
+        }
+        if self.artifacts:
+            report["artifacts"] = self.artifacts
+        if self.notes:
+            report["notes"] = self.notes
+        return report
+
+
+def requested_modes(params=None, headers=None):
+    """
+    Parse the profile flag from query params or the X-Profile header
+
+    Returns:
+        None when profiling wasn't requested, else the set of capture modes
+    """
+    value = None
+    if params is not None:
+        value = params.get("profile")
+    if not value and headers is not None:
+        value = headers.get("X-Profile")
+    if not value or value.lower() in ("0", "false", "no"):
+        return None
+    modes = {mode.strip().lower() for mode in value.split(",")}
+    return modes & set(CAPTURE_MODES)
@@ -0,0 +1,101 @@
+"""
+Response Encoding
+Content negotiation and fast serialization for prediction responses
+
+Clients pick the wire format with the Accept header (or `?format=`):
+- application/msgpack: MessagePack with float32 probabilities (needs `msgpack`)
+- application/json (default): orjson when installed, stdlib json otherwise
+
+Serialized size and serialization time are recorded per format.
+"""
+
+import json
+import time
+
+from serving_metrics import metrics
+
+try:
+    import orjson
+except ImportError:  # optional
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional
+    msgpack = None
+
+JSON_TYPE = "application/json"
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack")
+
+
+def negotiate(accept=None, requested=None):
+    """
+    Pick the response format
+
+    Args:
+        accept: Accept header value
+        requested: Explicit format override ("json" or "msgpack")
+
+    Returns:
+        "msgpack" or "json"
+    """
+    if requested:
+        wants_msgpack = requested.lower() == "msgpack"
+    else:
+        wants_msgpack = any(t in (accept or "") for t in MSGPACK_TYPES)
+    return "msgpack" if wants_msgpack and msgpack is not None else "json"
+
+
+def _to_builtin(value):
+    """Fallback conversion for NumPy values"""
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+
+def _msgpack_default(value):
+    if hasattr(value, "dtype") and getattr(value, "ndim", 0) == 1 and value.dtype.kind == "f":
+        # Keep probabilities at float32 on the wire
+        return [float(v) for v in value.astype("float32")]
+    return _to_builtin(value)
+
+
+def _encode_json(payload):
+    if orjson is not None:
+        return orjson.dumps(
+            payload, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS, default=_to_builtin
+        )
+    return json.dumps(payload, separators=(",", ":"), default=_to_builtin).encode()
+
+
+def _encode_msgpack(payload):
+    return msgpack.packb(payload, use_single_float=True, default=_msgpack_default)
+
+
+def encode(payload, fmt="json"):
+    """
+    Serialize a response payload
+
+    Returns:
+        (body bytes, content type, serialization ms)
+    """
+    started = time.perf_counter()
+    if fmt == "msgpack":
+        body, content_type = _encode_msgpack(payload), MSGPACK_TYPES[0]
+    else:
+        body, content_type = _encode_json(payload), JSON_TYPE
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    metrics.observe("serialization_ms", elapsed_ms, format=fmt)
+    metrics.observe("response_bytes", len(body), format=fmt)
+    return body, content_type, elapsed_ms
+
+
+def response_headers(body, elapsed_ms):
+    """Per-request encoding stats exposed as response headers"""
+    return {
+        "X-Response-Bytes": str(len(body)),
+        "X-Serialization-Ms": f"{elapsed_ms:.3f}",
+    }
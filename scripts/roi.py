@@ -0,0 +1,144 @@
+"""
+Regions of Interest
+Bounding-box parsing, cropping and optional server-side hand detection
+
+Crops are numpy views into the single decoded frame, so classifying several
+hands (two-handed signs, several people) costs one upload, one decode and
+one batched forward pass instead of one full request per crop.
+
+Hand detection uses MediaPipe Hands when it is installed (the same landmark
+bounding box + padding as notebooks/Saved_models/camera.py).
+"""
+
+import os
+import threading
+
+MAX_ROIS = int(os.environ.get("MAX_ROIS", 16))
+
+# Pixels added around the landmark bounding box of a detected hand
+HAND_PADDING = 20
+
+
+class ROIError(ValueError):
+    """Invalid bounding boxes or detection unavailable"""
+
+
+def parse_boxes(boxes, width, height, normalized=False):
+    """
+    Validate boxes and clip them to the frame
+
+    Args:
+        boxes: List of [x, y, w, h] lists or {"x", "y", "width", "height"} dicts
+        width, height: Frame size in pixels
+        normalized: Coordinates are fractions of the frame size
+
+    Returns:
+        List of (x1, y1, x2, y2) integer pixel boxes
+    """
+    if not isinstance(boxes, list) or not boxes:
+        raise ROIError("'boxes' must be a non-empty list")
+    if len(boxes) > MAX_ROIS:
+        raise ROIError(f"Too many boxes: {len(boxes)} exceeds {MAX_ROIS}")
+
+    parsed = []
+    for i, box in enumerate(boxes):
+        try:
+            if isinstance(box, dict):
+                x, y, w, h = (float(box[k]) for k in ("x", "y", "width", "height"))
+            else:
+                x, y, w, h = (float(v) for v in box)
+        except (KeyError, TypeError, ValueError):
+            raise ROIError(f"Box {i} must be [x, y, width, height]")
+        if normalized:
+            x, w = x * width, w * width
+            y, h = y * height, h * height
+        x1, y1 = max(0, int(round(x))), max(0, int(round(y)))
+        x2, y2 = min(width, int(round(x + w))), min(height, int(round(y + h)))
+        if x2 <= x1 or y2 <= y1:
+            raise ROIError(f"Box {i} is empty after clipping to the {width}x{height} frame")
+        parsed.append((x1, y1, x2, y2))
+    return parsed
+
+
+def crop(image, boxes):
+    """Views of the frame for each (x1, y1, x2, y2) box (no copies)"""
+    return [image[y1:y2, x1:x2] for x1, y1, x2, y2 in boxes]
+
+
+def to_xywh(box):
+    x1, y1, x2, y2 = box
+    return [x1, y1, x2 - x1, y2 - y1]
+
+
+class HandDetector:
+    """MediaPipe Hands wrapper; created on first use"""
+
+    def __init__(self, max_hands=4, min_confidence=0.6):
+        self.max_hands = max_hands
+        self.min_confidence = min_confidence
+        self._hands = None
+        # MediaPipe graphs are not thread-safe
+        self._lock = threading.Lock()
+
+    def _get_hands(self):
+        if self._hands is None:
+            try:
+                import mediapipe as mp
+            except ImportError:
+                raise ROIError("Hand detection requires mediapipe; send 'boxes' instead")
+            self._hands = mp.solutions.hands.Hands(
+                static_image_mode=True,
+                max_num_hands=self.max_hands,
+                min_detection_confidence=self.min_confidence,
+            )
+        return self._hands
+
+    def _process(self, image):
+        import numpy as np
+        if image.ndim == 2:
+            import cv2
+            rgb = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
+        else:
+            rgb = np.ascontiguousarray(image[..., :3])
+        with self._lock:
+            return self._get_hands().process(rgb)
+
+    def detect(self, image):
+        """
+        Find hands in an RGB frame
+
+        Returns:
+            List of (x1, y1, x2, y2) pixel boxes (may be empty)
+        """
+        height, width = image.shape[:2]
+        result = self._process(image)
+
+        boxes = []
+        for hand in result.multi_hand_landmarks or []:
+            xs = [int(p.x * width) for p in hand.landmark]
+            ys = [int(p.y * height) for p in hand.landmark]
+            x1, y1 = max(min(xs) - HAND_PADDING, 0), max(min(ys) - HAND_PADDING, 0)
+            x2, y2 = min(max(xs) + HAND_PADDING, width), min(max(ys) + HAND_PADDING, height)
+            if x2 > x1 and y2 > y1:
+                boxes.append((x1, y1, x2, y2))
+        return boxes[:MAX_ROIS]
+
+    def landmarks(self, image):
+        """
+        Normalized (x, y) coordinates of the first hand's 21 landmarks
+
+        Returns:
+            (42,) float32 array, or None if no hand was found
+        """
+        import numpy as np
+        result = self._process(image)
+        if not result.multi_hand_landmarks:
+            return None
+        coords = []
+        for lm in result.multi_hand_landmarks[0].landmark:
+            coords.extend([lm.x, lm.y])
+        return np.array(coords, dtype=np.float32)
+
+
+# Global detector
+hand_detector = HandDetector()
@@ -0,0 +1,81 @@
+"""
+Serving Metrics
+Lightweight in-process metrics for the model API (exposed at /api/models/metrics)
+"""
+
+import threading
+from collections import deque
+
+# Samples kept per series for percentile estimates
+RESERVOIR_SIZE = 2048
+
+
+class Series:
+    """Count, sum and a sliding window of recent samples"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.samples = deque(maxlen=RESERVOIR_SIZE)
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        self.samples.append(value)
+
+    def snapshot(self):
+        ordered = sorted(self.samples)
+
+        def percentile(q):
+            if not ordered:
+                return 0.0
+            return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": percentile(0.50),
+            "p95": percentile(0.95),
+            "p99": percentile(0.99),
+        }
+
+
+class MetricsRegistry:
+    """Thread-safe registry of named series and counters"""
+
+    def __init__(self):
+        self._series = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels):
+        if not labels:
+            return name
+        return name + "{" + ",".join(f"{k}={v}" for k, v in sorted(labels.items())) + "}"
+
+    def observe(self, name, value, **labels):
+        """Record one sample (e.g. a latency in ms or a size in bytes)"""
+        key = self._key(name, labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = Series()
+            series.observe(value)
+
+    def increment(self, name, amount=1, **labels):
+        """Increment a counter"""
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "series": {key: series.snapshot() for key, series in self._series.items()},
+                "counters": dict(self._counters),
+            }
+
+
+# Global registry
+metrics = MetricsRegistry()
@@ -0,0 +1,509 @@
+#!/usr/bin/env python3
+"""
+Session Router
+Spreads clients across several model-server instances by session ID
+
+Requests are routed with a consistent-hash ring (virtual nodes per backend)
+keyed on the session ID, so a session keeps hitting the same instance and its
+per-session state (e.g. the fingerspelling decoder) and caches stay warm.
+Adding or removing a backend only moves the sessions that hashed to it.
+
+The session ID is taken from, in order: the X-Session-Id header,
+`?session_id=`, or `session_id` in a JSON body (as the fingerspelling
+endpoint accepts it). Requests with none of these are keyed on the client
+address, so clients behind a shared proxy (e.g. the Next.js server) must
+send one of them to be spread out and pinned per session.
+
+Backends are health-checked through /ready:
+- a backend that fails `--fall` checks in a row (or proxied requests that
+  can't reach it) is skipped; its sessions fail over to the next backend
+  on the ring. A request is re-sent to the successor only if it never
+  reached the first backend, or that backend answered 503 while loading
+- it rejoins after `--rise` passing checks
+- draining (POST /router/drain, admin token) stops routing to a backend
+  while its in-flight requests finish
+
+Everything runs on one machine with --spawn, which starts N
+model_api_server.py instances on consecutive ports:
+
+    python scripts/session_router.py --spawn 3 --stub --port 8000
+    python scripts/session_router.py --backends http://10.0.0.5:5000 http://10.0.0.6:5000
+"""
+
+import argparse
+import bisect
+import hashlib
+import hmac
+import http.client
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+DEFAULT_VNODES = 128
+DEFAULT_CHECK_INTERVAL = 2.0
+DEFAULT_RISE = 2
+DEFAULT_FALL = 2
+PROXY_TIMEOUT = float(os.environ.get("ROUTER_PROXY_TIMEOUT", 30))
+
+# Not forwarded in either direction (RFC 7230 section 6.1)
+HOP_BY_HOP = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailers", "transfer-encoding", "upgrade", "host", "content-length",
+}
+
+
+def _hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent-hash ring with virtual nodes"""
+
+    def __init__(self, vnodes=DEFAULT_VNODES):
+        self.vnodes = vnodes
+        self._points = []  # Sorted hashes
+        self._owners = []  # Node at each point
+        self._lock = threading.Lock()
+
+    def add(self, node):
+        with self._lock:
+            for i in range(self.vnodes):
+                point = _hash(f"{node}#{i}")
+                index = bisect.bisect(self._points, point)
+                self._points.insert(index, point)
+                self._owners.insert(index, node)
+
+    def remove(self, node):
+        with self._lock:
+            keep = [(p, o) for p, o in zip(self._points, self._owners) if o != node]
+            self._points = [p for p, _ in keep]
+            self._owners = [o for _, o in keep]
+
+    def candidates(self, key):
+        """Distinct nodes in ring order starting at the key (preferred first)"""
+        with self._lock:
+            points, owners = self._points, self._owners
+        if not points:
+            return []
+        start = bisect.bisect(points, _hash(key)) % len(points)
+        seen = []
+        for i in range(len(points)):
+            owner = owners[(start + i) % len(points)]
+            if owner not in seen:
+                seen.append(owner)
+        return seen
+
+
+class Backend:
+    """Health and traffic state of one model-server instance"""
+
+    def __init__(self, url):
+        self.url = url.rstrip("/")
+        parts = urlsplit(self.url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.healthy = False
+        self.draining = False
+        self.passes = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.routed = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+        self._local = threading.local()
+
+    def available(self):
+        return self.healthy and not self.draining
+
+    def connection(self):
+        """Keep-alive connection for the calling router thread"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=PROXY_TIMEOUT)
+        return conn
+
+    def reset_connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "url": self.url,
+                "healthy": self.healthy,
+                "draining": self.draining,
+                "in_flight": self.in_flight,
+                "routed": self.routed,
+                "errors": self.errors,
+            }
+
+
+class SessionRouter:
+    """Ring plus health checking; picks a backend for each session"""
+
+    def __init__(self, urls, vnodes=DEFAULT_VNODES, check_interval=DEFAULT_CHECK_INTERVAL,
+                 rise=DEFAULT_RISE, fall=DEFAULT_FALL):
+        self.backends = {url.rstrip("/"): Backend(url) for url in urls}
+        self.ring = HashRing(vnodes)
+        for url in self.backends:
+            self.ring.add(url)
+        self.check_interval = check_interval
+        self.rise = rise
+        self.fall = fall
+        self._stop = threading.Event()
+
+    def route(self, session_key):
+        """
+        Backends to try for a session, preferred first
+
+        Only healthy, non-draining backends are returned, in ring order, so
+        a failed backend's sessions spread over the rest of the ring.
+        """
+        return [
+            self.backends[url] for url in self.ring.candidates(session_key)
+            if self.backends[url].available()
+        ]
+
+    def record_result(self, backend, ok, health=True):
+        """
+        Count a proxied request
+
+        A failed one counts as a failed health check unless `health` is
+        False (e.g. a timeout on an overloaded but live backend).
+        """
+        with backend.lock:
+            backend.routed += 1
+            if not ok:
+                backend.errors += 1
+        if not ok and health:
+            self._mark(backend, False)
+
+    def _mark(self, backend, passed):
+        with backend.lock:
+            if passed:
+                backend.failures = 0
+                backend.passes += 1
+                if not backend.healthy and backend.passes >= self.rise:
+                    backend.healthy = True
+                    print(f"[INFO] Backend {backend.url} is healthy")
+            else:
+                backend.passes = 0
+                backend.failures += 1
+                if backend.healthy and backend.failures >= self.fall:
+                    backend.healthy = False
+                    print(f"[WARNING] Backend {backend.url} is unhealthy; failing over its sessions")
+
+    def check(self, backend):
+        """One /ready probe (503 while models load, connection errors when down)"""
+        conn = http.client.HTTPConnection(backend.host, backend.port, timeout=2)
+        try:
+            conn.request("GET", "/ready")
+            passed = conn.getresponse().status == 200
+        except (OSError, http.client.HTTPException):
+            passed = False
+        finally:
+            conn.close()
+        self._mark(backend, passed)
+
+    def _check_loop(self):
+        while not self._stop.is_set():
+            for backend in list(self.backends.values()):
+                self.check(backend)
+            self._stop.wait(self.check_interval)
+
+    def start(self):
+        threading.Thread(target=self._check_loop, name="router-health", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def set_draining(self, url, draining):
+        backend = self.backends.get(url.rstrip("/"))
+        if backend is None:
+            return None
+        with backend.lock:
+            backend.draining = draining
+        print(f"[INFO] Backend {backend.url} {'draining' if draining else 'back in rotation'}")
+        return backend
+
+    def status(self):
+        return {
+            "backends": [backend.snapshot() for backend in self.backends.values()],
+            "available": sum(1 for backend in self.backends.values() if backend.available()),
+            "vnodes": self.ring.vnodes,
+        }
+
+
+class ForwardError(Exception):
+    """Proxying to a backend failed; `sent` tells whether it may have run the request"""
+
+    def __init__(self, error, sent):
+        super().__init__(str(error))
+        self.error = error
+        self.sent = sent
+
+
+def not_ready(response, payload):
+    """A 503 from a backend that isn't serving yet (Retry-After, or the loader's loading marker)"""
+    if response.status != 503:
+        return False
+    if response.getheader("Retry-After"):
+        return True
+    if "json" not in (response.getheader("Content-Type") or ""):
+        return False
+    try:
+        return bool(json.loads(payload).get("loading"))
+    except (ValueError, AttributeError):
+        return False
+
+
+def session_key(handler, body=None):
+    """X-Session-Id header, ?session_id=, a JSON body's session_id, or the client address"""
+    key = handler.headers.get("X-Session-Id")
+    if not key:
+        values = parse_qs(urlsplit(handler.path).query).get("session_id")
+        key = values[0] if values else None
+    # Only parse bodies that can hold the field (most frames are large and don't)
+    if not key and body and b'"session_id"' in body:
+        try:
+            data = json.loads(body)
+        except ValueError:
+            data = None
+        if isinstance(data, dict) and data.get("session_id"):
+            key = str(data["session_id"])
+    return key or handler.client_address[0]
+
+
+class RouterHandler(BaseHTTPRequestHandler):
+    """Proxies API requests; serves the router's own /router/* endpoints"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        pass  # Per-request logging would dominate at camera frame rates
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else None
+
+    def _is_admin(self):
+        expected = os.environ.get("MODEL_ADMIN_TOKEN")
+        provided = self.headers.get("X-Admin-Token")
+        return bool(expected) and provided is not None and hmac.compare_digest(provided, expected)
+
+    def _router_endpoint(self, body):
+        router = self.server.router
+        path = urlsplit(self.path).path
+        if path == "/router/status" and self.command == "GET":
+            return self._send_json(router.status())
+        if path == "/router/health" and self.command == "GET":
+            available = router.status()["available"]
+            return self._send_json({"status": "ok" if available else "no_backends"}, 200 if available else 503)
+        if path in ("/router/drain", "/router/undrain") and self.command == "POST":
+            if not self._is_admin():
+                return self._send_json({"error": "Admin token required", "success": False}, 403)
+            try:
+                url = json.loads(body or b"{}").get("backend", "")
+            except ValueError:
+                url = ""
+            backend = router.set_draining(url, path == "/router/drain")
+            if backend is None:
+                return self._send_json({"error": f"Unknown backend '{url}'", "success": False}, 404)
+            return self._send_json({"backend": backend.snapshot(), "success": True})
+        return self._send_json({"error": "Not found", "success": False}, 404)
+
+    def _proxy(self, body):
+        headers = {k: v for k, v in self.headers.items() if k.lower() not in HOP_BY_HOP}
+        router = self.server.router
+        candidates = router.route(session_key(self, body))
+        if not candidates:
+            return self._send_json({"error": "No healthy model server", "success": False}, 503)
+
+        # Preferred backend first, then its ring successor (one retry)
+        for attempt, backend in enumerate(candidates[:2]):
+            with backend.lock:
+                backend.in_flight += 1
+            try:
+                response, payload = self._forward(backend, body, headers)
+            except ForwardError as e:
+                if not e.sent:
+                    # Never reached the backend: safe to send to the successor
+                    router.record_result(backend, False)
+                    continue
+                # The backend may be executing it: never re-send (requests
+                # like gesture enrollment or /reload aren't idempotent)
+                timed_out = isinstance(e.error, TimeoutError)
+                router.record_result(backend, False, health=not timed_out)
+                if timed_out:
+                    return self._send_json({"error": "Model server timed out", "success": False}, 504)
+                return self._send_json({"error": "Model server failed", "success": False}, 502)
+            finally:
+                with backend.lock:
+                    backend.in_flight -= 1
+
+            # A not-ready backend (models loading) hasn't run the request:
+            # fail over. Other 503s are the application's answer; /ready
+            # health checks alone decide whether a backend is in rotation.
+            if attempt == 0 and len(candidates) > 1 and not_ready(response, payload):
+                continue
+            router.record_result(backend, True)
+            self.send_response(response.status)
+            for key, value in response.getheaders():
+                if key.lower() not in HOP_BY_HOP:
+                    self.send_header(key, value)
+            self.send_header("Content-Length", str(len(payload)))
+            self.send_header("X-Routed-To", backend.url)
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+        self._send_json({"error": "Model servers unavailable", "success": False}, 502)
+
+    def _forward(self, backend, body, headers):
+        """
+        Send the request on the thread's keep-alive connection
+
+        Retried once on a fresh connection only when a reused keep-alive
+        connection turns out to have been closed by the backend.
+
+        Raises:
+            ForwardError: with `sent` False if the request never reached the backend
+        """
+        for retry in (False, True):
+            conn = backend.connection()
+            reused = conn.sock is not None
+            try:
+                conn.request(self.command, self.path, body=body, headers=headers)
+            except (OSError, http.client.HTTPException) as e:
+                backend.reset_connection()
+                if isinstance(e, TimeoutError):
+                    raise ForwardError(e, sent=True)
+                if reused and not retry:
+                    continue
+                raise ForwardError(e, sent=False)
+            try:
+                response = conn.getresponse()
+                return response, response.read()
+            except http.client.RemoteDisconnected as e:
+                # Closed without a response: an idle keep-alive connection the
+                # backend dropped before reading the request
+                backend.reset_connection()
+                if reused and not retry:
+                    continue
+                raise ForwardError(e, sent=True)
+            except (OSError, http.client.HTTPException) as e:
+                backend.reset_connection()
+                raise ForwardError(e, sent=True)
+
+    def _dispatch(self):
+        body = self._read_body()
+        if urlsplit(self.path).path.startswith("/router/"):
+            return self._router_endpoint(body)
+        return self._proxy(body)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _dispatch
+
+    def do_OPTIONS(self):
+        # CORS preflight answered locally, like the model servers' CORS middleware
+        self.send_response(204)
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Access-Control-Allow-Methods", "*")
+        self.send_header("Access-Control-Allow-Headers", "*")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+def spawn_instances(count, base_port, server="flask", stub=False):
+    """
+    Start model-server instances on consecutive ports
+
+    Returns:
+        (list of base URLs, list of Popen handles)
+    """
+    script = Path(__file__).parent / ("model_api_asgi.py" if server == "asgi" else "model_api_server.py")
+    env = dict(os.environ)
+    env.pop("MODEL_SOCKET_PATH", None)  # One socket path can't be shared
+    if stub:
+        workdir = tempfile.mkdtemp(prefix="router_stub_")
+        env["MODEL_DIR"] = str(Path(workdir) / "models")
+        env["MODEL_CACHE_DIR"] = str(Path(workdir) / "cache")
+        from stub_models import write_stub_models
+        write_stub_models(env["MODEL_DIR"])
+
+    urls, processes = [], []
+    for i in range(count):
+        port = base_port + i
+        processes.append(subprocess.Popen(
+            [sys.executable, str(script), "--host", "127.0.0.1", "--port", str(port)], env=env
+        ))
+        urls.append(f"http://127.0.0.1:{port}")
+        print(f"[INFO] Started {script.name} on port {port} (pid {processes[-1].pid})")
+    return urls, processes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Consistent-hash session router for model servers")
+    parser.add_argument("--backends", nargs="*", default=[], help="Model server base URLs")
+    parser.add_argument("--spawn", type=int, default=0, help="Start N local model servers")
+    parser.add_argument("--spawn-port", type=int, default=5001, help="First port for --spawn")
+    parser.add_argument("--server", choices=["flask", "asgi"], default="flask",
+                        help="Server implementation for --spawn")
+    parser.add_argument("--stub", action="store_true", help="Spawned servers use stub models")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 8000)))
+    parser.add_argument("--vnodes", type=int, default=DEFAULT_VNODES, help="Virtual nodes per backend")
+    parser.add_argument("--check-interval", type=float, default=DEFAULT_CHECK_INTERVAL,
+                        help="Seconds between /ready checks")
+    parser.add_argument("--rise", type=int, default=DEFAULT_RISE, help="Passing checks to mark healthy")
+    parser.add_argument("--fall", type=int, default=DEFAULT_FALL, help="Failures to mark unhealthy")
+    args = parser.parse_args()
+
+    processes = []
+    urls = list(args.backends)
+    if args.spawn:
+        spawned, processes = spawn_instances(args.spawn, args.spawn_port, args.server, args.stub)
+        urls += spawned
+    if not urls:
+        parser.error("provide --backends or --spawn")
+
+    router = SessionRouter(urls, args.vnodes, args.check_interval, args.rise, args.fall)
+    router.start()
+    httpd = ThreadingHTTPServer((args.host, args.port), RouterHandler)
+    httpd.daemon_threads = True
+    httpd.router = router
+    print(f"[INFO] Routing {len(urls)} backend(s) on port {args.port} (GET /router/status)")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        router.stop()
+        httpd.server_close()
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+Stub Models
+Small random-weight Keras models with the same input/output shapes as the real ones
+
+Used by the load test and benchmarks so they run offline (e.g. in CI) without
+the real `.keras` files. The stubs include Dropout and BatchNormalization so
+the load-time graph optimizations are exercised too.
+
+Usage:
+    python scripts/stub_models.py --output /tmp/stub_models
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from unified_model_loader import DEFAULT_MODEL_FILES
+
+# model name -> (input shape, number of classes); must match the loader's class lists
+STUB_SPECS = {
+    "asl_alphabet": ((160, 160, 3), 29),
+    "sign_mnist": ((28, 28, 1), 26),
+    "hagrid": ((160, 160, 3), 2),
+}
+
+
+def build_stub_model(name, input_shape, num_classes, seed=0):
+    """Tiny CNN classifier with random weights"""
+    import tensorflow as tf
+    from tensorflow.keras import layers
+
+    tf.keras.utils.set_random_seed(seed)
+    inputs = tf.keras.Input(shape=input_shape, name="input_layer")
+    x = layers.Conv2D(8, 3, strides=2, padding="same", activation="relu")(inputs)
+    x = layers.Conv2D(16, 3, strides=2, padding="same", activation="relu")(x)
+    x = layers.GlobalAveragePooling2D()(x)
+    x = layers.BatchNormalization()(x)
+    x = layers.Dropout(0.3)(x)
+    x = layers.Dense(32, activation="relu")(x)
+    outputs = layers.Dense(num_classes, activation="softmax")(x)
+    return tf.keras.Model(inputs, outputs, name=f"stub_{name}")
+
+
+def write_stub_models(output_dir, model_files=None):
+    """
+    Save stub models under the real file names
+
+    Returns:
+        Path of the output directory
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for seed, (name, filename) in enumerate((model_files or DEFAULT_MODEL_FILES).items()):
+        input_shape, num_classes = STUB_SPECS[name]
+        model = build_stub_model(name, input_shape, num_classes, seed)
+        model.save(str(output_dir / filename))
+        print(f"[INFO] Wrote stub {name}: {input_shape} -> {num_classes} classes")
+    return output_dir
+
+
+def write_stub_corpus(output_dir, count=16, size=(640, 480), seed=0):
+    """
+    Write random JPEG frames to use as a load-test corpus
+
+    Returns:
+        List of image paths
+    """
+    import numpy as np
+    from PIL import Image
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    paths = []
+    for i in range(count):
+        pixels = rng.integers(0, 256, size=(size[1], size[0], 3), dtype=np.uint8)
+        path = output_dir / f"frame_{i}.jpg"
+        Image.fromarray(pixels).save(path, quality=85)
+        paths.append(path)
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write random-weight stub models")
+    parser.add_argument("--output", required=True, help="Directory for the stub .keras files")
+    args = parser.parse_args()
+    write_stub_models(args.output)
@@ -5,48 +5,460 @@ Integrates all trained models into a single interface
 
 import os
 import json
+import threading
+import time
 import numpy as np
-import tensorflow as tf
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from pathlib import Path
 
+from preprocess_plan import PlannedFrame, planner
+from request_profiler import NULL_PROFILER
+
+DEFAULT_MODELS_DIR = Path(__file__).parent.parent / "notebooks" / "Saved_models"
+
+DEFAULT_MODEL_FILES = {
+    "asl_alphabet": "final_asl_model-training-optimized.keras",
+    "sign_mnist": "final_sign_mnist_cnn.keras",
+    "hagrid": "HAGRID_best_model.keras",
+}
+
+# Serving artifacts are cached here unless MODEL_CACHE_DIR overrides it
+CACHE_DIR_NAME = ".serving_cache"
+
+# Per-model load states reported by /health and /ready
+STATE_PENDING = "pending"
+STATE_LOADING = "loading"
+STATE_READY = "ready"
+STATE_FAILED = "failed"
+STATE_MISSING = "missing"
+
+# Seconds between model-file polls (0 disables watching)
+DEFAULT_WATCH_INTERVAL = float(os.environ.get("MODEL_WATCH_INTERVAL", 5.0))
+
+
+class ModelVersion:
+    """
+    One loaded version of a model
+    
+    Requests hold a reference while they use the model; a replaced version is
+    only freed once every in-flight request has released it.
+    """
+    
+    def __init__(self, name, model, config, version, source):
+        self.name = name
+        self.model = model
+        self.config = config
+        self.version = version
+        self.source = source
+        self.loaded_at = datetime.now().isoformat()
+        self.inflight = 0
+        self._cond = threading.Condition()
+    
+    def acquire(self):
+        with self._cond:
+            self.inflight += 1
+        return self
+    
+    def release(self):
+        with self._cond:
+            self.inflight -= 1
+            if self.inflight == 0:
+                self._cond.notify_all()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.release()
+    
+    def wait_drained(self, timeout=None):
+        """Block until no request is using this version"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.inflight == 0, timeout)
+    
+    def describe(self):
+        return {
+            "version": self.version,
+            "source": self.source,
+            "loaded_at": self.loaded_at,
+            "inflight": self.inflight,
+        }
+
+
 class UnifiedModelLoader:
     """Unified loader for all ASL recognition models"""
     
-    def __init__(self):
+    def __init__(self, model_files=None, models_dir=None, autoload=True, use_cache=None):
+        """
+        Args:
+            model_files: Mapping of model name -> file name (defaults to all models)
+            models_dir: Directory containing the model files
+            autoload: Load all models synchronously on construction
+            use_cache: Serve cached TFLite artifacts (defaults to MODEL_CACHE != "0")
+        """
         self.models = {}
         self.model_configs = {}
-        self.models_dir = Path(__file__).parent.parent / "notebooks" / "Saved_models"
-        self.load_all_models()
-    
-    def load_all_models(self):
-        """Load all available models"""
-        model_files = {
-            "asl_alphabet": "final_asl_model-training-optimized.keras",
-            "sign_mnist": "final_sign_mnist_cnn.keras",
-            "hagrid": "HAGRID_best_model.keras",
-        }
+        self.model_files = dict(model_files or DEFAULT_MODEL_FILES)
+        self.models_dir = Path(models_dir or os.environ.get("MODEL_DIR", DEFAULT_MODELS_DIR))
+        self.load_state = {name: {"state": STATE_PENDING} for name in self.model_files}
+        self._lock = threading.Lock()
+        self._loading_thread = None
+        self._watch_thread = None
+        self._active = {}
+        self._draining = {name: [] for name in self.model_files}
+        self._reloading = set()
+        self._file_stats = {}
+        self.optimization_reports = {}
+        self.artifact_cache = self._create_artifact_cache(use_cache)
+        if autoload:
+            self.load_all_models()
+    
+    def _create_artifact_cache(self, use_cache):
+        """Create the serving artifact cache, or None when disabled"""
+        if use_cache is None:
+            use_cache = os.environ.get("MODEL_CACHE", "1") != "0"
+        if not use_cache:
+            return None
+        from model_cache import ModelArtifactCache
+        cache_dir = os.environ.get("MODEL_CACHE_DIR") or self.models_dir / CACHE_DIR_NAME
+        return ModelArtifactCache(cache_dir)
+    
+    def load_all_models(self, max_workers=None):
+        """
+        Load all available models in parallel
+        
+        Args:
+            max_workers: Number of loader threads (defaults to MODEL_LOAD_WORKERS or one per model)
+        """
+        # Import TensorFlow once up front so worker threads don't race on it
+        import tensorflow  # noqa: F401
+        
+        if max_workers is None:
+            max_workers = int(os.environ.get("MODEL_LOAD_WORKERS", 0)) or len(self.model_files)
+        max_workers = max(1, min(max_workers, len(self.model_files) or 1))
+        
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="model-load") as pool:
+            list(pool.map(self.load_model, self.model_files))
+    
+    def start_background_loading(self, max_workers=None):
+        """Load all models on a background thread and return immediately"""
+        with self._lock:
+            if self._loading_thread is not None:
+                return self._loading_thread
+            self._loading_thread = threading.Thread(
+                target=self.load_all_models,
+                args=(max_workers,),
+                name="model-loader",
+                daemon=True,
+            )
+            self._loading_thread.start()
+            return self._loading_thread
+    
+    def wait_until_loaded(self, timeout=None):
+        """Block until background loading finishes"""
+        if self._loading_thread is not None:
+            self._loading_thread.join(timeout)
+        return self.is_ready()
+    
+    def _set_state(self, model_name, state, **details):
+        with self._lock:
+            self.load_state[model_name] = {"state": state, **details}
+    
+    def load_model(self, model_name):
+        """Load a single model, recording its load state"""
+        filename = self.model_files[model_name]
+        model_path = self.models_dir / filename
+        if not model_path.exists():
+            print(f"[WARNING] Model file not found: {filename}")
+            self._set_state(model_name, STATE_MISSING, file=filename)
+            return None
+        
+        self._set_state(model_name, STATE_LOADING, file=filename)
+        # Remember the file even if loading fails so the watcher only retries on change
+        self._file_stats[model_name] = self._stat(model_path)
+        try:
+            handle = self._build_version(model_name, model_path)
+            # A model that can't run a forward pass must not report ready
+            self._warm_up(handle)
+            self._activate(handle)
+            return handle.model
+        except Exception as e:
+            print(f"[ERROR] Failed to load {model_name}: {str(e)[:100]}")
+            self._set_state(model_name, STATE_FAILED, file=filename, error=str(e)[:200])
+            return None
+    
+    def _build_version(self, model_name, model_path):
+        """Load a model file into a new (not yet active) ModelVersion"""
+        started = time.perf_counter()
+        file_stat = self._stat(model_path)
+        print(f"[INFO] Loading {model_name} from {model_path.name}...")
+        model, source, version, serving_info = self._load_serving_model(model_name, model_path)
+        config = self._get_model_info(model, model_name, serving_info)
+        handle = ModelVersion(model_name, model, config, version, source)
+        handle.load_seconds = time.perf_counter() - started
+        handle.file_stat = file_stat
+        print(f"[SUCCESS] {model_name} loaded successfully from {source} ({handle.load_seconds:.1f}s)")
+        return handle
+    
+    def _activate(self, handle):
+        """Atomically make a version the one new requests use"""
+        with self._lock:
+            previous = self._active.get(handle.name)
+            self._active[handle.name] = handle
+            self.models[handle.name] = handle.model
+            self.model_configs[handle.name] = handle.config
+            self._file_stats[handle.name] = handle.file_stat
+            self.load_state[handle.name] = {
+                "state": STATE_READY,
+                "file": self.model_files[handle.name],
+                "source": handle.source,
+                "version": handle.version,
+                "load_seconds": round(handle.load_seconds, 3),
+            }
+            if previous is not None:
+                self._draining[handle.name].append(previous)
+        if previous is not None:
+            threading.Thread(
+                target=self._retire, args=(previous,), name=f"drain-{handle.name}", daemon=True
+            ).start()
+    
+    def _retire(self, handle):
+        """Free a replaced version once its in-flight requests finish"""
+        handle.wait_drained()
+        with self._lock:
+            self._draining[handle.name].remove(handle)
+        print(f"[INFO] Released {handle.name} version {handle.version}")
+        handle.model = None
+        import gc
+        gc.collect()
+    
+    def acquire_model(self, model_name):
+        """
+        Pin the active version of a model for the duration of a request
+        
+        Returns:
+            ModelVersion (use as a context manager to release it), or None
+        """
+        with self._lock:
+            handle = self._active.get(model_name)
+            return handle.acquire() if handle is not None else None
+    
+    def reload_model(self, model_name, force=False):
+        """
+        Load a new version of a model, warm it up and swap it in
+        
+        In-flight requests keep using the old version, which is freed once they
+        finish. The old version keeps serving if the new one fails to load.
+        
+        Returns:
+            dict describing the outcome
+        """
+        if model_name not in self.model_files:
+            return {"model": model_name, "status": "unknown_model"}
+        model_path = self.models_dir / self.model_files[model_name]
+        if not model_path.exists():
+            return {"model": model_name, "status": "missing"}
+        
+        with self._lock:
+            if model_name in self._reloading:
+                return {"model": model_name, "status": "already_reloading"}
+            self._reloading.add(model_name)
+            current = self._active.get(model_name)
         
-        for model_name, filename in model_files.items():
-            model_path = self.models_dir / filename
-            if model_path.exists():
+        try:
+            if current is not None and not force:
+                if self._version_key(model_name, model_path) == current.version:
+                    self._file_stats[model_name] = self._stat(model_path)
+                    return {"model": model_name, "status": "unchanged", "version": current.version}
+            
+            if current is None:
+                self._set_state(model_name, STATE_LOADING, file=model_path.name)
+            handle = self._build_version(model_name, model_path)
+            self._warm_up(handle)
+            self._activate(handle)
+            return {"model": model_name, "status": "reloaded", "version": handle.version,
+                    "previous_version": current.version if current is not None else None}
+        except Exception as e:
+            print(f"[ERROR] Failed to reload {model_name}: {str(e)[:100]}")
+            self._file_stats[model_name] = self._stat(model_path)
+            if current is None:
+                self._set_state(model_name, STATE_FAILED, file=model_path.name, error=str(e)[:200])
+            return {"model": model_name, "status": "failed", "error": str(e)[:200]}
+        finally:
+            with self._lock:
+                self._reloading.discard(model_name)
+    
+    def reload_in_background(self, model_names=None, force=False):
+        """Reload models on a background thread"""
+        names = list(model_names or self.model_files)
+        thread = threading.Thread(
+            target=lambda: [self.reload_model(name, force) for name in names],
+            name="model-reload",
+            daemon=True,
+        )
+        thread.start()
+        return thread
+    
+    def _warm_up(self, handle):
+        """Run one dummy inference so the first real request doesn't pay graph setup"""
+        shape = [dim or 64 for dim in handle.config["input_shape"][1:]]
+        dtype = "uint8" if handle.config.get("uint8_input") else "float32"
+        handle.model.predict(np.zeros([1] + shape, dtype=dtype), verbose=0)
+    
+    def _version_key(self, model_name, model_path):
+        """Version identifier of a model file's current content"""
+        if self.artifact_cache is not None:
+            return self.artifact_cache.entry_for(model_name, model_path).key
+        from model_cache import file_sha256
+        return file_sha256(model_path)[:16]
+    
+    def start_watching(self, interval=None):
+        """
+        Poll the model files and hot-reload any that change
+        
+        A change is only acted on once the file's size and mtime are stable
+        across two polls, so half-copied files are never loaded.
+        """
+        interval = DEFAULT_WATCH_INTERVAL if interval is None else interval
+        if interval <= 0:
+            return None
+        with self._lock:
+            if self._watch_thread is not None:
+                return self._watch_thread
+            self._watch_thread = threading.Thread(
+                target=self._watch_loop, args=(interval,), name="model-watch", daemon=True
+            )
+            self._watch_thread.start()
+            return self._watch_thread
+    
+    def _stat(self, model_path):
+        stat = model_path.stat()
+        return (stat.st_mtime_ns, stat.st_size)
+    
+    def _watch_loop(self, interval):
+        pending = {}
+        while True:
+            time.sleep(interval)
+            if self.is_loading():
+                continue
+            for model_name, filename in self.model_files.items():
                 try:
-                    print(f"[INFO] Loading {model_name} from {filename}...")
-                    model = tf.keras.models.load_model(str(model_path), compile=False)
-                    self.models[model_name] = model
-                    self.model_configs[model_name] = self._get_model_info(model, model_name)
-                    print(f"[SUCCESS] {model_name} loaded successfully")
-                except Exception as e:
-                    print(f"[WARNING] Failed to load {model_name}: {e}")
-            else:
-                print(f"[WARNING] Model file not found: {filename}")
-    
-    def _get_model_info(self, model, model_name):
+                    current = self._stat(self.models_dir / filename)
+                except FileNotFoundError:
+                    continue
+                if current == self._file_stats.get(model_name):
+                    pending.pop(model_name, None)
+                elif pending.get(model_name) == current:
+                    pending.pop(model_name)
+                    print(f"[INFO] Detected change in {filename}, reloading {model_name}...")
+                    self.reload_model(model_name)
+                else:
+                    pending[model_name] = current
+    
+    def get_model_versions(self):
+        """Active and draining versions of every model"""
+        with self._lock:
+            return {
+                name: {
+                    "active": self._active[name].describe() if name in self._active else None,
+                    "draining": [handle.describe() for handle in self._draining[name]],
+                    "reloading": name in self._reloading,
+                }
+                for name in self.model_files
+            }
+    
+    def _load_serving_model(self, model_name, model_path):
+        """
+        Load the fastest available serving form of a model
+        
+        Returns:
+            (model, source, version, serving_info) where source is "cache",
+            "converted" or "keras"
+        """
+        if self.artifact_cache is None:
+            model, serving_info = self._prepare_keras_model(model_name, model_path)
+            return model, "keras", self._version_key(model_name, model_path), serving_info
+        
+        entry = self.artifact_cache.entry_for(model_name, model_path)
+        cached = self.artifact_cache.load(entry)
+        if cached is not None:
+            self.optimization_reports[model_name] = cached.meta.get("optimization")
+            return cached, "cache", entry.key, cached.meta.get("serving", {})
+        
+        model, serving_info = self._prepare_keras_model(model_name, model_path)
+        
+        print(f"[INFO] Converting {model_name} to a cached serving artifact...")
+        converted = self.artifact_cache.store(entry, model, {
+            "optimization": self.optimization_reports.get(model_name),
+            "serving": serving_info,
+        })
+        if converted is not None:
+            return converted, "converted", entry.key, serving_info
+        return model, "keras", entry.key, serving_info
+    
+    def _prepare_keras_model(self, model_name, model_path):
+        """
+        Load a Keras model and rewrite it for serving
+        
+        Returns:
+            (model, serving_info)
+        """
+        model = self._optimize_model(model_name, self._load_keras_model(model_path))
+        if os.environ.get("MODEL_UINT8_INPUT", "1") == "0":
+            return model, {}
+        from model_optimization import build_serving_model
+        try:
+            serving, serving_info = build_serving_model(model)
+        except Exception as e:
+            print(f"[WARNING] uint8 serving wrapper failed for {model_name}: {str(e)[:100]}")
+            return model, {}
+        if serving is None:
+            return model, {}
+        print(f"[INFO] {model_name} accepts raw uint8 pixels (in-graph resize/scale)")
+        return serving, serving_info
+    
+    def _optimize_model(self, model_name, model):
+        """Apply the inference-only graph rewrites (MODEL_OPTIMIZE=0 disables)"""
+        if os.environ.get("MODEL_OPTIMIZE", "1") == "0":
+            return model
+        from model_optimization import optimize_for_inference
+        try:
+            model, report = optimize_for_inference(model)
+        except Exception as e:
+            print(f"[WARNING] Graph optimization failed for {model_name}: {str(e)[:100]}")
+            return model
+        self.optimization_reports[model_name] = report
+        if report["applied"]:
+            print(f"[INFO] Optimized {model_name}: removed {len(report['removed_layers'])} layers, "
+                  f"folded {len(report['folded_batch_norm'])} BatchNorm, "
+                  f"{report.get('latency_ms_before', 0):.1f} -> {report.get('latency_ms_after', 0):.1f} ms")
+        return model
+    
+    def _load_keras_model(self, model_path):
+        """Load a Keras model, falling back to safe_mode=False for compatibility issues"""
+        import tensorflow as tf
+        try:
+            return tf.keras.models.load_model(str(model_path), compile=False)
+        except Exception as e:
+            print(f"[WARNING] Standard load failed, trying safe_mode=False...")
+            try:
+                return tf.keras.models.load_model(str(model_path), compile=False, safe_mode=False)
+            except Exception as e2:
+                raise Exception(f"Both loading methods failed: {e} | {e2}")
+    
+    def _get_model_info(self, model, model_name, serving_info=None):
         """Extract model information"""
+        serving_info = serving_info or {}
+        # uint8 serving wrappers accept any size; report the size the model sees
+        input_shape = serving_info.get("target_input_shape") or model.input_shape
         config = {
             "name": model_name,
-            "input_shape": model.input_shape,
+            "input_shape": tuple(input_shape),
+            "uint8_input": bool(serving_info.get("uint8_input")),
             "output_shape": model.output_shape,
-            "params": model.count_params(),
+            "params": int(model.count_params()),
+            "timestamp": datetime.now().isoformat(),
         }
         
         # Define class names for each model
@@ -67,58 +479,118 @@ class UnifiedModelLoader:
         
         return config
     
-    def predict(self, image, model_name="asl_alphabet", confidence_threshold=0.5):
+    def predict(self, image, model_name="asl_alphabet", confidence_threshold=0.5,
+                top_k=None, compact=False, profiler=None):
         """
         Make a prediction using specified model
         
         Args:
-            image: Input image (numpy array)
+            image: Input image (numpy array or PlannedFrame)
             model_name: Which model to use
             confidence_threshold: Minimum confidence for prediction
+            top_k: Only report the k most likely classes (None reports all)
+            compact: Report class indices + float32 probabilities instead of a dict
+            profiler: Optional RequestProfiler that records per-stage timings
         
         Returns:
             dict with prediction results
         """
-        if model_name not in self.models:
+        handle = self.acquire_model(model_name)
+        if handle is None:
+            return self._unavailable(model_name)
+        
+        try:
+            profiler = profiler or NULL_PROFILER
+            pred = self._forward(handle, image, profiler)
+            with profiler.stage(f"{model_name}.format"):
+                result = self.format_prediction(pred, handle.config, confidence_threshold, top_k, compact)
+            result["version"] = handle.version
+            return result
+        
+        except Exception as e:
             return {
-                "error": f"Model '{model_name}' not found",
-                "available_models": list(self.models.keys())
+                "error": str(e),
+                "model": model_name,
+                "success": False
             }
         
+        finally:
+            handle.release()
+    
+    def predict_proba(self, image, model_name, profiler=None):
+        """
+        Raw class probabilities from one model (no response formatting)
+        
+        Returns:
+            dict with "probabilities" (1-D float32), "classes", "params" and
+            "version", or an error dict like predict()
+        """
+        handle = self.acquire_model(model_name)
+        if handle is None:
+            return self._unavailable(model_name)
+        
         try:
-            model = self.models[model_name]
-            config = self.model_configs[model_name]
-            
-            # Normalize image
-            image = image.astype("float32") / 255.0
-            
-            # Ensure correct shape
-            expected_shape = config["input_shape"][1:]
-            if image.shape != expected_shape:
-                image = self._resize_image(image, expected_shape)
-            
-            # Make prediction
-            pred = model.predict(image[None, ...], verbose=0)
-            
-            # Get top prediction
-            idx = np.argmax(pred[0])
-            confidence = float(pred[0][idx])
-            
-            result = {
+            probs = self._forward(handle, image, profiler or NULL_PROFILER)
+            return {
                 "model": model_name,
-                "prediction": config["classes"][idx],
-                "confidence": confidence,
-                "all_predictions": {
-                    config["classes"][i]: float(pred[0][i]) 
-                    for i in range(len(config["classes"]))
-                },
+                "probabilities": np.asarray(probs, dtype=np.float32),
+                "classes": handle.config["classes"],
+                "params": handle.config["params"],
+                "version": handle.version,
                 "success": True
             }
+        
+        except Exception as e:
+            return {
+                "error": str(e),
+                "model": model_name,
+                "success": False
+            }
+        
+        finally:
+            handle.release()
+    
+    def predict_batch(self, images, model_name, confidence_threshold=0.5,
+                      top_k=None, compact=False, profiler=None):
+        """
+        Classify several images (e.g. crops of one frame) in one forward pass
+        
+        Args:
+            images: List of input images (numpy arrays, any size)
+            model_name: Which model to use
+            confidence_threshold: Minimum confidence for prediction
+            top_k: Only report the k most likely classes (None reports all)
+            compact: Report class indices + float32 probabilities instead of a dict
+            profiler: Optional RequestProfiler that records per-stage timings
+        
+        Returns:
+            dict with a "predictions" list (one result per image)
+        """
+        handle = self.acquire_model(model_name)
+        if handle is None:
+            return self._unavailable(model_name)
+        
+        try:
+            config = handle.config
+            profiler = profiler or NULL_PROFILER
+            with profiler.stage(f"{model_name}.prepare"):
+                # Same planner as /predict: a crop gets exactly the input it would get there
+                batch = np.stack([self.prepare_input(image, config) for image in images])
             
-            if confidence < confidence_threshold:
-                result["warning"] = f"Low confidence: {confidence:.2%}"
+            with profiler.stage(f"{model_name}.forward"):
+                preds = handle.model.predict(batch, verbose=0)
             
-            return result
+            with profiler.stage(f"{model_name}.format"):
+                predictions = [
+                    self.format_prediction(pred, config, confidence_threshold, top_k, compact)
+                    for pred in preds
+                ]
+            return {
+                "model": model_name,
+                "version": handle.version,
+                "predictions": predictions,
+                "success": True
+            }
         
         except Exception as e:
             return {
@@ -126,46 +598,168 @@ class UnifiedModelLoader:
                 "model": model_name,
                 "success": False
             }
+        
+        finally:
+            handle.release()
+    
+    def _forward(self, handle, image, profiler):
+        """Preprocess one image and run it through a model version"""
+        with profiler.stage(f"{handle.name}.prepare"):
+            image = self.prepare_input(image, handle.config)
+        
+        # Make prediction
+        with profiler.stage(f"{handle.name}.forward"):
+            return handle.model.predict(image[None, ...], verbose=0)[0]
+    
+    def _unavailable(self, model_name):
+        """Error result for a model that isn't serving (yet)"""
+        state = self.load_state.get(model_name, {}).get("state")
+        if state in (STATE_PENDING, STATE_LOADING):
+            return {
+                "error": f"Model '{model_name}' is still loading",
+                "model": model_name,
+                "loading": True,
+                "success": False
+            }
+        return {
+            "error": f"Model '{model_name}' not found",
+            "available_models": list(self.models.keys()),
+            "success": False
+        }
     
-    def _resize_image(self, image, target_shape):
-        """Resize image to target shape"""
-        import cv2
-        if len(target_shape) == 3:  # (H, W, C)
-            h, w, c = target_shape
-            resized = cv2.resize(image, (w, h))
-            if resized.ndim == 2:
-                resized = np.stack([resized] * c, axis=-1)
-            return resized
+    def prepare_input(self, image, config):
+        """
+        Host-side preprocessing of one image for a model
+        
+        Colour conversion and resizing run on the host for every model; uint8
+        serving models then get the pixels (scaling runs in the graph), other
+        models normalized float input.
+        `image` may be a PlannedFrame shared by several models of a request.
+        """
+        if not isinstance(image, PlannedFrame):
+            image = planner.frame(image, [config])
+        return image.input_for(config)
+    
+    def plan_inputs(self, image, model_names):
+        """
+        Share preprocessing of one image across several models
+        
+        Returns:
+            PlannedFrame to pass to predict()/predict_proba() in place of the image
+        """
+        configs = [self.model_configs[name] for name in model_names if name in self.model_configs]
+        return planner.frame(image, configs)
+    
+    def format_prediction(self, probs, config, confidence_threshold=0.5, top_k=None, compact=False):
+        """
+        Build the response dict for one probability vector
+        
+        Args:
+            probs: 1-D class probabilities
+            config: Model config (provides class names)
+            confidence_threshold: Minimum confidence for prediction
+            top_k: Only report the k most likely classes (None reports all)
+            compact: Report class indices + float32 probabilities instead of a dict
+        """
+        classes = config["classes"]
+        probs = np.asarray(probs, dtype=np.float32)
+        idx = int(np.argmax(probs))
+        confidence = float(probs[idx])
+        
+        if top_k is not None and top_k < len(probs):
+            # O(n) selection, then sort only the k survivors
+            top = np.argpartition(probs, -top_k)[-top_k:]
+            top = top[np.argsort(probs[top])[::-1]]
         else:
-            return image
+            top = np.argsort(probs)[::-1] if top_k is not None else np.arange(len(probs))
+        
+        result = {
+            "model": config["name"],
+            "prediction": classes[idx],
+            "confidence": confidence,
+            "confidence_percent": f"{confidence*100:.2f}%",
+            "success": True
+        }
+        
+        if compact:
+            result["indices"] = top.astype(np.int32)
+            result["probabilities"] = probs[top]
+        else:
+            result["all_predictions"] = {
+                classes[i]: float(probs[i]) for i in top.tolist()
+            }
+        
+        if confidence < confidence_threshold:
+            result["warning"] = f"Low confidence: {confidence:.2%}"
+        
+        return result
     
     def get_available_models(self):
         """Get list of available models with their info"""
         return {
             name: {
                 "input_shape": config["input_shape"],
+                "uint8_input": config.get("uint8_input", False),
                 "output_shape": config["output_shape"],
                 "classes": config.get("classes", []),
-                "params": config["params"]
+                "params": config["params"],
+                "num_classes": len(config.get("classes", []))
             }
             for name, config in self.model_configs.items()
         }
     
+    def get_load_status(self):
+        """Get per-model load state"""
+        with self._lock:
+            return {name: dict(state) for name, state in self.load_state.items()}
+    
+    def is_loading(self):
+        """Check if any model is still pending or loading"""
+        return any(
+            state["state"] in (STATE_PENDING, STATE_LOADING)
+            for state in self.get_load_status().values()
+        )
+    
+    def is_ready(self):
+        """Ready once loading has finished and at least one model is serving"""
+        return bool(self.models) and not self.is_loading()
+    
     def health_check(self):
         """Check health of all models"""
+        if self.models:
+            status = "healthy"
+        elif self.is_loading():
+            status = "loading"
+        else:
+            status = "no_models"
         return {
-            "status": "healthy" if self.models else "no_models",
+            "status": status,
+            "timestamp": datetime.now().isoformat(),
             "loaded_models": list(self.models.keys()),
+            "load_state": self.get_load_status(),
+            "versions": self.get_model_versions(),
+            "optimization": dict(self.optimization_reports),
             "models_info": self.get_available_models()
         }
 
 
 # Global instance
 _model_loader = None
+_model_loader_lock = threading.Lock()
 
-def get_model_loader():
-    """Get or create the global model loader instance"""
+def get_model_loader(model_files=None, background=True):
+    """
+    Get or create the global model loader instance
+    
+    Args:
+        model_files: Models to load when the instance is first created
+        background: Load models on a background thread instead of blocking
+    """
     global _model_loader
-    if _model_loader is None:
-        _model_loader = UnifiedModelLoader()
+    with _model_loader_lock:
+        if _model_loader is None:
+            _model_loader = UnifiedModelLoader(model_files=model_files, autoload=not background)
+            if background:
+                _model_loader.start_background_loading()
+            _model_loader.start_watching()
     return _model_loader
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Ensemble Fusion Check
+Verifies early-exit fusion over models with different label sets
+
+A label only one model predicts (asl_alphabet's del/nothing/space) must not
+outvote a label the other models agree on, and must not trigger an early
+exit on its own. Exits non-zero if either happens.
+
+Usage:
+    python scripts/verify_ensemble.py
+"""
+
+import string
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from ensemble import EarlyExitEnsemble, LabelSpace, fuse
+
+LETTERS = list(string.ascii_uppercase)
+ASL_CLASSES = sorted(LETTERS + ["del", "nothing", "space"])
+
+
+def probabilities(classes, **mass):
+    """Probability vector over `classes` with the given label -> probability"""
+    probs = np.zeros(len(classes), dtype=np.float32)
+    for label, p in mass.items():
+        probs[classes.index(label)] = p
+    return probs
+
+
+def fake_result(classes, **mass):
+    return {"success": True, "classes": classes, "probabilities": probabilities(classes, **mass)}
+
+
+def check_fuse():
+    """asl_alphabet is sure of 'del'; sign_mnist is sure of 'A'"""
+    space = LabelSpace({"asl_alphabet": ASL_CLASSES, "sign_mnist": LETTERS})
+    fused = fuse(
+        [space.project("asl_alphabet", probabilities(ASL_CLASSES, **{"del": 0.7, "A": 0.3})),
+         space.project("sign_mnist", probabilities(LETTERS, A=0.9, B=0.1))],
+        [1.0, 1.0],
+    )
+    winner = space.labels[int(np.argmax(fused))]
+    ok = winner == "A" and abs(float(fused.sum()) - 1.0) < 1e-6
+    return ok, f"fused winner {winner!r} ({fused.max():.2f})"
+
+
+def check_early_exit():
+    """A lone label must not stop the ensemble before a third model weighs in"""
+    results = {
+        "sign_mnist": fake_result(LETTERS, A=0.5, B=0.5),
+        "asl_alphabet": fake_result(ASL_CLASSES, **{"del": 0.9, "A": 0.1}),
+        "letters_large": fake_result(LETTERS, A=0.9, B=0.1),
+    }
+    costs = {"sign_mnist": 1, "asl_alphabet": 2, "letters_large": 3}
+    outcome = EarlyExitEnsemble(exit_threshold=0.6).run(list(results), costs, results.get)
+    winner = outcome["labels"][int(np.argmax(outcome["probabilities"]))]
+    ok = winner == "A" and not outcome["early_exit"]
+    return ok, f"winner {winner!r}, early_exit={outcome['early_exit']}, ran {outcome['models_run']}"
+
+
+def main():
+    print("\n" + "="*60)
+    print("  ENSEMBLE FUSION CHECK")
+    print("="*60)
+
+    all_pass = True
+    for name, check in [("fuse", check_fuse), ("early_exit", check_early_exit)]:
+        ok, detail = check()
+        print(f"{'✅' if ok else '❌'} {name}: {detail}")
+        all_pass &= ok
+
+    print("="*60 + "\n")
+    return 0 if all_pass else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Import-Time Budget Check
+Verifies the request-routing modules import quickly and without heavy ML dependencies
+
+Each module is imported in a fresh interpreter so cached imports don't hide
+regressions. Exits non-zero if a module exceeds the budget or pulls in
+TensorFlow, OpenCV, PIL or NumPy at import time.
+
+Usage:
+    python scripts/verify_import_time.py [--budget 1.0]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+ROUTING_MODULES = {
+    "model_api_server": ROOT / "scripts",
+    "unified_inference": ROOT / "app" / "api",
+    "prediction_service": ROOT / "scripts",
+}
+
+HEAVY_MODULES = ["tensorflow", "keras", "cv2", "PIL", "numpy"]
+
+DEFAULT_BUDGET_SECONDS = float(os.environ.get("IMPORT_BUDGET_SECONDS", 1.0))
+
+PROBE = """
+import json, sys, time
+sys.path.insert(0, {scripts!r})
+sys.path.insert(0, {path!r})
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print(json.dumps({{"seconds": elapsed, "heavy": heavy}}))
+"""
+
+def measure(module, path):
+    """Import a module in a fresh interpreter and report time and heavy imports"""
+    code = PROBE.format(
+        scripts=str(ROOT / "scripts"), path=str(path), module=module, heavy=HEAVY_MODULES
+    )
+    proc = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, cwd=str(ROOT)
+    )
+    if proc.returncode != 0:
+        return {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr else "import failed"}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Check routing-module import time")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET_SECONDS,
+                        help="Maximum import time per module in seconds")
+    args = parser.parse_args()
+
+    print("\n" + "="*60)
+    print("  IMPORT-TIME BUDGET CHECK")
+    print("="*60)
+
+    all_pass = True
+    for module, path in ROUTING_MODULES.items():
+        result = measure(module, path)
+        if "error" in result:
+            print(f"❌ {module}: {result['error']}")
+            all_pass = False
+            continue
+
+        ok = result["seconds"] <= args.budget and not result["heavy"]
+        icon = "✅" if ok else "❌"
+        print(f"{icon} {module}: {result['seconds']*1000:.0f} ms (budget {args.budget*1000:.0f} ms)")
+        if result["heavy"]:
+            print(f"      heavy imports: {', '.join(result['heavy'])}")
+        all_pass &= ok
+
+    print("="*60 + "\n")
+    return 0 if all_pass else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -161,7 +161,7 @@ def main():
     else:
         print("⚠️  SOME CHECKS FAILED - PLEASE FIX THE ISSUES ABOVE")
         print("\nCommon Fixes:")
-        print("  - Missing dependencies: pip install flask flask-cors tensorflow pillow opencv-python")
+        print("  - Missing dependencies: pip install flask flask-cors starlette uvicorn orjson msgpack tensorflow pillow opencv-python")
         print("  - Missing model files: Check notebooks/Saved_models/ directory")
         print("  - Missing scripts: Verify scripts/ directory exists")
     print("="*60 + "\n")
@@ -88,7 +88,7 @@ if all_pass:
 else:
     print("⚠️  SOME CHECKS FAILED")
     print("\n🔧 COMMON FIXES:")
-    print("  pip install flask flask-cors tensorflow pillow opencv-python")
+    print("  pip install flask flask-cors starlette uvicorn orjson msgpack tensorflow pillow opencv-python")
 print("="*60 + "\n")
 
 sys.exit(0 if all_pass else 1)
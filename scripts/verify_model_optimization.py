@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Model Optimization Check
+Verifies the load-time graph rewrites actually apply to the model shapes we serve
+
+Builds small random-weight models shaped like the served ones and runs
+optimize_for_inference() on each. Exits non-zero if Dropout is not stripped,
+BatchNorm is not folded, or the optimized outputs differ from the original.
+
+- stub: the load-test stub (... GAP -> BN -> Dropout -> Dense)
+- nested_backbone: augmentation + a branched nested backbone + Dropout/BN
+  head, like the EfficientNetB0 ASL model
+- backbone_plus_head: train_head() models (nested backbone + nested head)
+
+Usage:
+    python scripts/verify_model_optimization.py
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+def _branched_backbone(input_shape):
+    """Small stand-in for EfficientNet: a nested functional with a residual branch"""
+    import tensorflow as tf
+    from tensorflow.keras import layers
+
+    inputs = tf.keras.Input(shape=input_shape)
+    x = layers.Conv2D(8, 3, strides=2, padding="same", activation="relu")(inputs)
+    branch = layers.Conv2D(8, 3, padding="same")(x)
+    branch = layers.BatchNormalization()(branch)
+    x = layers.Add()([x, branch])
+    return tf.keras.Model(inputs, x, name="backbone")
+
+
+def build_cases():
+    """Model name -> model"""
+    import tensorflow as tf
+    from tensorflow.keras import layers
+    from embeddings import build_head
+    from stub_models import build_stub_model
+
+    cases = {"stub": build_stub_model("asl_alphabet", (160, 160, 3), 29)}
+
+    inputs = tf.keras.Input(shape=(64, 64, 3))
+    x = layers.RandomFlip("horizontal")(inputs)
+    x = _branched_backbone((64, 64, 3))(x)
+    x = layers.GlobalAveragePooling2D()(x)
+    x = layers.BatchNormalization()(x)
+    x = layers.Dropout(0.3)(x)
+    outputs = layers.Dense(29, activation="softmax")(x)
+    cases["nested_backbone"] = tf.keras.Model(inputs, outputs, name="nested_backbone")
+
+    backbone = tf.keras.Sequential([
+        tf.keras.Input(shape=(64, 64, 3)),
+        _branched_backbone((64, 64, 3)),
+        layers.GlobalAveragePooling2D(),
+    ], name="embedding_model")
+    head = build_head(8, 5)
+    inputs = tf.keras.Input(shape=(64, 64, 3))
+    cases["backbone_plus_head"] = tf.keras.Model(inputs, head(backbone(inputs)), name="backbone_plus_head")
+    return cases
+
+
+def randomize_batch_norm(model, seed=0):
+    """Give every BatchNorm non-trivial statistics so folding is observable"""
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    for layer in model.layers:
+        if hasattr(layer, "layers"):
+            randomize_batch_norm(layer, seed + 1)
+        elif type(layer).__name__ == "BatchNormalization":
+            layer.set_weights([
+                rng.uniform(0.5, 1.5, w.shape).astype("float32") if i != 2 else
+                rng.normal(0, 0.1, w.shape).astype("float32")
+                for i, w in enumerate(layer.get_weights())
+            ])
+
+
+def main():
+    from model_optimization import optimize_for_inference
+
+    print("\n" + "="*60)
+    print("  MODEL OPTIMIZATION CHECK")
+    print("="*60)
+
+    all_pass = True
+    for name, model in build_cases().items():
+        randomize_batch_norm(model)
+        _, report = optimize_for_inference(model, benchmark_runs=0)
+        ok = bool(report["removed_layers"]) and bool(report["folded_batch_norm"]) and report["applied"]
+        icon = "✅" if ok else "❌"
+        print(f"{icon} {name}: removed {report['removed_layers']}, "
+              f"folded {report['folded_batch_norm']}, "
+              f"max diff {report.get('max_abs_diff', float('nan')):.1e}")
+        all_pass &= ok
+
+    print("="*60 + "\n")
+    return 0 if all_pass else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
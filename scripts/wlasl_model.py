@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+SignBridge WLASL Model
+Model definition shared by the live camera script and the serving code,
+plus incremental sliding-window inference
+
+Both branches of the model are "encode every frame, then average over time":
+
+    video:    TimeDistributed(Conv2D -> GAP2D)      -> GAP1D over time
+    skeleton: TimeDistributed(Dense -> GAP1D joints) -> GAP1D over time
+    head:     Concatenate -> Dense(256) -> Dense(NUM_CLASSES, softmax)
+
+A live window slides by one frame, so running the full model re-encodes the
+15 frames it already saw. IncrementalSignBridge runs the per-frame encoders
+once per new frame, keeps the embeddings in a ring and only re-runs the
+temporal head. The encoders and head reuse the full model's layer objects,
+so weights loaded into the full model are used as-is.
+
+Check equivalence with the full model and the speedup:
+    python scripts/wlasl_model.py [--weights wlasl-final.keras]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras import layers
+
+IMG_SIZE = 160
+MAX_FRAMES = 16
+NUM_CLASSES = 2000
+NUM_JOINTS = 21
+
+
+# ===============================
+# CUSTOM GRAPH CONV
+# ===============================
+@tf.keras.utils.register_keras_serializable()
+class GraphConv(layers.Layer):
+    def __init__(self, units, **kwargs):
+        super().__init__(**kwargs)
+        self.units = units
+
+    def build(self, input_shape):
+        self.w = self.add_weight(
+            shape=(input_shape[-1], self.units),
+            initializer="glorot_uniform",
+            trainable=True
+        )
+
+    def call(self, x):
+        return tf.matmul(x, self.w)
+
+    def compute_output_shape(self, input_shape):
+        return input_shape[:-1] + (self.units,)
+
+    def get_config(self):
+        cfg = super().get_config()
+        cfg.update({"units": self.units})
+        return cfg
+
+
+# ===============================
+# MODEL DEFINITION
+# ===============================
+def build_signbridge_layers():
+    """
+    Create the SignBridge layers
+
+    Layers are created in the same order as the original inline definition,
+    so auto-generated layer names (and therefore saved weights) still match.
+
+    Returns:
+        dict of role -> layer instance
+    """
+    parts = {}
+    # -------- VIDEO BRANCH --------
+    # Use simple Conv2D instead of MobileNetV2 to avoid weight loading issues
+    parts["video_conv"] = layers.TimeDistributed(
+        layers.Conv2D(64, 3, activation='relu', padding='same')
+    )
+    parts["video_pool"] = layers.TimeDistributed(layers.GlobalAveragePooling2D())
+    parts["video_time_pool"] = layers.GlobalAveragePooling1D()
+
+    # -------- SKELETON BRANCH --------
+    parts["skeleton_reshape"] = layers.Reshape((MAX_FRAMES, NUM_JOINTS, 2))
+    parts["skeleton_dense"] = layers.TimeDistributed(layers.Dense(64, activation='relu'))
+    parts["skeleton_pool"] = layers.TimeDistributed(layers.GlobalAveragePooling1D())
+    parts["skeleton_time_pool"] = layers.GlobalAveragePooling1D()
+
+    # -------- FUSION --------
+    parts["concat"] = layers.Concatenate()
+    parts["fusion"] = layers.Dense(256, activation="relu")
+    parts["classifier"] = layers.Dense(NUM_CLASSES, activation="softmax")
+    return parts
+
+
+def build_signbridge_model(parts=None):
+    """Build test model without MobileNetV2 weight mismatch issues"""
+    parts = parts or build_signbridge_layers()
+
+    video_in = tf.keras.Input(
+        shape=(MAX_FRAMES, IMG_SIZE, IMG_SIZE, 3),
+        name="video_input"
+    )
+    x_vid = parts["video_conv"](video_in)
+    x_vid = parts["video_pool"](x_vid)          # (None, 16, 64)
+    x_vid = parts["video_time_pool"](x_vid)     # (None, 64)
+
+    skel_in = tf.keras.Input(
+        shape=(MAX_FRAMES, NUM_JOINTS * 2),
+        name="skeleton_input"
+    )
+    x_skel = parts["skeleton_reshape"](skel_in)  # (None, 16, 21, 2)
+    x_skel = parts["skeleton_dense"](x_skel)     # Dense layer on joints
+    x_skel = parts["skeleton_pool"](x_skel)      # Pool joints → (None, 16, 64)
+    x_skel = parts["skeleton_time_pool"](x_skel)  # Pool time → (None, 64)
+
+    x = parts["concat"]([x_vid, x_skel])
+    x = parts["fusion"](x)
+    out = parts["classifier"](x)
+
+    return tf.keras.Model(
+        inputs=[video_in, skel_in],
+        outputs=out
+    )
+
+
+def build_incremental_models(parts):
+    """
+    Split a SignBridge model into per-frame encoders and a temporal head
+
+    Args:
+        parts: Layers from build_signbridge_layers() (built, e.g. via the full model)
+
+    Returns:
+        (video_encoder, skeleton_encoder, temporal_head)
+    """
+    frame_in = tf.keras.Input(shape=(IMG_SIZE, IMG_SIZE, 3), name="frame_input")
+    x = parts["video_conv"].layer(frame_in)
+    video_encoder = tf.keras.Model(frame_in, parts["video_pool"].layer(x), name="video_encoder")
+
+    joints_in = tf.keras.Input(shape=(NUM_JOINTS * 2,), name="joints_input")
+    x = layers.Reshape((NUM_JOINTS, 2))(joints_in)
+    x = parts["skeleton_dense"].layer(x)
+    skeleton_encoder = tf.keras.Model(
+        joints_in, parts["skeleton_pool"].layer(x), name="skeleton_encoder"
+    )
+
+    video_seq = tf.keras.Input(shape=(MAX_FRAMES, video_encoder.output_shape[-1]))
+    skel_seq = tf.keras.Input(shape=(MAX_FRAMES, skeleton_encoder.output_shape[-1]))
+    x = parts["concat"]([parts["video_time_pool"](video_seq), parts["skeleton_time_pool"](skel_seq)])
+    out = parts["classifier"](parts["fusion"](x))
+    temporal_head = tf.keras.Model([video_seq, skel_seq], out, name="temporal_head")
+    return video_encoder, skeleton_encoder, temporal_head
+
+
+class IncrementalSignBridge:
+    """
+    Sliding-window SignBridge inference with cached per-frame embeddings
+
+    Each push() encodes only the new frame; the temporal head then runs on
+    the last MAX_FRAMES embeddings in arrival order.
+    """
+
+    def __init__(self, parts):
+        self.video_encoder, self.skeleton_encoder, self.head = build_incremental_models(parts)
+        window = self.window = MAX_FRAMES
+        self._video = np.zeros((window, self.video_encoder.output_shape[-1]), dtype=np.float32)
+        self._skeleton = np.zeros((window, self.skeleton_encoder.output_shape[-1]), dtype=np.float32)
+        self._next = 0
+        self.frames_seen = 0
+
+    def reset(self):
+        self._next = 0
+        self.frames_seen = 0
+
+    def push(self, frame, skeleton):
+        """
+        Add one frame and return class probabilities once the window is full
+
+        Args:
+            frame: (IMG_SIZE, IMG_SIZE, 3) float32 frame in [0, 1]
+            skeleton: (42,) hand landmark coordinates
+
+        Returns:
+            (NUM_CLASSES,) probabilities, or None while the window fills
+        """
+        self._video[self._next] = self.video_encoder(frame[None, ...], training=False)[0]
+        self._skeleton[self._next] = self.skeleton_encoder(skeleton[None, ...], training=False)[0]
+        self._next = (self._next + 1) % self.window
+        self.frames_seen += 1
+        if self.frames_seen < self.window:
+            return None
+
+        # Oldest first, like the full-window input
+        order = (self._next + np.arange(self.window)) % self.window
+        probs = self.head(
+            [self._video[order][None, ...], self._skeleton[order][None, ...]], training=False
+        )
+        return np.asarray(probs)[0]
+
+
+def check_equivalence(model, parts, num_frames=MAX_FRAMES + 8, seed=0):
+    """
+    Compare incremental inference with the full model on a random stream
+
+    Returns:
+        dict with max_abs_diff and per-window latency of both paths
+    """
+    rng = np.random.default_rng(seed)
+    frames = rng.random((num_frames, IMG_SIZE, IMG_SIZE, 3), dtype=np.float32)
+    skeletons = rng.random((num_frames, NUM_JOINTS * 2), dtype=np.float32)
+
+    incremental = IncrementalSignBridge(parts)
+    max_diff, full_ms, incremental_ms = 0.0, [], []
+    for i in range(num_frames):
+        started = time.perf_counter()
+        probs = incremental.push(frames[i], skeletons[i])
+        incremental_ms.append((time.perf_counter() - started) * 1000)
+        if probs is None:
+            continue
+        window = slice(i - MAX_FRAMES + 1, i + 1)
+        started = time.perf_counter()
+        expected = np.asarray(model([frames[window][None], skeletons[window][None]], training=False))[0]
+        full_ms.append((time.perf_counter() - started) * 1000)
+        max_diff = max(max_diff, float(np.max(np.abs(probs - expected))))
+
+    steady = incremental_ms[MAX_FRAMES:]
+    return {
+        "max_abs_diff": max_diff,
+        "full_window_ms": float(np.median(full_ms[1:] or full_ms)),
+        "incremental_ms": float(np.median(steady or incremental_ms)),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SignBridge incremental inference check")
+    parser.add_argument("--weights", help="Weights to load (random weights if omitted)")
+    parser.add_argument("--atol", type=float, default=1e-5, help="Allowed max abs difference")
+    args = parser.parse_args()
+
+    parts = build_signbridge_layers()
+    model = build_signbridge_model(parts)
+    if args.weights and os.path.exists(args.weights):
+        model.load_weights(args.weights)
+        print(f"[INFO] Loaded weights from {args.weights}")
+
+    report = check_equivalence(model, parts)
+    print(f"[INFO] Max abs difference: {report['max_abs_diff']:.2e}")
+    print(f"[INFO] Full window: {report['full_window_ms']:.1f} ms, "
+          f"incremental: {report['incremental_ms']:.1f} ms per frame")
+    if report["max_abs_diff"] > args.atol:
+        print(f"[ERROR] Incremental output differs from full-window output (> {args.atol})")
+        sys.exit(1)
+    print("[SUCCESS] Incremental inference matches full-window inference")
@@ -0,0 +1,360 @@
+"""
+WLASL Clip Recognition
+Server-side word-level sign recognition for short clips
+
+Clips (a video file or a frame sequence) are reduced to MAX_FRAMES frames by
+uniform temporal sampling, the same sampling as the WLASL training
+generator. Videos are decoded in a streaming way: every frame is grabbed
+(cheap) but only the sampled ones are retrieved and converted, and each is
+downscaled to IMG_SIZE immediately, so the full video is never held
+decoded. Hand landmarks come from MediaPipe when it is installed (zeros
+otherwise, like the camera script when no hand is visible).
+
+Concurrent requests are combined by a MicroBatcher into one forward pass.
+"""
+
+import base64
+import json
+import os
+import queue
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from pathlib import Path
+
+import numpy as np
+
+from admission import DeadlineExceededError, QueueFullError
+from prediction_service import MAX_CLIP_BYTES
+from serving_metrics import metrics
+
+MODELS_DIR = Path(os.environ.get("MODEL_DIR", Path(__file__).parent.parent / "notebooks" / "Saved_models"))
+WLASL_WEIGHTS = Path(os.environ.get("WLASL_WEIGHTS", MODELS_DIR / "wlasl-final.keras"))
+# WLASL_v0.3.json (class ids follow its gloss order) or a JSON list of glosses
+WLASL_GLOSSES = os.environ.get("WLASL_GLOSSES", str(MODELS_DIR / "wlasl_glosses.json"))
+
+MAX_CLIP_FRAMES = int(os.environ.get("MAX_CLIP_FRAMES", 512))
+CLIP_MAX_BATCH = int(os.environ.get("CLIP_MAX_BATCH", 8))
+CLIP_BATCH_WAIT_MS = float(os.environ.get("CLIP_BATCH_WAIT_MS", 10))
+CLIP_MAX_QUEUE = int(os.environ.get("CLIP_MAX_QUEUE", 32))
+
+
+class ClipError(ValueError):
+    """The clip could not be decoded or is too large"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def sample_indices(total, count):
+    """Uniformly spaced frame indices (repeats frames for short clips)"""
+    return np.linspace(0, max(total - 1, 0), count).round().astype(int)
+
+
+def _to_model_frame(rgb):
+    """Downscale one RGB frame to the model's input and extract its skeleton"""
+    import cv2
+    from roi import ROIError, hand_detector
+    from wlasl_model import IMG_SIZE, NUM_JOINTS
+    if rgb.ndim == 2:
+        rgb = cv2.cvtColor(rgb, cv2.COLOR_GRAY2RGB)
+    elif rgb.shape[2] == 4:
+        rgb = cv2.cvtColor(rgb, cv2.COLOR_RGBA2RGB)
+    try:
+        skeleton = hand_detector.landmarks(rgb)
+    except ROIError:
+        skeleton = None
+    frame = cv2.resize(rgb, (IMG_SIZE, IMG_SIZE)).astype(np.float32) / 255.0
+    if skeleton is None:
+        return frame, np.zeros(NUM_JOINTS * 2, dtype=np.float32), False
+    return frame, skeleton, True
+
+
+class Clip:
+    """MAX_FRAMES sampled frames and skeletons of one request"""
+
+    def __init__(self, frames, skeletons, source_frames, hand_frames):
+        self.frames = frames
+        self.skeletons = skeletons
+        self.source_frames = source_frames
+        self.hand_frames = hand_frames
+
+
+def _collect(samples, wanted, source_frames):
+    """
+    Build a Clip from (source index, rgb frame) pairs in index order
+
+    Slots whose source frame never arrived reuse the last decoded frame.
+    """
+    from wlasl_model import IMG_SIZE, MAX_FRAMES, NUM_JOINTS
+    frames = np.zeros((MAX_FRAMES, IMG_SIZE, IMG_SIZE, 3), dtype=np.float32)
+    skeletons = np.zeros((MAX_FRAMES, NUM_JOINTS * 2), dtype=np.float32)
+    hands = np.zeros(MAX_FRAMES, dtype=bool)
+    filled = 0
+    for index, rgb in samples:
+        frame, skeleton, found = _to_model_frame(rgb)
+        # A short clip maps one source frame to several slots; a frame that
+        # failed to decode is replaced by the next one
+        while filled < MAX_FRAMES and wanted[filled] <= index:
+            frames[filled], skeletons[filled], hands[filled] = frame, skeleton, found
+            filled += 1
+    if filled == 0:
+        raise ClipError("No frames could be decoded from the clip")
+    frames[filled:], skeletons[filled:], hands[filled:] = frames[filled - 1], skeletons[filled - 1], hands[filled - 1]
+    return Clip(frames, skeletons, source_frames, int(hands.sum()))
+
+
+def clip_from_video(data):
+    """
+    Decode a video file, keeping only the sampled frames
+
+    Videos longer than MAX_CLIP_FRAMES are rejected (413), like frame uploads.
+
+    Args:
+        data: Encoded video bytes (any container/codec OpenCV can read)
+    """
+    import cv2
+    from wlasl_model import MAX_FRAMES
+    if len(data) > MAX_CLIP_BYTES:
+        raise ClipError(f"Clip too large: exceeds {MAX_CLIP_BYTES} bytes", 413)
+
+    # OpenCV only reads from files
+    with tempfile.NamedTemporaryFile(suffix=".mp4") as tmp:
+        tmp.write(data)
+        tmp.flush()
+        cap = cv2.VideoCapture(tmp.name)
+        try:
+            if not cap.isOpened():
+                raise ClipError("Unsupported or corrupt video")
+            total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            if total <= 0:
+                # Container doesn't report a count: count with grab() (at most
+                # one frame past the limit) and rewind
+                while total <= MAX_CLIP_FRAMES and cap.grab():
+                    total += 1
+                cap.release()
+                cap = cv2.VideoCapture(tmp.name)
+            if total > MAX_CLIP_FRAMES:
+                raise ClipError(f"Too many frames: clip exceeds {MAX_CLIP_FRAMES} frames", 413)
+            wanted = sample_indices(total, MAX_FRAMES)
+
+            def sampled_frames():
+                targets = set(wanted.tolist())
+                last = int(wanted[-1])
+                for index in range(last + 1):
+                    # grab() advances without converting the frame
+                    if not cap.grab():
+                        return
+                    if index in targets:
+                        ok, bgr = cap.retrieve()
+                        if ok:
+                            yield index, cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+
+            return _collect(sampled_frames(), wanted, total)
+        finally:
+            cap.release()
+
+
+def clip_from_frames(encoded_frames, decode):
+    """
+    Build a clip from a base64 frame sequence, decoding only sampled frames
+
+    Args:
+        encoded_frames: List of base64 images in temporal order
+        decode: Function decoding one base64 image to an RGB(A) array
+    """
+    from wlasl_model import MAX_FRAMES
+    if not isinstance(encoded_frames, list) or not encoded_frames:
+        raise ClipError("'frames' must be a non-empty list of base64 images")
+    if len(encoded_frames) > MAX_CLIP_FRAMES:
+        raise ClipError(f"Too many frames: {len(encoded_frames)} exceeds {MAX_CLIP_FRAMES}", 413)
+    total = len(encoded_frames)
+    wanted = sample_indices(total, MAX_FRAMES)
+    samples = ((index, decode(encoded_frames[index])) for index in dict.fromkeys(wanted.tolist()))
+    return _collect(samples, wanted, total)
+
+
+def decode_video_field(encoded):
+    """Decode a base64 video upload (size checked before decoding)"""
+    if len(encoded) * 3 // 4 > MAX_CLIP_BYTES:
+        raise ClipError(f"Clip too large: exceeds {MAX_CLIP_BYTES} bytes", 413)
+    try:
+        return base64.b64decode(encoded)
+    except Exception as e:
+        raise ClipError(f"Invalid video data: {str(e)}")
+
+
+class MicroBatcher:
+    """
+    Combines concurrent requests into one batched call
+
+    The first waiting item opens a batch; the batch runs when it is full or
+    `max_wait_ms` has passed, whichever is first.
+    """
+
+    def __init__(self, run_batch, name, max_batch=CLIP_MAX_BATCH,
+                 max_wait_ms=CLIP_BATCH_WAIT_MS, max_queue=CLIP_MAX_QUEUE):
+        self.run_batch = run_batch
+        self.name = name
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, item, deadline=None):
+        """
+        Queue an item and wait for its result
+
+        Raises:
+            QueueFullError: too many items are waiting
+            DeadlineExceededError: the deadline passed before the result was ready
+        """
+        self._ensure_worker()
+        future = Future()
+        try:
+            self._queue.put_nowait((item, future, deadline))
+        except queue.Full:
+            metrics.increment("admission_rejected", model=self.name, reason="queue_full")
+            raise QueueFullError(self.name, 1)
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise DeadlineExceededError("Request deadline exceeded while batched")
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._worker, name=f"{self.name}-batcher", daemon=True
+                )
+                self._thread.start()
+
+    def _worker(self):
+        while True:
+            batch = [self._queue.get()]
+            closes_at = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = closes_at - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            now = time.monotonic()
+            live = [
+                (item, future) for item, future, deadline in batch
+                if future.set_running_or_notify_cancel() and (deadline is None or deadline > now)
+            ]
+            for item, future, deadline in batch:
+                if deadline is not None and deadline <= now and future.running():
+                    future.set_exception(DeadlineExceededError("Request deadline exceeded while batched"))
+            if not live:
+                continue
+            metrics.observe("batch_size", len(live), model=self.name)
+            try:
+                results = self.run_batch([item for item, _ in live])
+                for (_, future), result in zip(live, results):
+                    future.set_result(result)
+            except Exception as e:
+                for _, future in live:
+                    future.set_exception(e)
+
+
+def load_glosses(path=WLASL_GLOSSES):
+    """Gloss names by class id (None if no gloss file is available)"""
+    path = Path(path)
+    if not path.exists():
+        return None
+    entries = json.loads(path.read_text())
+    if entries and isinstance(entries[0], dict):
+        # WLASL_v0.3.json: class ids were assigned in order of first appearance
+        return list(dict.fromkeys(entry["gloss"] for entry in entries))
+    return list(entries)
+
+
+class ClipRecognizer:
+    """Lazily loaded SignBridge model plus its micro-batcher"""
+
+    def __init__(self, weights=WLASL_WEIGHTS):
+        self.weights = Path(weights)
+        self.model = None
+        self.glosses = None
+        self.error = None
+        self._lock = threading.Lock()
+        self.batcher = MicroBatcher(self._predict_batch, "wlasl")
+
+    def ensure_loaded(self):
+        """Load the model on first use; returns False if it is unavailable"""
+        with self._lock:
+            if self.model is None and self.error is None:
+                self._load()
+            return self.model is not None
+
+    def _load(self):
+        from wlasl_model import build_signbridge_model
+        if not self.weights.exists():
+            self.error = f"WLASL weights not found at {self.weights}"
+            print(f"[WARNING] {self.error}")
+            return
+        try:
+            model = build_signbridge_model()
+            model.load_weights(str(self.weights))
+        except Exception as e:
+            self.error = f"Failed to load WLASL weights: {str(e)[:100]}"
+            print(f"[ERROR] {self.error}")
+            return
+        self.glosses = load_glosses()
+        self.model = model
+        print(f"[SUCCESS] WLASL model loaded ({len(self.glosses or [])} glosses)")
+
+    def _predict_batch(self, clips):
+        video = np.stack([clip.frames for clip in clips])
+        skeleton = np.stack([clip.skeletons for clip in clips])
+        return list(np.asarray(self.model([video, skeleton], training=False)))
+
+    def gloss(self, class_id):
+        if self.glosses and class_id < len(self.glosses):
+            return self.glosses[class_id]
+        return f"class_{class_id}"
+
+    def recognize(self, clip, top_k=5, deadline=None):
+        """
+        Classify one clip (batched with concurrent requests)
+
+        Returns:
+            dict with the top gloss and the top-k candidates
+        """
+        if not self.ensure_loaded():
+            return {"error": self.error, "model": "wlasl", "success": False}
+
+        probs = self.batcher.submit(clip, deadline)
+        top_k = min(top_k, len(probs))
+        top = np.argpartition(probs, -top_k)[-top_k:]
+        top = top[np.argsort(probs[top])[::-1]]
+        best = int(top[0])
+        confidence = float(probs[best])
+        return {
+            "model": "wlasl",
+            "prediction": self.gloss(best),
+            "confidence": confidence,
+            "confidence_percent": f"{confidence*100:.2f}%",
+            "top_k": [
+                {"gloss": self.gloss(int(i)), "class_id": int(i), "confidence": float(probs[i])}
+                for i in top
+            ],
+            "frames_sampled": len(clip.frames),
+            "source_frames": clip.source_frames,
+            "hand_frames": clip.hand_frames,
+            "success": True
+        }
+
+
+# Global recognizer
+recognizer = ClipRecognizer()
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Two-Stage SignBridge Inference
+Skeleton-only head first, video branch only when it is needed
+
+The skeleton branch (16x42 landmarks) costs a tiny fraction of the video
+branch (16x160x160x3 convolutions). A skeleton-only head, distilled from the
+fusion model, answers first; the video branch runs only when
+- no hand was detected in too many frames of the window,
+- the skeleton head's confidence is below the threshold, or
+- its top candidates are ambiguous (top-1 vs top-2 margin too small).
+
+Raw frames stay in the window ring, and video embeddings are computed lazily
+for just the frames that don't have one yet, so a run of confident windows
+never touches the video encoder.
+
+Usage:
+    # windows.npz: video (N,16,160,160,3) in [0,1], skeleton (N,16,42), labels (N,) optional
+    python scripts/wlasl_two_stage.py distill --data windows.npz --weights wlasl-final.keras \
+        --output skeleton_head.weights.h5
+    python scripts/wlasl_two_stage.py evaluate --data windows.npz --weights wlasl-final.keras \
+        --head skeleton_head.weights.h5 --threshold 0.7
+"""
+
+import argparse
+import os
+import sys
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras import layers
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from wlasl_model import (
+    IMG_SIZE, MAX_FRAMES, NUM_CLASSES, NUM_JOINTS,
+    build_incremental_models, build_signbridge_layers, build_signbridge_model,
+)
+
+DEFAULT_THRESHOLD = float(os.environ.get("WLASL_SKELETON_THRESHOLD", 0.7))
+DEFAULT_MIN_MARGIN = 0.1
+DEFAULT_NO_HAND_FRACTION = 0.5
+
+# Layers of the skeleton branch shared with the fusion model (kept frozen)
+SHARED_SKELETON_LAYERS = ("skeleton_reshape", "skeleton_dense", "skeleton_pool", "skeleton_time_pool")
+
+
+def build_skeleton_head(parts):
+    """
+    Skeleton-only classifier on top of the fusion model's skeleton branch
+
+    Returns:
+        Keras model (MAX_FRAMES, 42) -> NUM_CLASSES probabilities
+    """
+    skel_in = tf.keras.Input(shape=(MAX_FRAMES, NUM_JOINTS * 2), name="skeleton_input")
+    x = skel_in
+    for role in SHARED_SKELETON_LAYERS:
+        x = parts[role](x)
+    x = layers.Dense(256, activation="relu", name="skeleton_head_hidden")(x)
+    out = layers.Dense(NUM_CLASSES, activation="softmax", name="skeleton_head_output")(x)
+    return tf.keras.Model(skel_in, out, name="skeleton_head")
+
+
+def distill_skeleton_head(model, head, parts, video, skeleton, labels=None,
+                          epochs=5, batch_size=32, temperature=2.0, label_weight=0.5):
+    """
+    Train the skeleton head to mimic the fusion model
+
+    Args:
+        model: Fusion model (teacher)
+        head: Skeleton head from build_skeleton_head(parts)
+        parts: Layers shared by both (the skeleton branch stays frozen)
+        video, skeleton: Training windows
+        labels: Optional ground-truth class ids, mixed into the soft targets
+        temperature: Softens the teacher distribution
+        label_weight: Weight of the one-hot labels when labels are given
+
+    Returns:
+        Keras History
+    """
+    teacher = model.predict([video, skeleton], batch_size=batch_size, verbose=0)
+    soft = np.power(teacher, 1.0 / temperature)
+    targets = soft / soft.sum(axis=1, keepdims=True)
+    if labels is not None:
+        onehot = np.eye(NUM_CLASSES, dtype=np.float32)[labels]
+        targets = label_weight * onehot + (1 - label_weight) * targets
+
+    shared = [parts[role] for role in SHARED_SKELETON_LAYERS]
+    previous = [layer.trainable for layer in shared]
+    for layer in shared:
+        layer.trainable = False
+    try:
+        head.compile(optimizer="adam", loss="kl_divergence")
+        return head.fit(skeleton, targets, epochs=epochs, batch_size=batch_size, verbose=2)
+    finally:
+        for layer, trainable in zip(shared, previous):
+            layer.trainable = trainable
+
+
+def video_needed(probs, skeleton_windows, threshold=DEFAULT_THRESHOLD,
+                 min_margin=DEFAULT_MIN_MARGIN, no_hand_fraction=DEFAULT_NO_HAND_FRACTION):
+    """
+    Decide per window whether the video branch has to run
+
+    Args:
+        probs: (N, NUM_CLASSES) skeleton-head probabilities
+        skeleton_windows: (N, MAX_FRAMES, 42) landmarks (all zeros = no hand)
+
+    Returns:
+        (N,) array of reasons: "" (skeleton is enough), "no_hand",
+        "low_confidence" or "ambiguous"
+    """
+    top2 = np.sort(np.partition(probs, -2, axis=1)[:, -2:], axis=1)
+    confidence, margin = top2[:, 1], top2[:, 1] - top2[:, 0]
+    missing = (~np.any(skeleton_windows, axis=2)).mean(axis=1)
+
+    reasons = np.full(len(probs), "", dtype=object)
+    reasons[margin < min_margin] = "ambiguous"
+    reasons[confidence < threshold] = "low_confidence"
+    reasons[missing >= no_hand_fraction] = "no_hand"
+    return reasons
+
+
+class TwoStageSignBridge:
+    """
+    Sliding-window inference: skeleton head first, fusion model on demand
+
+    Same interface as IncrementalSignBridge; `last_stage` / `last_reason`
+    tell which path produced the latest result and `stats` counts them.
+    """
+
+    def __init__(self, parts, skeleton_head, threshold=DEFAULT_THRESHOLD,
+                 min_margin=DEFAULT_MIN_MARGIN, no_hand_fraction=DEFAULT_NO_HAND_FRACTION):
+        self.video_encoder, self.skeleton_encoder, self.head = build_incremental_models(parts)
+        self.skeleton_head = skeleton_head
+        self.gate = {
+            "threshold": threshold,
+            "min_margin": min_margin,
+            "no_hand_fraction": no_hand_fraction,
+        }
+        window = self.window = MAX_FRAMES
+        self._frames = np.zeros((window, IMG_SIZE, IMG_SIZE, 3), dtype=np.float32)
+        self._skeletons = np.zeros((window, NUM_JOINTS * 2), dtype=np.float32)
+        self._skeleton_emb = np.zeros((window, self.skeleton_encoder.output_shape[-1]), dtype=np.float32)
+        self._video_emb = np.zeros((window, self.video_encoder.output_shape[-1]), dtype=np.float32)
+        self._has_video_emb = np.zeros(window, dtype=bool)
+        self._next = 0
+        self.frames_seen = 0
+        self.last_stage = None
+        self.last_reason = None
+        self.stats = Counter()
+
+    def reset(self):
+        self._next = 0
+        self.frames_seen = 0
+        self._has_video_emb[:] = False
+
+    def push(self, frame, skeleton):
+        """
+        Add one frame and return class probabilities once the window is full
+
+        Returns:
+            (NUM_CLASSES,) probabilities, or None while the window fills
+        """
+        slot = self._next
+        self._frames[slot] = frame
+        self._skeletons[slot] = skeleton
+        self._skeleton_emb[slot] = self.skeleton_encoder(skeleton[None, ...], training=False)[0]
+        self._has_video_emb[slot] = False
+        self._next = (slot + 1) % self.window
+        self.frames_seen += 1
+        if self.frames_seen < self.window:
+            return None
+
+        order = (self._next + np.arange(self.window)) % self.window
+        skeleton_window = self._skeletons[order][None, ...]
+        probs = np.asarray(self.skeleton_head(skeleton_window, training=False))
+        reason = video_needed(probs, skeleton_window, **self.gate)[0]
+        self.stats["windows"] += 1
+        if not reason:
+            self.stats["skeleton_only"] += 1
+            self.last_stage, self.last_reason = "skeleton", None
+            return probs[0]
+
+        self.stats[reason] += 1
+        missing = order[~self._has_video_emb[order]]
+        if len(missing):
+            self._video_emb[missing] = self.video_encoder(self._frames[missing], training=False)
+            self._has_video_emb[missing] = True
+        fused = self.head(
+            [self._video_emb[order][None, ...], self._skeleton_emb[order][None, ...]], training=False
+        )
+        self.last_stage, self.last_reason = "fusion", reason
+        return np.asarray(fused)[0]
+
+    def skip_fraction(self):
+        """Fraction of windows answered without the video branch"""
+        windows = self.stats["windows"]
+        return self.stats["skeleton_only"] / windows if windows else 0.0
+
+
+def evaluate(model, skeleton_head, video, skeleton, labels=None, batch_size=32, **gate):
+    """
+    Compare two-stage predictions with always running the fusion model
+
+    Without labels, accuracy is measured as agreement with the fusion model.
+
+    Returns:
+        dict with skip_fraction, per-reason counts and the accuracy delta
+    """
+    fusion = model.predict([video, skeleton], batch_size=batch_size, verbose=0)
+    skeleton_probs = skeleton_head.predict(skeleton, batch_size=batch_size, verbose=0)
+    reasons = video_needed(skeleton_probs, skeleton, **gate)
+    skipped = reasons == ""
+
+    two_stage = np.where(skipped, skeleton_probs.argmax(axis=1), fusion.argmax(axis=1))
+    reference = labels if labels is not None else fusion.argmax(axis=1)
+    fusion_accuracy = float(np.mean(fusion.argmax(axis=1) == reference))
+    two_stage_accuracy = float(np.mean(two_stage == reference))
+    return {
+        "windows": int(len(reasons)),
+        "skip_fraction": float(skipped.mean()),
+        "reasons": {reason or "skeleton_only": int(n) for reason, n in Counter(reasons).items()},
+        "reference": "labels" if labels is not None else "fusion_agreement",
+        "fusion_accuracy": fusion_accuracy,
+        "two_stage_accuracy": two_stage_accuracy,
+        "accuracy_delta": two_stage_accuracy - fusion_accuracy,
+    }
+
+
+def _load_fusion(weights):
+    parts = build_signbridge_layers()
+    model = build_signbridge_model(parts)
+    if weights:
+        model.load_weights(weights)
+        print(f"[INFO] Loaded fusion weights from {weights}")
+    return model, parts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Two-stage SignBridge inference")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ("distill", "evaluate"):
+        cmd = sub.add_parser(name)
+        cmd.add_argument("--data", required=True, help="npz with video, skeleton and optional labels")
+        cmd.add_argument("--weights", help="Fusion model weights")
+    sub.choices["distill"].add_argument("--output", required=True, help="Skeleton head weights file")
+    sub.choices["distill"].add_argument("--epochs", type=int, default=5)
+    sub.choices["evaluate"].add_argument("--head", required=True, help="Skeleton head weights file")
+    sub.choices["evaluate"].add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    sub.choices["evaluate"].add_argument("--min-margin", type=float, default=DEFAULT_MIN_MARGIN)
+    sub.choices["evaluate"].add_argument("--no-hand-fraction", type=float, default=DEFAULT_NO_HAND_FRACTION)
+    args = parser.parse_args()
+
+    data = np.load(args.data)
+    video, skeleton = data["video"], data["skeleton"]
+    labels = data["labels"] if "labels" in data.files else None
+    model, parts = _load_fusion(args.weights)
+    head = build_skeleton_head(parts)
+
+    if args.command == "distill":
+        distill_skeleton_head(model, head, parts, video, skeleton, labels, epochs=args.epochs)
+        head.save_weights(args.output)
+        print(f"[SUCCESS] Skeleton head saved to {args.output}")
+        return 0
+
+    head.load_weights(args.head)
+    report = evaluate(
+        model, head, video, skeleton, labels, threshold=args.threshold,
+        min_margin=args.min_margin, no_hand_fraction=args.no_hand_fraction
+    )
+    print(f"[INFO] Windows: {report['windows']}, video branch skipped: {report['skip_fraction']:.1%}")
+    print(f"[INFO] Reasons: {report['reasons']}")
+    print(f"[INFO] Accuracy ({report['reference']}): fusion {report['fusion_accuracy']:.2%}, "
+          f"two-stage {report['two_stage_accuracy']:.2%} (delta {report['accuracy_delta']:+.2%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())